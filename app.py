@@ -0,0 +1,186 @@
+"""
+Настройка диспетчера: роутеры, мидлвари, хуки запуска и остановки, метрики.
+
+Общая для основного процесса (main.py) и рабочих процессов (sharding.worker_main):
+рабочий процесс импортирует этот модуль, а не точку входа.
+"""
+import logging
+import time
+from handlers import routers
+# from middlewares.album_middleware import AlbumMiddleware
+from middlewares.user_middleware import UserMiddleware
+from middlewares.callback_guard_middleware import TaskCallbackGuardMiddleware
+from middlewares.metrics_middleware import HandlerMetricsMiddleware, TimedMiddleware, UpdateMetricsMiddleware
+from middlewares.tracing_middleware import BotTracingMiddleware, TracingMiddleware
+from loader import dp, bot, api, config, group_directory, sender, outbox, replica, task_index, readiness, \
+    tasks_version
+from utils.fsm_storage import SQLiteStorage
+from utils.invalidation import InvalidationListener
+from utils.metrics import registry
+from utils.tracing import Tracer
+from utils.warmup import restore_snapshot, save_snapshot, warm_up
+
+# Журнал медленных апдейтов (TRACE_PATH), без него трассировка выключена
+tracer = Tracer(
+    path=config.trace_path,
+    slow_threshold=config.trace_slow_threshold,
+    sample_rate=config.trace_sample_rate
+) if config.trace_path else None
+
+# Поток изменений из API (INVALIDATION_URL): кэши обновляются по событиям,
+# без него и при обрыве записи устаревают по TTL
+invalidation = InvalidationListener(
+    api, group_directory,
+    url=config.invalidation_url,
+    on_tasks_changed=tasks_version.bump,
+    connected_ttl=config.invalidation_user_ttl
+) if config.invalidation_url else None
+
+async def on_startup():
+    # Доставка уведомлений, в том числе не отправленных до перезапуска
+    await outbox.start()
+
+    # Реплика для списков администратора заполняется в фоне, до первой синхронизации списки читаются из API
+    if replica is not None:
+        await replica.start()
+    # Поисковый индекс строится в фоне, до построения /find просит подождать
+    await task_index.start()
+
+    # Подписка до прогрева: изменения во время загрузки не будут пропущены
+    if invalidation is not None:
+        invalidation.start()
+
+    # Снимок кэшей с прошлого запуска: профили сразу доступны, ответы API
+    # перепроверяются прогревом условными запросами
+    restored = 0
+    if config.cache_snapshot_path:
+        restored = restore_snapshot(config.cache_snapshot_path, api, group_directory, config.cache_snapshot_max_age)
+
+    # Пользователи, справочник групп (нужен клавиатурам постановщиков и администратора)
+    # и активные группы загружаются параллельно до начала приема апдейтов
+    started = time.monotonic()
+    summary = await warm_up(api, group_directory, config.warmup_timeout)
+    readiness.set_ready(restored=restored, **summary)
+    logging.info(
+        f"Бот готов за {readiness.time_to_ready:.2f} с (прогрев {time.monotonic() - started:.2f} с, "
+        f"из снимка: {restored}, загружено: {summary})"
+    )
+
+async def on_shutdown():
+    if invalidation is not None:
+        await invalidation.close()
+    if replica is not None:
+        await replica.close()
+    await task_index.close()
+    await outbox.close()
+    if not config.cache_snapshot_path:
+        return
+    try:
+        saved = save_snapshot(config.cache_snapshot_path, api, group_directory)
+        logging.info(f"Снимок кэшей сохранен: {saved} записей")
+    except Exception as e:
+        logging.error(f"Не удалось сохранить снимок кэшей: {e}")
+
+def collect_runtime_metrics():
+    """Счетчики кэшей, очередей и хранилища в формате сборщика метрик"""
+    from handlers.creators import album_middleware
+
+    yield ("bot_ready", "gauge", "Прогрев кэшей завершен", [({}, int(readiness.ready))])
+    if readiness.ready:
+        yield ("bot_time_to_ready_seconds", "gauge", "Время от запуска до готовности",
+               [({}, readiness.time_to_ready)])
+
+    if invalidation is not None:
+        yield ("invalidation_connected", "gauge", "Поток событий API подключен",
+               [({}, int(invalidation.connected))])
+        yield ("invalidation_events_total", "counter", "Примененные события API", [({}, invalidation.events)])
+        yield ("invalidation_reconnects_total", "counter", "Переподключения к потоку событий API",
+               [({}, invalidation.reconnects)])
+        yield ("invalidation_resets_total", "counter", "Полные сбросы кэшей по событию reset",
+               [({}, invalidation.resets)])
+
+    if replica is not None:
+        yield ("replica_ready", "gauge", "Реплика синхронизирована хотя бы раз", [({}, int(replica.ready))])
+        if replica.ready:
+            yield ("replica_lag_seconds", "gauge", "Отставание реплики от API", [({}, replica.lag)])
+            yield ("replica_rows", "gauge", "Строк в реплике по таблицам",
+                   [({"table": table}, count) for table, count in replica.counts().items()])
+        yield ("replica_syncs_total", "counter", "Проходы синхронизации реплики по виду",
+               [({"kind": "full"}, replica.full_syncs), ({"kind": "incremental"}, replica.syncs - replica.full_syncs)])
+        yield ("replica_sync_errors_total", "counter", "Ошибки синхронизации реплики", [({}, replica.sync_errors)])
+        yield ("replica_rows_changed_total", "counter", "Строки, измененные синхронизацией",
+               [({}, replica.rows_changed)])
+        yield ("replica_last_sync_seconds", "gauge", "Длительность последней синхронизации",
+               [({}, replica.last_sync_seconds)])
+
+    yield ("search_index_ready", "gauge", "Поисковый индекс построен", [({}, int(task_index.ready))])
+    yield ("search_index_tasks", "gauge", "Задач в поисковом индексе", [({}, len(task_index.tasks))])
+    yield ("search_index_terms", "gauge", "Слов в поисковом индексе", [({}, len(task_index.terms))])
+    yield ("search_index_bytes", "gauge", "Приблизительный размер поискового индекса (на момент построения)",
+           [({}, task_index.memory_bytes)])
+    yield ("search_index_build_seconds", "gauge", "Длительность последнего построения индекса",
+           [({}, task_index.build_seconds)])
+    yield ("search_queries_total", "counter", "Поисковые запросы /find", [({}, task_index.searches)])
+
+    yield ("user_cache_hits_total", "counter", "Попадания в кэш профилей", [({}, api.user_cache.hits)])
+    yield ("user_cache_misses_total", "counter", "Промахи кэша профилей", [({}, api.user_cache.misses)])
+    yield ("user_cache_entries", "gauge", "Профилей в кэше", [({}, len(api.user_cache))])
+
+    single_flight = api.single_flight_stats
+    yield ("api_single_flight_hits_total", "counter", "GET-запросы, получившие результат чужого запроса",
+           [({}, single_flight["hits"])])
+    yield ("api_single_flight_inflight", "gauge", "Выполняющиеся объединяемые GET-запросы",
+           [({}, single_flight["inflight"])])
+
+    if api.response_cache is not None:
+        stats = api.response_cache.stats()
+        yield ("api_response_cache_requests_total", "counter", "Запросы к кэшу ответов API по результату",
+               [({"result": result}, stats[result]) for result in ("hits", "revalidated", "misses")])
+        yield ("api_response_cache_bytes", "gauge", "Размер кэша ответов API", [({}, stats["bytes"])])
+
+    yield ("album_assembled_total", "counter", "Собранные альбомы", [({}, album_middleware.albums_total)])
+    yield ("album_assembly_seconds_sum", "counter", "Суммарное время сборки альбомов",
+           [({}, album_middleware.latency_sum)])
+    yield ("album_assembly_seconds_max", "gauge", "Максимальное время сборки альбома",
+           [({}, album_middleware.latency_max)])
+    yield ("album_pending", "gauge", "Собираемые альбомы", [({}, len(album_middleware.album_data))])
+
+    yield ("outbox_pending", "gauge", "Неотправленные уведомления", [({}, outbox.pending)])
+    yield ("outbox_notifications_total", "counter", "Уведомления в очереди по результату",
+           [({"result": "enqueued"}, outbox.enqueued), ({"result": "delivered"}, outbox.delivered),
+            ({"result": "dropped"}, outbox.dropped)])
+    yield ("outbox_digests_total", "counter", "Отправленные сводки уведомлений", [({}, outbox.digests)])
+    yield ("outbox_retries_total", "counter", "Повторы отправки уведомлений", [({}, outbox.retried)])
+
+    yield ("send_messages_total", "counter", "Отправленные запросы к Bot API", [({}, sender.sent)])
+    yield ("send_retries_total", "counter", "Повторы после flood control", [({}, sender.retried)])
+    yield ("send_queued_total", "counter", "Запросы, ожидавшие глобального лимита", [({}, sender.queued)])
+
+    if isinstance(dp.storage, SQLiteStorage):
+        yield ("fsm_flushes_total", "counter", "Записи пачек FSM в SQLite", [({}, dp.storage.flushes)])
+        yield ("fsm_flushed_rows_total", "counter", "Строки FSM, записанные в SQLite", [({}, dp.storage.flushed_rows)])
+
+def setup_dispatcher():
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    # Подключаем роутеры
+    for router in routers:
+        dp.include_router(router)
+
+    # Подключаем мидлвари (outer - профиль нужен фильтрам до выбора хендлера)
+    if tracer is not None:
+        dp.update.outer_middleware(TracingMiddleware(tracer))
+        bot.session.middleware(BotTracingMiddleware())
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.message.outer_middleware(TimedMiddleware(UserMiddleware(), "user"))
+    # dp.message.middleware(AlbumMiddleware())
+    # Повторные нажатия по задаче отбрасываются до загрузки профиля
+    dp.callback_query.outer_middleware(TimedMiddleware(
+        TaskCallbackGuardMiddleware(window=config.callback_dedupe_window), "callback_guard"
+    ))
+    dp.callback_query.outer_middleware(TimedMiddleware(UserMiddleware(), "user"))
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+
+    registry.add_collector(collect_runtime_metrics)
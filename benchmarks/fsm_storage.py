@@ -0,0 +1,85 @@
+"""
+Сравнение FSM-хранилищ на сценарии сборки черновика задачи.
+
+Повторяет обращения к FSM из appendStateMedia / update_messages_to_delete /
+answer_send_task_state: на каждое вложение get_data + update_data + get_data.
+
+Перед замером проверяется, что истекшая запись не "оживает": после записи
+только состояния данные истекшей записи пусты.
+
+Запуск: python -m benchmarks.fsm_storage [черновиков] [вложений]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from utils.fsm_storage import SQLiteStorage
+
+
+async def draft_flow(storage: BaseStorage, drafts: int, attachments: int) -> int:
+    operations = 0
+    for draft in range(drafts):
+        key = StorageKey(bot_id=1, chat_id=draft, user_id=draft)
+        await storage.set_state(key, "PostStates:waiting_for_media")
+        for number in range(attachments):
+            data = await storage.get_data(key)
+            media = list(data.get("media", []))
+            media.append({"message_id": str(number), "file_id": f"file-{draft}-{number}", "content_type": "photo"})
+            await storage.update_data(key, {"media": media})
+            await storage.update_data(key, {"messages_to_delete": [[draft, number]] * (number + 1)})
+            await storage.get_data(key)
+            operations += 4
+            # Следующее сообщение - отдельный апдейт: даем циклу событий отработать
+            await asyncio.sleep(0)
+        await storage.set_data(key, {})
+        operations += 1
+    return operations
+
+
+async def check_expired(path: str):
+    """Запись только состояния в истекшую строку не возвращает ее старые данные"""
+    storage = SQLiteStorage(path, ttl=0.2)
+    key = StorageKey(bot_id=1, chat_id=1, user_id=1)
+    await storage.set_state(key, "PostStates:waiting_for_media")
+    await storage.set_data(key, {"media": ["old"]})
+    await storage.flush()
+    await asyncio.sleep(0.3)
+    await storage.set_state(key, "PostStates:waiting_for_text")
+    await storage.flush()
+    data = await storage.get_data(key)
+    await storage.close()
+    assert data == {}, f"истекшие данные вернулись: {data}"
+    print("истекшая запись: данные сброшены")
+
+
+async def measure(name: str, storage: BaseStorage, drafts: int, attachments: int):
+    started = time.perf_counter()
+    operations = await draft_flow(storage, drafts, attachments)
+    await storage.close()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<20} {operations:>8} оп. {elapsed:>8.3f} с {operations / elapsed:>10.0f} оп/с "
+          f"{elapsed / operations * 1e6:>8.1f} мкс/оп")
+
+
+async def main(drafts: int, attachments: int):
+    await measure("MemoryStorage", MemoryStorage(), drafts, attachments)
+    with tempfile.TemporaryDirectory() as directory:
+        await check_expired(os.path.join(directory, "expired.sqlite3"))
+        path = os.path.join(directory, "bench.sqlite3")
+        storage = SQLiteStorage(path, ttl=3600)
+        await measure("SQLiteStorage", storage, drafts, attachments)
+        print(f"{'':<20} сбросов в базу: {storage.flushes}, записано строк: {storage.flushed_rows}")
+        storage = SQLiteStorage(os.path.join(directory, "nobatch.sqlite3"), ttl=3600, flush_interval=0)
+        await measure("SQLite без батчей", storage, drafts, attachments)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        drafts=int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        attachments=int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    ))
@@ -0,0 +1,347 @@
+"""
+Нагрузочный прогон бота целиком: настоящий диспетчер, хендлеры, мидлвари и
+TaskManagementAPI против заглушек API задач и Bot API (benchmarks/stubs.py).
+
+Сценарии:
+  albums     - постановщики присылают альбомы с подписью и отправляют задачу в группу;
+  fanout     - постановщики смотрят предпросмотр, выбирают все свои группы и рассылают
+               задачу с альбомом (--no-preview - без предпросмотра);
+  take_race  - несколько исполнителей одновременно нажимают "Взять задачу"
+               (одновременные нажатия отсекаются до API, опоздавшие получают от API 409
+               и ответ "уже взята"; --redeliver - каждый апдейт доставляется дважды);
+  admin_pages - администраторы листают списки задач и открывают карточки задач
+               (из локальной реплики; --no-replica - напрямую из API);
+  find       - администраторы и постановщики ищут задачи командой /find и открывают
+               найденные карточки.
+
+Для каждого сценария выводятся пропускная способность, p50/p95/p99 времени
+обработки апдейта и количество запросов к API и Bot API на апдейт.
+Ограничения частоты отправки SendScheduler по умолчанию подняты, чтобы
+измерять сам бот; --real-limits оставляет значения из конфигурации.
+
+Запуск: python -m benchmarks.load [--scenario albums] [--api-latency 0.02] ...
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from aiogram.client.telegram import TelegramAPIServer
+
+from benchmarks.stubs import FakeBotAPI, StubTaskAPI, start_app
+
+# loader.py создает бота при импорте - для замеров достаточно токена правильного формата
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+
+BOT_ID = 123456
+GROUP_ID = -1001000000000
+CREATOR_BASE = 1_000_000
+EXECUTOR_BASE = 2_000_000
+ADMIN_BASE = 3_000_000
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+
+def _chat(chat_id: int) -> Dict[str, Any]:
+    if chat_id < 0:
+        return {"id": chat_id, "type": "supergroup", "title": "Group"}
+    return {"id": chat_id, "type": "private", "first_name": f"User{chat_id}"}
+
+
+def message_update(user_id: int, chat_id: int, **fields: Any) -> Dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": _chat(chat_id),
+            "from": _user(user_id),
+            **fields
+        }
+    }
+
+
+def callback_update(user_id: int, chat_id: int, data: str) -> Dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": next(_message_ids),
+                "date": int(time.time()),
+                "chat": _chat(chat_id),
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Bot"},
+                "text": "..."
+            }
+        }
+    }
+
+
+def photo(file_number: int) -> List[Dict[str, Any]]:
+    return [{"file_id": f"photo-{file_number}", "file_unique_id": f"unique-{file_number}", "width": 1280, "height": 960}]
+
+
+# Сценарии: список участников, у каждого - шаги; апдейты одного шага отправляются
+# одновременно (части альбома), шаги участника - по очереди, участники - параллельно
+
+def albums_scenario(stub: StubTaskAPI, creators: int, photos: int, rounds: int) -> List[List[List[dict]]]:
+    actors = []
+    for index in range(creators):
+        creator_id = CREATOR_BASE + index
+        stub.add_user(creator_id, "creator")
+        stub.creator_groups.setdefault(creator_id, set()).add(GROUP_ID)
+        steps = []
+        for round_number in range(rounds):
+            media_group_id = f"album-{creator_id}-{round_number}"
+            steps.append([
+                message_update(
+                    creator_id, creator_id,
+                    media_group_id=media_group_id,
+                    photo=photo(creator_id * 100 + part),
+                    **({"caption": f"Задача от {creator_id}, раунд {round_number}"} if part == 0 else {})
+                )
+                for part in range(photos)
+            ])
+            steps.append([callback_update(creator_id, creator_id, f"send_task:{GROUP_ID}")])
+        actors.append(steps)
+    return actors
+
+
+def fanout_scenario(stub: StubTaskAPI, creators: int, groups: int, photos: int,
+                    preview: bool = True) -> List[List[List[dict]]]:
+    actors = []
+    for index in range(creators):
+        creator_id = CREATOR_BASE + 500_000 + index
+        stub.add_user(creator_id, "creator")
+        for number in range(groups):
+            group_id = GROUP_ID - 1000 * (index + 1) - number
+            stub.add_group(group_id, f"Магазин {index}-{number}", creators=[creator_id])
+        media_group_id = f"fanout-{creator_id}"
+        actors.append([
+            [
+                message_update(
+                    creator_id, creator_id,
+                    media_group_id=media_group_id,
+                    photo=photo(creator_id * 100 + part),
+                    **({"caption": f"Рассылка от {creator_id}"} if part == 0 else {})
+                )
+                for part in range(photos)
+            ],
+            *([[callback_update(creator_id, creator_id, "check_task")]] if preview else []),
+            [callback_update(creator_id, creator_id, "get_groups_list")],
+            [callback_update(creator_id, creator_id, "toggle_all_groups")],
+            [callback_update(creator_id, creator_id, "send_selected")],
+        ])
+    return actors
+
+
+def take_race_scenario(stub: StubTaskAPI, tasks: int, executors: int,
+                       redeliver: bool = False) -> List[List[List[dict]]]:
+    for index in range(executors):
+        stub.add_user(EXECUTOR_BASE + index, "executor")
+    task_ids = [stub.add_task(f"Задача {number}", CREATOR_BASE, GROUP_ID)["task_id"] for number in range(tasks)]
+    # redeliver: каждый апдейт приходит дважды (повтор доставки вебхука - тот же callback_query_id)
+    copies = 2 if redeliver else 1
+    return [
+        [[callback_update(EXECUTOR_BASE + index, GROUP_ID, f"take_task:{task_id}")] * copies for task_id in task_ids]
+        for index in range(executors)
+    ]
+
+
+def admin_pages_scenario(stub: StubTaskAPI, admins: int, pages: int, tasks: int) -> List[List[List[dict]]]:
+    for number in range(tasks):
+        stub.add_task(f"Выполненная задача {number}", CREATOR_BASE, GROUP_ID, status="completed")
+    task_ids = [task_id for task_id, task in stub.tasks.items() if task["status"] == "completed"]
+    actors = []
+    for index in range(admins):
+        admin_id = ADMIN_BASE + index
+        stub.add_user(admin_id, "superadmin")
+        steps = [[callback_update(admin_id, admin_id, "completed_tasks")]]
+        for page in range(1, pages):
+            steps.append([callback_update(admin_id, admin_id, f"completed_task:next:{page}")])
+            steps.append([callback_update(admin_id, admin_id, f"task_info:{task_ids[(index + page) % len(task_ids)]}")])
+        actors.append(steps)
+    return actors
+
+
+def find_scenario(stub: StubTaskAPI, users: int, searches: int, tasks: int) -> List[List[List[dict]]]:
+    words = ["Проверить", "выкладку", "ценники", "Ёлочные", "игрушки", "поставку", "остатки", "холодильник"]
+    for number in range(tasks):
+        text = " ".join(words[(number + shift) % len(words)] for shift in range(0, number % 5 + 2))
+        stub.add_task(f"{text} №{number}", CREATOR_BASE + number % users, GROUP_ID)
+    queries = ["провер", "елочн игрушк", "ценник поставк", "холодил", "остатк выкладк"]
+    actors = []
+    for index in range(users):
+        # Половина ищет как администратор (по всем задачам), половина - как постановщик (по своим)
+        user_id = ADMIN_BASE + index if index % 2 else CREATOR_BASE + index
+        stub.add_user(user_id, "superadmin" if index % 2 else "creator")
+        own = [task_id for task_id, task in stub.tasks.items() if task["created_by"] == user_id] or [1]
+        steps = []
+        for number in range(searches):
+            steps.append([message_update(user_id, user_id, text=f"/find {queries[(index + number) % len(queries)]}")])
+            steps.append([callback_update(user_id, user_id, f"task_info:{own[number % len(own)]}")])
+        actors.append(steps)
+    return actors
+
+
+def percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+async def run_scenario(name: str, actors: List[List[List[dict]]], dp, bot, stub: StubTaskAPI, fake_bot: FakeBotAPI):
+    from aiogram.types import Update
+
+    latencies: List[float] = []
+    errors: Counter = Counter()
+
+    async def feed(raw: dict):
+        update = Update.model_validate(raw, context={"bot": bot})
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            errors[f"{type(e).__name__}: {e}"[:100]] += 1
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    async def act(steps: List[List[dict]]):
+        for step in steps:
+            await asyncio.gather(*(feed(raw) for raw in step))
+
+    api_calls, bot_calls = stub.total_calls, fake_bot.total_calls
+    started = time.perf_counter()
+    await asyncio.gather(*(act(steps) for steps in actors))
+    elapsed = time.perf_counter() - started
+
+    updates = len(latencies)
+    print(
+        f"{name:<12} {updates:>7} {updates / elapsed:>10.1f} "
+        f"{percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 95) * 1000:>9.1f} "
+        f"{percentile(latencies, 99) * 1000:>9.1f} "
+        f"{(stub.total_calls - api_calls) / updates:>9.2f} {(fake_bot.total_calls - bot_calls) / updates:>9.2f} "
+        f"{sum(errors.values()):>7}"
+    )
+    for error, count in errors.most_common(3):
+        print(f"  {count:>5} x {error}")
+
+
+async def main(args: argparse.Namespace):
+    stub = StubTaskAPI(latency=args.api_latency, error_rate=args.api_errors)
+    fake_bot = FakeBotAPI(latency=args.bot_latency, error_rate=args.bot_errors, bot_id=BOT_ID)
+    stub.add_group(GROUP_ID, "Нагрузочная группа")
+    api_runner, api_port = await start_app(stub.app())
+    bot_runner, bot_port = await start_app(fake_bot.app())
+
+    # Конфигурация читается при импорте loader.py
+    os.environ["API_HOST"] = "127.0.0.1"
+    os.environ["API_PORT"] = str(api_port)
+    # Снимок кэшей от предыдущего прогона исказил бы холодный старт,
+    # а недоставленные уведомления - следующий прогон
+    os.environ.setdefault("CACHE_SNAPSHOT_PATH", "")
+    workdir = tempfile.mkdtemp(prefix="load-")
+    os.environ.setdefault("OUTBOX_PATH", os.path.join(workdir, "outbox.sqlite3"))
+    os.environ.setdefault("REPLICA_PATH", "" if args.no_replica else os.path.join(workdir, "replica.sqlite3"))
+    if not args.real_limits:
+        for name in ("SEND_GLOBAL_RATE", "SEND_GROUP_PER_MINUTE"):
+            os.environ[name] = "1000000"
+
+    from loader import dp, bot, api, replica, task_index
+    from app import setup_dispatcher
+    from utils.metrics import CALLBACK_SUPPRESSED
+
+    bot.session.api = TelegramAPIServer.from_base(f"http://127.0.0.1:{bot_port}")
+    setup_dispatcher()
+    # Журнал каждого апдейта и HTTP-запроса искажает замер
+    logging.getLogger().setLevel(args.log_level)
+
+    scenarios = {
+        "albums": lambda: albums_scenario(stub, args.creators, args.photos, args.rounds),
+        "fanout": lambda: fanout_scenario(
+            stub, args.fanout_creators, args.fanout_groups, args.photos, not args.no_preview
+        ),
+        "take_race": lambda: take_race_scenario(stub, args.tasks, args.executors, args.redeliver),
+        "admin_pages": lambda: admin_pages_scenario(stub, args.admins, args.pages, args.list_tasks),
+        "find": lambda: find_scenario(stub, args.admins, args.pages, args.list_tasks),
+    }
+    selected = list(scenarios) if args.scenario == "all" else [args.scenario]
+    # Данные сценариев добавляются до старта, чтобы справочник групп и кэши видели их как при обычной работе
+    prepared = {name: scenarios[name]() for name in selected}
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    if replica is not None:
+        # Списки администратора читаются из реплики только после первой синхронизации
+        while not replica.ready:
+            await asyncio.sleep(0.05)
+        print(f"Реплика синхронизирована за {replica.last_sync_seconds:.3f} с: {replica.counts()}")
+    while not task_index.ready:
+        await asyncio.sleep(0.05)
+    print(f"Поисковый индекс: {len(task_index.tasks)} задач за {task_index.build_seconds:.3f} с, "
+          f"~{task_index.memory_bytes / 1024 / 1024:.1f} МБ")
+    try:
+        print(f"{'сценарий':<12} {'апдейтов':>7} {'апдейт/с':>10} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} "
+              f"{'API/апд':>9} {'Bot/апд':>9} {'ошибок':>7}")
+        for name in selected:
+            await run_scenario(name, prepared[name], dp, bot, stub, fake_bot)
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await dp.storage.close()
+        await bot.session.close()
+        await api.close()
+        await api_runner.cleanup()
+        await bot_runner.cleanup()
+
+    print("\nЗапросы к API задач:")
+    for endpoint, count in stub.calls.most_common():
+        print(f"  {endpoint:<40} {count:>7}")
+    print("Запросы к Bot API:")
+    for method, count in fake_bot.calls.most_common():
+        print(f"  {method:<40} {count:>7}")
+    if CALLBACK_SUPPRESSED.values:
+        print("Подавленные нажатия кнопок задач:")
+        for (action, reason), count in sorted(CALLBACK_SUPPRESSED.values.items()):
+            print(f"  {action + ' / ' + reason:<40} {count:>7.0f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон бота на заглушках API")
+    parser.add_argument("--scenario", choices=["all", "albums", "fanout", "take_race", "admin_pages", "find"], default="all")
+    parser.add_argument("--api-latency", type=float, default=0.01, help="Средняя задержка API задач, с")
+    parser.add_argument("--api-errors", type=float, default=0.0, help="Доля ответов 500 от API задач")
+    parser.add_argument("--bot-latency", type=float, default=0.03, help="Средняя задержка Bot API, с")
+    parser.add_argument("--bot-errors", type=float, default=0.0, help="Доля ответов 500 от Bot API")
+    parser.add_argument("--real-limits", action="store_true", help="Ограничения частоты отправки из конфигурации")
+    parser.add_argument("--creators", type=int, default=20)
+    parser.add_argument("--photos", type=int, default=5, help="Частей в альбоме")
+    parser.add_argument("--rounds", type=int, default=3, help="Альбомов на постановщика")
+    parser.add_argument("--fanout-creators", type=int, default=5, help="Постановщиков в рассылке")
+    parser.add_argument("--fanout-groups", type=int, default=20, help="Групп у каждого постановщика")
+    parser.add_argument("--no-preview", action="store_true", help="Рассылка без предпросмотра")
+    parser.add_argument("--tasks", type=int, default=50, help="Задач в гонке")
+    parser.add_argument("--executors", type=int, default=10, help="Исполнителей на задачу")
+    parser.add_argument("--redeliver", action="store_true", help="take_race: каждый апдейт доставляется дважды")
+    parser.add_argument("--admins", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20, help="Страниц на администратора")
+    parser.add_argument("--list-tasks", type=int, default=2000, help="Выполненных задач в списке")
+    parser.add_argument("--no-replica", action="store_true", help="Списки администратора - напрямую из API")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,132 @@
+"""
+Декодирование ответа со списком задач: словари против моделей utils.models.
+
+"dict"           - json.loads, как сейчас в TaskManagementAPI (даты остаются строками);
+"dict + даты"    - json.loads и разбор created_at каждой задачи и истории (что приходится
+                   делать хендлерам, чтобы сравнивать даты);
+"модели"         - utils.models.get_decoder(List[Task]): msgspec, если установлен,
+                   иначе json.loads с преобразованием в dataclass со __slots__.
+
+Память - прирост tracemalloc, занятый результатом декодирования.
+
+Перед замером проверяется декодирование задач с null во всех полях, кроме ID.
+
+Запуск: python -m benchmarks.models [задач] [повторов]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+from utils import models
+from utils.models import Task, get_decoder
+
+
+def make_body(count: int) -> bytes:
+    now = datetime.now()
+    tasks = []
+    for task_id in range(count):
+        created_at = (now - timedelta(minutes=task_id)).strftime('%Y-%m-%d %H:%M:%S')
+        tasks.append({
+            "task_id": task_id,
+            "task_message": f"Проверить выкладку товара на витрине магазина №{task_id}",
+            "created_by": 1000 + task_id % 50,
+            "group_id": -100500 - task_id % 10,
+            "status": "completed",
+            "created_at": created_at,
+            "completion_note": None,
+            "taken_by": [{"user_id": 2000 + task_id % 300, "name": "Исполнитель"}],
+            "history": [
+                {"status": "new", "user_id": 1000, "created_at": created_at, "comment": None},
+                {"status": "completed", "user_id": 2000, "created_at": created_at, "comment": "Готово"}
+            ]
+        })
+    return json.dumps({"data": tasks, "message": None, "total": count}, ensure_ascii=False).encode()
+
+
+def decode_dict(body: bytes):
+    return json.loads(body)["data"]
+
+
+def decode_dict_dates(body: bytes):
+    tasks = json.loads(body)["data"]
+    for task in tasks:
+        task["created_at"] = datetime.strptime(task["created_at"], '%Y-%m-%d %H:%M:%S')
+        for entry in task["history"]:
+            entry["created_at"] = datetime.strptime(entry["created_at"], '%Y-%m-%d %H:%M:%S')
+    return tasks
+
+
+def decode_models(body: bytes):
+    return get_decoder(List[Task])(body).data
+
+
+def check_nulls():
+    """null в любом поле, кроме ID, декодируется в None - одинаково в msgspec и dataclass"""
+    body = json.dumps({"data": [{
+        "task_id": 1,
+        "task_message": None,
+        "created_at": None,
+        "created_by": None,
+        "group_id": None,
+        "status": None,
+        "completion_note": None,
+        "taken_by": [{"user_id": 2, "name": None, "type": None, "is_banned": None}],
+        "attachments": [{"file_id": None, "file_type": None, "file_name": None}],
+        "history": [{"status": None, "created_at": None, "comment": None}]
+    }, {
+        "task_id": 2,
+        "created_at": "2024-01-01 10:00:00",
+        "taken_by": None,
+        "attachments": None,
+        "history": None
+    }]}).encode()
+    task, other = get_decoder(List[Task])(body).data
+    user, = task.taken_by
+    attachment, = task.attachments
+    entry, = task.history
+    values = [task.task_message, task.created_at, task.status, user.name, user.type, user.is_banned,
+              attachment.file_id, attachment.file_name, entry.status, entry.created_at,
+              other.taken_by, other.attachments, other.history]
+    assert all(value is None for value in values), values
+    assert other.status == "" and other.created_at == datetime(2024, 1, 1, 10), other
+    print("null в необязательных полях: декодировано в None")
+
+
+def measure(name: str, decode, body: bytes, repeats: int):
+    decode(body)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        decode(body)
+    elapsed = (time.perf_counter() - started) / repeats
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = decode(body)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+
+    print(f"{name:<14} {elapsed * 1000:>10.2f} мс {retained / 1024 / 1024:>10.2f} МБ")
+
+
+def main(count: int, repeats: int):
+    body = make_body(count)
+    backend = "msgspec" if models.msgspec is not None else "dataclass(slots=True)"
+    check_nulls()
+    print(f"Задач: {count}, тело ответа: {len(body) / 1024 / 1024:.2f} МБ, модели: {backend}")
+    print(f"{'':<14} {'декодирование':>13} {'память':>13}")
+    measure("dict", decode_dict, body, repeats)
+    measure("dict + даты", decode_dict_dates, body, repeats)
+    measure("модели", decode_models, body, repeats)
+
+
+if __name__ == "__main__":
+    main(
+        count=int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        repeats=int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    )
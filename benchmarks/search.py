@@ -0,0 +1,87 @@
+"""
+Поиск задач: построение индекса utils.search и время запроса /find.
+
+"индекс"   - TaskSearchIndex.search (все слова, поиск по началу слова);
+"перебор"  - проверка каждой задачи подстрокой без индекса (нижняя граница
+             того, что пришлось бы делать, листая весь список).
+
+Память индекса - оценка TaskSearchIndex.estimate_memory и прирост tracemalloc.
+
+Запуск: python -m benchmarks.search [задач] [запросов]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from utils.search import TaskSearchIndex, tokenize
+
+WORDS = (
+    "Проверить выкладку товара на витрине магазина заменить ценники в отделе молочной продукции "
+    "Ёлочные игрушки разложить по полкам Убрать склад принять поставку от поставщика пересчитать "
+    "остатки кассы оформить возврат клиенту позвонить в сервис починить холодильник"
+).split()
+
+QUERIES = ["провер витрин", "ценник", "елочн", "поставк поставщ", "холодил", "касс возврат", "магазина №12"]
+
+
+def make_tasks(count: int):
+    rng = random.Random(1)
+    return [
+        {
+            "task_id": task_id,
+            "task_message": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 25))) + f" магазина №{task_id % 500}",
+            "created_by": task_id % 50,
+            "status": "completed" if task_id % 3 else "new"
+        }
+        for task_id in range(count)
+    ]
+
+
+def scan(tasks, query: str):
+    words = tokenize(query)
+    return [
+        task for task in tasks
+        if all(any(term.startswith(word) for term in tokenize(task["task_message"])) for word in words)
+    ]
+
+
+def measure(name: str, queries: int, run):
+    started = time.perf_counter()
+    for number in range(queries):
+        run(QUERIES[number % len(QUERIES)])
+    print(f"{name:<12} {(time.perf_counter() - started) / queries * 1000:>10.3f} мс/запрос")
+
+
+def main(count: int, queries: int):
+    tasks = make_tasks(count)
+    index = TaskSearchIndex(api=None)
+
+    index.build(tasks)
+    build_seconds = index.build_seconds
+    # Повторное построение под tracemalloc - только ради памяти (трассировка замедляет построение)
+    tracemalloc.start()
+    index.build(tasks)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"задач: {len(index.tasks)}, слов: {len(index.terms)}")
+    print(f"построение: {build_seconds:.3f} с, память: ~{index.memory_bytes / 1024 / 1024:.1f} МБ "
+          f"(tracemalloc: {traced / 1024 / 1024:.1f} МБ)")
+
+    started = time.perf_counter()
+    for task in tasks[:1000]:
+        index.add({**task, "status": "completed"})
+    print(f"обновление: {(time.perf_counter() - started) / 1000 * 1e6:.1f} мкс/задача")
+
+    for query in QUERIES:
+        print(f"  {query!r:<22} найдено: {len(index.search(query))}")
+    measure("индекс", queries, index.search)
+    measure("постановщик", queries, lambda query: index.search(query, created_by=7))
+    measure("перебор", max(1, queries // 100), lambda query: scan(tasks, query))
+
+
+if __name__ == "__main__":
+    main(
+        count=int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        queries=int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    )
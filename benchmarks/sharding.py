@@ -0,0 +1,153 @@
+"""
+Пропускная способность обработки апдейтов: один процесс против N рабочих процессов.
+
+Рабочие процессы получают синтетические callback_query и выполняют типичную
+для бота CPU-нагрузку: разбор JSON, валидацию моделей aiogram, маршрутизацию
+и сборку клавиатуры. Обращений к сети нет.
+
+Перед замером проверяется, что альбом из 3 частей, пришедший через
+ShardedIntake, доходит до хендлера целиком (AlbumMiddleware в рабочем процессе).
+
+Запуск: python -m benchmarks.sharding [апдейтов] [процессов ...]
+"""
+import asyncio
+import functools
+import json
+import multiprocessing
+import sys
+import time
+
+from aiogram import Bot, Dispatcher, F
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
+
+from keyboards.pagination import get_pagination_kb
+from middlewares.album_middleware import AlbumMiddleware
+from sharding import ShardedIntake, process_updates
+
+BOT_TOKEN = "123456:benchmark"
+
+
+def build_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.callback_query(F.data.startswith("completed_task:"))
+    async def page(query: CallbackQuery):
+        _, action, number = query.data.split(":")
+        items = [[InlineKeyboardButton(text=f"Задача {i} " * 3, callback_data=f"task_info:{i}")] for i in range(300)]
+        kb = get_pagination_kb(items=items, caption="completed_task", page=int(number))
+        InlineKeyboardMarkup(inline_keyboard=kb).model_dump_json()
+
+    return dp
+
+
+def make_updates(count: int, chats: int = 500):
+    for update_id in range(count):
+        chat_id = 1000 + update_id % chats
+        yield {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "chat_instance": "1",
+                "data": f"completed_task:next:{update_id % 20 + 1}",
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+                "message": {
+                    "message_id": update_id,
+                    "date": 0,
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": "Выберите задачу для просмотра"
+                }
+            }
+        }
+
+
+def worker(index: int, workers: int, updates: multiprocessing.Queue):
+    async def run():
+        bot = Bot(BOT_TOKEN)
+        await process_updates(updates, build_dispatcher(), bot)
+        await bot.session.close()
+
+    asyncio.run(run())
+
+
+def album_worker(albums: multiprocessing.Queue, index: int, workers: int, updates: multiprocessing.Queue):
+    async def run():
+        dp, bot = Dispatcher(), Bot(BOT_TOKEN)
+        dp.message.middleware(AlbumMiddleware(quiet_period=0.2))
+
+        @dp.message(F.photo)
+        async def album(message: Message, album=None):
+            albums.put(len(album or [message]))
+
+        await process_updates(updates, dp, bot)
+        await bot.session.close()
+
+    asyncio.run(run())
+
+
+def make_album(parts: int = 3, chat_id: int = 1000):
+    for number in range(parts):
+        yield {
+            "update_id": number,
+            "message": {
+                "message_id": number,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+                "media_group_id": "album",
+                "photo": [{"file_id": f"photo{number}", "file_unique_id": f"photo{number}", "width": 1, "height": 1}]
+            }
+        }
+
+
+async def check_album(workers: int = 2):
+    """Альбом из 3 частей через ShardedIntake доходит до хендлера одним вызовом"""
+    albums = multiprocessing.get_context("spawn").Queue()
+    intake = ShardedIntake(workers=workers, target=functools.partial(album_worker, albums))
+    intake.start()
+    for update in make_album():
+        await intake.dispatch(update)
+    await intake.stop()
+    sizes = []
+    while not albums.empty():
+        sizes.append(albums.get())
+    assert sizes == [3], f"альбом разбит на части: {sizes}"
+    print(f"альбом через {workers} процесса: {sizes[0]} части в одном вызове хендлера")
+
+
+async def single_process(count: int) -> float:
+    dp, bot = build_dispatcher(), Bot(BOT_TOKEN)
+    started = time.perf_counter()
+    for update in make_updates(count):
+        raw = json.dumps(update)
+        await dp.feed_update(bot, Update.model_validate(json.loads(raw), context={"bot": bot}))
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+    return elapsed
+
+
+async def sharded(count: int, workers: int) -> float:
+    intake = ShardedIntake(workers=workers, target=worker, queue_size=10000)
+    intake.start()
+    # Прогрев: ждем запуска процессов, чтобы не мерить время импорта
+    await asyncio.sleep(3)
+    started = time.perf_counter()
+    for update in make_updates(count):
+        await intake.dispatch(update)
+    await intake.stop()
+    return time.perf_counter() - started
+
+
+async def main(count: int, workers_options):
+    await check_album()
+    elapsed = await single_process(count)
+    print(f"{'один процесс':<16} {count / elapsed:>10.0f} апд/с")
+    for workers in workers_options:
+        elapsed = await sharded(count, workers)
+        print(f"{f'{workers} процесс(а)':<16} {count / elapsed:>10.0f} апд/с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        count=int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        workers_options=[int(value) for value in sys.argv[2:]] or [1, 2, 4]
+    ))
@@ -0,0 +1,559 @@
+"""
+Заглушки внешних сервисов для нагрузочных замеров: API задач и Bot API.
+
+Оба сервера работают в том же процессе на aiohttp, хранят данные в памяти
+и считают вызовы по шаблонам эндпоинтов (/tasks/{id}/take) и методам Bot API.
+Задержка и доля ошибок настраиваются.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+from utils.metrics import endpoint_template
+
+
+def _ok(data: Any = None, message: Optional[str] = None, total: Optional[int] = None, status: int = 200):
+    body = {"data": data, "message": message}
+    if total is not None:
+        body["total"] = total
+    return web.json_response(body, status=status)
+
+
+def _error(status: int, detail: str):
+    return web.json_response({"detail": detail}, status=status)
+
+
+class Latency:
+    """Задержка ответа: среднее значение с равномерным разбросом jitter (доля от среднего)"""
+
+    def __init__(self, mean: float = 0.0, jitter: float = 0.5):
+        self.mean = mean
+        self.jitter = jitter
+
+    async def sleep(self):
+        if self.mean > 0:
+            await asyncio.sleep(self.mean * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+class StubTaskAPI:
+    """
+    Заглушка API задач со всеми эндпоинтами, которые использует TaskManagementAPI.
+
+    Ответы имеют тот же формат, что у настоящего API: {"data", "message", "total"}
+    и {"detail"} для ошибок. Списки поддерживают page/page_size.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, bulk_attachments: bool = True,
+                 bulk_tasks: bool = True, events_kept: int = 10000, heartbeat: float = 15.0):
+        """
+        Args:
+            latency: Средняя задержка ответа в секундах
+            error_rate: Доля запросов, на которые отвечать 500
+            bulk_attachments: Поддерживать POST /attachments/bulk
+            bulk_tasks: Поддерживать POST /tasks/bulk
+            events_kept: Сколько последних событий хранить для возобновления потока
+            heartbeat: Период комментариев-пингов в потоке событий, с
+        """
+        self.latency = Latency(latency)
+        self.error_rate = error_rate
+        self.bulk_attachments = bulk_attachments
+        self.bulk_tasks = bulk_tasks
+
+        self.users: Dict[int, dict] = {}
+        self.groups: Dict[int, dict] = {}
+        self.creator_groups: Dict[int, set] = {}
+        self.tasks: Dict[int, dict] = {}
+        self.history: Dict[int, List[dict]] = {}
+        self.attachments: Dict[int, List[dict]] = {}
+        self._task_ids = itertools.count(1)
+        self._attachment_ids = itertools.count(1)
+
+        self.calls: Counter = Counter()
+
+        # Поток событий об изменениях (/events): последние события для возобновления по Last-Event-ID
+        self.events: Deque[Tuple[int, str, dict]] = deque(maxlen=events_kept)
+        self._event_ids = itertools.count(1)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.heartbeat = heartbeat
+
+    # Наполнение данными
+
+    def add_user(self, user_id: int, user_type: str, name: Optional[str] = None) -> dict:
+        user = self.users[user_id] = {
+            "user_id": user_id,
+            "name": name or f"User {user_id}",
+            "user_name": f"user{user_id}",
+            "type": user_type,
+            "is_banned": False
+        }
+        return user
+
+    def add_group(self, group_id: int, title: Optional[str] = None, creators: List[int] = ()) -> dict:
+        group = self.groups[group_id] = {"group_id": group_id, "title": title or f"Group {group_id}", "is_active": True}
+        for creator in creators:
+            self.creator_groups.setdefault(creator, set()).add(group_id)
+        return group
+
+    def add_task(self, task_message: str, created_by: int, group_id: int, status: str = "new",
+                 created_at: Optional[str] = None) -> dict:
+        task_id = next(self._task_ids)
+        task = self.tasks[task_id] = {
+            "task_id": task_id,
+            "task_message": task_message,
+            "created_by": created_by,
+            "group_id": group_id,
+            "status": status,
+            "created_at": created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "taken_by": [],
+            "completion_note": None
+        }
+        task["updated_at"] = task["created_at"]
+        self.history[task_id] = [{"status": status, "user_id": created_by, "created_at": task["created_at"]}]
+        return task
+
+    # Приложение
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        routes = [
+            ("GET", "/users/all/list", self.list_users),
+            ("GET", "/users/by-type/{type}", self.users_by_type),
+            ("POST", "/users/", self.register_user),
+            ("GET", "/users/{user_id}", self.get_user),
+            ("PUT", "/users/{user_id}/type", self.update_user_type),
+            ("POST", "/users/{user_id}/ban", self.ban_user),
+            ("POST", "/users/{user_id}/unban", self.unban_user),
+            ("GET", "/users/{user_id}/ban-status", self.ban_status),
+            ("GET", "/users/{user_id}/groups", self.get_creator_groups),
+            ("POST", "/users/{user_id}/groups/{group_id}", self.assign_group),
+            ("DELETE", "/users/{user_id}/groups/{group_id}", self.remove_group),
+            ("GET", "/groups/", self.all_groups),
+            ("GET", "/groups/active", self.active_groups),
+            ("POST", "/groups/", self.create_group),
+            ("GET", "/groups/{group_id}", self.get_group),
+            ("PUT", "/groups/{group_id}/status", self.update_group_status),
+            ("POST", "/tasks/", self.create_task),
+            ("POST", "/tasks/bulk", self.create_tasks_bulk),
+            ("GET", "/tasks/completed", self.completed_tasks),
+            ("GET", "/tasks/incomplete", self.incomplete_tasks),
+            ("GET", "/tasks/all", self.all_tasks),
+            ("GET", "/tasks/my", self.my_tasks),
+            ("GET", "/tasks/by-status/{status}", self.tasks_by_status),
+            ("GET", "/tasks/group/{group_id}", self.group_tasks),
+            ("GET", "/tasks/{task_id}/full", self.get_task),
+            ("GET", "/tasks/{task_id}/history", self.task_history),
+            ("PUT", "/tasks/{task_id}", self.update_task),
+            ("POST", "/tasks/{task_id}/take", self.take_task),
+            ("POST", "/tasks/{task_id}/cancel", self.cancel_task),
+            ("POST", "/tasks/{task_id}/complete", self.complete_task),
+            ("POST", "/tasks/{task_id}/status", self.update_task_status),
+            ("POST", "/attachments/", self.add_attachment),
+            ("POST", "/attachments/bulk", self.add_attachments_bulk),
+            ("GET", "/attachments/task/{task_id}", self.task_attachments),
+            ("GET", "/events", self.events_stream),
+        ]
+        for method, path, handler in routes:
+            app.router.add_route(method, path, handler)
+        app.on_shutdown.append(self._close_streams)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.calls[f"{request.method} {endpoint_template(request.path)}"] += 1
+        await self.latency.sleep()
+        if self.error_rate and random.random() < self.error_rate:
+            return _error(500, "Injected error")
+        response = await handler(request)
+        if request.method != "GET" and response.status < 400:
+            self._emit_change(request, response)
+        # Успешные GET-ответы помечаются ETag, совпадающий If-None-Match получает 304
+        if request.method == "GET" and response.status == 200 and isinstance(getattr(response, "body", None), bytes):
+            etag = f'"{hashlib.md5(response.body).hexdigest()}"'
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304, headers={"ETag": etag})
+            response.headers["ETag"] = etag
+        return response
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    @staticmethod
+    def _page(request: web.Request, items: List[dict]):
+        if "page" not in request.query:
+            return _ok(items)
+        page = int(request.query["page"])
+        page_size = int(request.query.get("page_size", 50))
+        start = (page - 1) * page_size
+        return _ok(items[start:start + page_size], total=len(items))
+
+    def _task(self, request: web.Request) -> Optional[dict]:
+        return self.tasks.get(int(request.match_info["task_id"]))
+
+    def _full_task(self, task: dict) -> dict:
+        """Задача с вложениями, историей и именами, как в /tasks/{id}/full"""
+        creator = self.users.get(task["created_by"], {})
+        group = self.groups.get(task["group_id"], {})
+        history = [
+            {**entry, "comment": entry.get("comment"),
+             "user_name": self.users.get(entry["user_id"], {}).get("name", "")}
+            for entry in self.history.get(task["task_id"], [])
+        ]
+        return {
+            **task,
+            "creator_name": creator.get("name", ""),
+            "group_title": group.get("title", ""),
+            "attachments": self.attachments.get(task["task_id"], []),
+            "history": history
+        }
+
+    def _record(self, task: dict, status: str, user_id: int):
+        task["status"] = status
+        task["updated_at"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.history[task["task_id"]].append({
+            "status": status,
+            "user_id": user_id,
+            "created_at": task["updated_at"]
+        })
+
+    # Пользователи
+
+    async def list_users(self, request):
+        return self._page(request, list(self.users.values()))
+
+    async def users_by_type(self, request):
+        return _ok([user for user in self.users.values() if user["type"] == request.match_info["type"]])
+
+    async def register_user(self, request):
+        data = await request.json()
+        user = self.add_user(int(data["user_id"]), data.get("type", "executor"), data.get("name"))
+        user["user_name"] = data.get("user_name")
+        return _ok(user, status=201)
+
+    async def get_user(self, request):
+        user = self.users.get(int(request.match_info["user_id"]))
+        return _ok(user) if user else _error(404, "User not found")
+
+    async def update_user_type(self, request):
+        user = self.users.get(int(request.match_info["user_id"]))
+        if user is None:
+            return _error(404, "User not found")
+        user["type"] = (await request.json())["new_type"]
+        return _ok(user)
+
+    async def _set_banned(self, request, is_banned: bool):
+        user = self.users.get(int(request.match_info["user_id"]))
+        if user is None:
+            return _error(404, "User not found")
+        user["is_banned"] = is_banned
+        return _ok(user)
+
+    async def ban_user(self, request):
+        return await self._set_banned(request, True)
+
+    async def unban_user(self, request):
+        return await self._set_banned(request, False)
+
+    async def ban_status(self, request):
+        user = self.users.get(int(request.match_info["user_id"]))
+        return _ok({"is_banned": user["is_banned"]}) if user else _error(404, "User not found")
+
+    async def get_creator_groups(self, request):
+        group_ids = self.creator_groups.get(int(request.match_info["user_id"]), set())
+        return _ok([self.groups[group_id] for group_id in group_ids if group_id in self.groups])
+
+    async def assign_group(self, request):
+        self.creator_groups.setdefault(int(request.match_info["user_id"]), set()).add(int(request.match_info["group_id"]))
+        return _ok(message="Group assigned")
+
+    async def remove_group(self, request):
+        self.creator_groups.get(int(request.match_info["user_id"]), set()).discard(int(request.match_info["group_id"]))
+        return _ok(message="Group removed")
+
+    # Группы
+
+    async def all_groups(self, request):
+        return _ok(list(self.groups.values()))
+
+    async def active_groups(self, request):
+        return _ok([group for group in self.groups.values() if group["is_active"]])
+
+    async def create_group(self, request):
+        data = await request.json()
+        return _ok(self.add_group(int(data["group_id"]), data.get("title")), status=201)
+
+    async def get_group(self, request):
+        group = self.groups.get(int(request.match_info["group_id"]))
+        return _ok(group) if group else _error(404, "Group not found")
+
+    async def update_group_status(self, request):
+        group = self.groups.get(int(request.match_info["group_id"]))
+        if group is None:
+            return _error(404, "Group not found")
+        group["is_active"] = (await request.json())["is_active"]
+        return _ok(group)
+
+    # Задачи
+
+    async def create_task(self, request):
+        data = await request.json()
+        task = self.add_task(data["task_message"], int(data["created_by"]), int(data["group_id"]))
+        return _ok(task, status=201)
+
+    async def create_tasks_bulk(self, request):
+        if not self.bulk_tasks:
+            return _error(404, "Not Found")
+        data = await request.json()
+        tasks = [
+            self.add_task(item["task_message"], int(item["created_by"]), int(item["group_id"]))
+            for item in data["tasks"]
+        ]
+        return _ok(tasks, status=201)
+
+    async def completed_tasks(self, request):
+        return self._page(request, [task for task in self.tasks.values() if task["status"] == "completed"])
+
+    async def incomplete_tasks(self, request):
+        return self._page(request, [task for task in self.tasks.values() if task["status"] != "completed"])
+
+    async def all_tasks(self, request):
+        # updated_since - включительно: задачи, измененные в ту же секунду, не теряются
+        since = request.query.get("updated_since")
+        return _ok([task for task in self.tasks.values() if since is None or task["updated_at"] >= since])
+
+    async def my_tasks(self, request):
+        user_id = int(request.query["user_id"])
+        status = request.query.get("status")
+        tasks = [task for task in self.tasks.values()
+                 if any(user["user_id"] == user_id for user in task["taken_by"])
+                 and (status is None or task["status"] == status)]
+        return self._page(request, tasks)
+
+    async def tasks_by_status(self, request):
+        return _ok([task for task in self.tasks.values() if task["status"] == request.match_info["status"]])
+
+    async def group_tasks(self, request):
+        group_id = int(request.match_info["group_id"])
+        return _ok([task for task in self.tasks.values() if task["group_id"] == group_id])
+
+    async def get_task(self, request):
+        task = self._task(request)
+        return _ok(self._full_task(task)) if task else _error(404, "Task not found")
+
+    async def task_history(self, request):
+        task = self._task(request)
+        return _ok(self.history[task["task_id"]]) if task else _error(404, "Task not found")
+
+    async def update_task(self, request):
+        task = self._task(request)
+        if task is None:
+            return _error(404, "Task not found")
+        data = await request.json()
+        task["status"] = data.get("status", task["status"])
+        task["completion_note"] = data.get("completion_note")
+        task["updated_at"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return _ok(task)
+
+    async def take_task(self, request):
+        task = self._task(request)
+        if task is None:
+            return _error(404, "Task not found")
+        if task["taken_by"]:
+            return _error(409, "Task already taken")
+        user_id = int(request.query["user_id"])
+        user = self.users.get(user_id, {"user_id": user_id, "name": f"User {user_id}"})
+        task["taken_by"] = [{"user_id": user_id, "name": user["name"]}]
+        self._record(task, "in_progress", user_id)
+        return _ok(task)
+
+    async def cancel_task(self, request):
+        task = self._task(request)
+        if task is None:
+            return _error(404, "Task not found")
+        task["taken_by"] = []
+        self._record(task, "new", int(request.query["user_id"]))
+        return _ok(task)
+
+    async def complete_task(self, request):
+        task = self._task(request)
+        if task is None:
+            return _error(404, "Task not found")
+        task["completion_note"] = (await request.json()).get("completion_note")
+        self._record(task, "completed", int(request.query["user_id"]))
+        return _ok(task)
+
+    async def update_task_status(self, request):
+        task = self._task(request)
+        if task is None:
+            return _error(404, "Task not found")
+        self._record(task, (await request.json())["status"], int(request.query["user_id"]))
+        return _ok(task)
+
+    # Вложения
+
+    def _add_attachment(self, data: dict) -> dict:
+        attachment = {**data, "attachment_id": next(self._attachment_ids)}
+        self.attachments.setdefault(int(data["task_id"]), []).append(attachment)
+        return attachment
+
+    async def add_attachment(self, request):
+        return _ok(self._add_attachment(await request.json()), status=201)
+
+    async def add_attachments_bulk(self, request):
+        if not self.bulk_attachments:
+            return _error(404, "Not Found")
+        data = await request.json()
+        return _ok([self._add_attachment(item) for item in data["attachments"]], status=201)
+
+    async def task_attachments(self, request):
+        return _ok(self.attachments.get(int(request.match_info["task_id"]), []))
+
+    # Поток событий (SSE)
+
+    def emit(self, event: str, data: dict):
+        """Публикация события об изменении (в том числе сделанном в обход API)"""
+        item = (next(self._event_ids), event, data)
+        self.events.append(item)
+        for queue in self._subscribers:
+            queue.put_nowait(item)
+
+    def _emit_change(self, request: web.Request, response: web.Response):
+        """Событие по успешному изменяющему запросу: ресурс - первый сегмент пути"""
+        parts = request.path.strip("/").split("/")
+        data = json.loads(response.body).get("data") if isinstance(response.body, bytes) else None
+        if parts[0] == "users" and len(parts) == 4 and parts[2] == "groups":
+            self.emit("group.assigned" if request.method == "POST" else "group.unassigned",
+                      {"user_id": int(parts[1]), "group_id": int(parts[3])})
+        elif parts[0] in ("users", "groups", "tasks"):
+            resource = parts[0][:-1]
+            for item in data if isinstance(data, list) else [data]:
+                if isinstance(item, dict) and f"{resource}_id" in item:
+                    self.emit(f"{resource}.updated", {resource: item})
+        elif parts[0] == "attachments":
+            for item in data if isinstance(data, list) else [data]:
+                if isinstance(item, dict) and "task_id" in item:
+                    self.emit("task.updated", {"task_id": item["task_id"]})
+
+    async def _close_streams(self, app: web.Application):
+        for queue in self._subscribers:
+            queue.put_nowait(None)
+
+    async def events_stream(self, request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        queue: asyncio.Queue = asyncio.Queue()
+        # Пропущенные события ставятся в очередь до подписки, без await между ними - без дублей
+        last_id = int(request.headers.get("Last-Event-ID") or 0)
+        reset = bool(last_id and self.events and self.events[0][0] > last_id + 1)
+        if last_id:
+            for item in self.events:
+                if item[0] > last_id:
+                    queue.put_nowait(item)
+        self._subscribers.add(queue)
+        try:
+            if reset:
+                # Пропущенные события уже не хранятся - клиент должен сбросить кэши
+                await response.write(b"event: reset\ndata: {}\n\n")
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    await response.write(b": ping\n\n")
+                    continue
+                if item is None:
+                    break
+                event_id, event, data = item
+                payload = json.dumps(data, ensure_ascii=False)
+                await response.write(f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            self._subscribers.discard(queue)
+        return response
+
+
+class FakeBotAPI:
+    """
+    Заглушка Bot API: отвечает на методы, которые вызывает бот, правдоподобными объектами.
+
+    Адрес для TelegramAPIServer.from_base: http://host:port
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, bot_id: int = 123456):
+        """
+        Args:
+            latency: Средняя задержка ответа в секундах
+            error_rate: Доля запросов, на которые отвечать 500
+            bot_id: ID бота (первая часть токена)
+        """
+        self.latency = Latency(latency)
+        self.error_rate = error_rate
+        self.bot_id = bot_id
+        self._message_ids = itertools.count(1_000_000)
+        self.calls: Counter = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def _message(self, chat_id: Any, **fields: Any) -> dict:
+        chat_id = int(chat_id)
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+            "from": {"id": self.bot_id, "is_bot": True, "first_name": "Bot"},
+            **fields
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        data = dict(await request.post())
+        await self.latency.sleep()
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"ok": False, "error_code": 500, "description": "Injected error"}, status=500)
+        return web.json_response({"ok": True, "result": self.result(method, data)})
+
+    def result(self, method: str, data: Dict[str, Any]) -> Any:
+        method = method.lower()
+        if method == "getme":
+            return {"id": self.bot_id, "is_bot": True, "first_name": "Bot", "username": "stub_bot"}
+        if method == "sendmediagroup":
+            media = json.loads(data.get("media", "[]"))
+            return [self._message(data["chat_id"], media_group_id="stub") for _ in media]
+        if method == "copymessages" or method == "forwardmessages":
+            return [{"message_id": next(self._message_ids)} for _ in json.loads(data.get("message_ids", "[]"))]
+        if method == "copymessage":
+            return {"message_id": next(self._message_ids)}
+        if method in ("sendmessage", "sendphoto", "senddocument", "sendvideo"):
+            return self._message(data["chat_id"], text=data.get("text") or "")
+        if method in ("editmessagetext", "editmessagereplymarkup", "editmessagecaption"):
+            if "inline_message_id" in data:
+                return True
+            return {**self._message(data["chat_id"], text=data.get("text") or ""),
+                    "message_id": int(data["message_id"])}
+        # answerCallbackQuery, deleteMessage(s), setWebhook, deleteWebhook и т.п.
+        return True
+
+
+async def start_app(app: web.Application, host: str = "127.0.0.1", port: int = 0):
+    """Запуск приложения на свободном порту; возвращает (runner, port)"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
@@ -0,0 +1,99 @@
+"""
+Стоимость одного нажатия в списке задач администратора.
+
+"до"          - прежний get_completed_tasks_kb (постраничная загрузка): словари
+                из API и datetime.now() несколько раз на каждую задачу страницы;
+"промах кэша" - render_task_list_kb: только видимая страница;
+"попадание"   - повторное открытие той же страницы без изменений задач.
+
+API подменяется заглушкой без сети, поэтому измеряется только работа бота.
+
+Запуск: python -m benchmarks.task_kb [задач] [нажатий]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# loader.py создает бота при импорте - для замеров достаточно токена правильного формата
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from keyboards import task_kb
+from keyboards.pagination import ITEMS_PER_PAGE, get_pagination_kb
+from loader import tasks_version
+from utils.models import Task
+
+
+def make_tasks(count: int):
+    now = datetime.now()
+    return [
+        {
+            "task_id": task_id,
+            "task_message": f"Проверить выкладку товара на витрине магазина №{task_id}",
+            "created_at": (now - timedelta(minutes=task_id)).strftime('%Y-%m-%d %H:%M:%S'),
+            "status": "completed"
+        }
+        for task_id in range(count)
+    ]
+
+
+class StubAPI:
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.models = [
+            Task(task_id=task["task_id"], task_message=task["task_message"], status=task["status"],
+                 created_at=datetime.strptime(task["created_at"], '%Y-%m-%d %H:%M:%S'))
+            for task in tasks
+        ]
+
+    async def get_completed_tasks_page(self, page=1, page_size=50, typed=False):
+        items = self.models if typed else self.tasks
+        start = (page - 1) * page_size
+        return items[start:start + page_size], len(items)
+
+
+async def old_completed_tasks_kb(api, page=1):
+    tasks, total = await api.get_completed_tasks_page(page=page, page_size=ITEMS_PER_PAGE)
+    kb = []
+    for task in tasks:
+        kb.append([InlineKeyboardButton(
+            text=f"{task['task_message'][:22].ljust(22 if datetime.now().strftime('%Y-%m-%d') in task['created_at'] else 12, '=')}"
+                 f"{'..' if len(task['task_message']) >= 22 else ''}"
+                 f">{task['created_at'].replace(datetime.now().strftime('%Y-%m-%d') + ' ', '')}",
+            callback_data=f"task_info:{task['task_id']}")])
+    kb = get_pagination_kb(items=kb, caption="completed_task", page=page, total=total)
+    kb.append([InlineKeyboardButton(text="Назад в меню", callback_data="manage_tasks")])
+    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
+async def measure(name, clicks, render):
+    started = time.perf_counter()
+    for click in range(clicks):
+        await render(click)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<14} {elapsed / clicks * 1000:>10.3f} мс/нажатие")
+
+
+async def main(count: int, clicks: int):
+    api = StubAPI(make_tasks(count))
+    task_kb.api = api
+    pages = 20
+
+    await measure("до", clicks, lambda click: old_completed_tasks_kb(api, click % pages + 1))
+
+    async def miss(click):
+        tasks_version.bump()
+        return await task_kb.get_completed_tasks_kb(click % pages + 1)
+
+    await measure("промах кэша", clicks, miss)
+    await measure("попадание", clicks, lambda click: task_kb.get_completed_tasks_kb(click % pages + 1))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        count=int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        clicks=int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    ))
@@ -1,18 +1,117 @@
 from dataclasses import dataclass
-from environs import Env
+from typing import Dict
+from environs import Env, EnvError
+
+# Кэшируемые GET-эндпоинты API: шаблон пути -> max-age в секундах
+DEFAULT_API_CACHE_RULES = {
+    "/groups/": 60,
+    "/groups/active": 60,
+    "/users/all/list": 30,
+    "/users/by-type/{type}": 30,
+}
 
 @dataclass
 class Config:
     bot_token: str
     api_host: str
     api_port: str
+    user_cache_ttl: float
+    user_cache_size: int
+    api_single_flight: bool
+    api_cache_rules: Dict[str, float]
+    api_cache_max_bytes: int
+    fsm_storage: str
+    fsm_sqlite_path: str
+    fsm_ttl: float
+    fsm_flush_interval: float
+    album_quiet_period: float
+    album_max_wait: float
+    album_max_groups: int
+    fanout_concurrency: int
+    callback_dedupe_window: float
+    outbox_path: str
+    outbox_digest_window: float
+    outbox_max_attempts: int
+    send_global_rate: float
+    send_group_per_minute: float
+    webhook_url: str
+    webhook_path: str
+    webhook_secret: str
+    web_host: str
+    web_port: int
+    workers: int
+    metrics_enabled: bool
+    metrics_host: str
+    metrics_port: int
+    trace_path: str
+    trace_slow_threshold: float
+    trace_sample_rate: float
+    cache_snapshot_path: str
+    cache_snapshot_max_age: float
+    warmup_timeout: float
+    group_directory_ttl: float
+    invalidation_url: str
+    invalidation_user_ttl: float
+    replica_path: str
+    replica_sync_interval: float
+    replica_full_sync_interval: float
+    replica_users_sync_interval: float
+    search_rebuild_interval: float
+    search_max_results: int
 
 def load_config():
     env = Env()
     env.read_env()
 
-    return Config(
+    config = Config(
         bot_token=env.str("BOT_TOKEN"),
         api_host=env.str("API_HOST", "localhost"),
-        api_port=env.str("API_PORT", "8000")
+        api_port=env.str("API_PORT", "8000"),
+        user_cache_ttl=env.float("USER_CACHE_TTL", 60),
+        user_cache_size=env.int("USER_CACHE_SIZE", 10000),
+        api_single_flight=env.bool("API_SINGLE_FLIGHT", False),
+        api_cache_rules=env.dict("API_CACHE_RULES", DEFAULT_API_CACHE_RULES, subcast_values=float),
+        api_cache_max_bytes=env.int("API_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+        fsm_storage=env.str("FSM_STORAGE", "memory"),
+        fsm_sqlite_path=env.str("FSM_SQLITE_PATH", "fsm.sqlite3"),
+        fsm_ttl=env.float("FSM_TTL", 7 * 24 * 3600),
+        fsm_flush_interval=env.float("FSM_FLUSH_INTERVAL", 0.05),
+        album_quiet_period=env.float("ALBUM_QUIET_PERIOD", 0.3),
+        album_max_wait=env.float("ALBUM_MAX_WAIT", 2.0),
+        album_max_groups=env.int("ALBUM_MAX_GROUPS", 1000),
+        fanout_concurrency=env.int("FANOUT_CONCURRENCY", 10),
+        callback_dedupe_window=env.float("CALLBACK_DEDUPE_WINDOW", 10),
+        outbox_path=env.str("OUTBOX_PATH", "outbox.sqlite3"),
+        outbox_digest_window=env.float("OUTBOX_DIGEST_WINDOW", 0),
+        outbox_max_attempts=env.int("OUTBOX_MAX_ATTEMPTS", 5),
+        send_global_rate=env.float("SEND_GLOBAL_RATE", 30),
+        send_group_per_minute=env.float("SEND_GROUP_PER_MINUTE", 20),
+        webhook_url=env.str("WEBHOOK_URL", ""),
+        webhook_path=env.str("WEBHOOK_PATH", "/webhook"),
+        webhook_secret=env.str("WEBHOOK_SECRET", ""),
+        web_host=env.str("WEB_HOST", "0.0.0.0"),
+        web_port=env.int("WEB_PORT", 8080),
+        workers=env.int("WORKERS", 1),
+        metrics_enabled=env.bool("METRICS_ENABLED", False),
+        metrics_host=env.str("METRICS_HOST", "127.0.0.1"),
+        metrics_port=env.int("METRICS_PORT", 9100),
+        trace_path=env.str("TRACE_PATH", ""),
+        trace_slow_threshold=env.float("TRACE_SLOW_THRESHOLD", 0.5),
+        trace_sample_rate=env.float("TRACE_SAMPLE_RATE", 1.0),
+        cache_snapshot_path=env.str("CACHE_SNAPSHOT_PATH", "cache_snapshot.json"),
+        cache_snapshot_max_age=env.float("CACHE_SNAPSHOT_MAX_AGE", 24 * 3600),
+        warmup_timeout=env.float("WARMUP_TIMEOUT", 15),
+        group_directory_ttl=env.float("GROUP_DIRECTORY_TTL", 300),
+        invalidation_url=env.str("INVALIDATION_URL", ""),
+        invalidation_user_ttl=env.float("INVALIDATION_USER_TTL", 600),
+        replica_path=env.str("REPLICA_PATH", ""),
+        replica_sync_interval=env.float("REPLICA_SYNC_INTERVAL", 10),
+        replica_full_sync_interval=env.float("REPLICA_FULL_SYNC_INTERVAL", 600),
+        replica_users_sync_interval=env.float("REPLICA_USERS_SYNC_INTERVAL", 60),
+        search_rebuild_interval=env.float("SEARCH_REBUILD_INTERVAL", 600),
+        search_max_results=env.int("SEARCH_MAX_RESULTS", 200)
     )
+    # Без секрета вебхук принимает апдейты от любого, кто узнал URL (в том числе с чужим from.id)
+    if config.webhook_url and not config.webhook_secret:
+        raise EnvError("WEBHOOK_SECRET обязателен при WEBHOOK_URL (1-256 символов: A-Z, a-z, 0-9, _ и -)")
+    return config
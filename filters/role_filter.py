@@ -1,15 +1,20 @@
-from typing import Union
+from typing import Union, Optional
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
 from loader import api
+from utils.cache import MISSING
+from utils.tracing import span
 
 class RoleFilter(BaseFilter):
     def __init__(self, role: Union[str, list]):
         self.role = role if isinstance(role, list) else [role]
 
-    async def __call__(self, message: Message) -> bool:
-        try:
-            user = await api.get_user(message.from_user.id)
-            return user is not None and user.get('type') in self.role
-        except:
-            return False
+    async def __call__(self, message: Message, user: Optional[dict] = MISSING) -> bool:
+        # Профиль уже загружен UserMiddleware - повторный запрос к API не нужен
+        with span("filter:RoleFilter", roles=self.role):
+            try:
+                if user is MISSING:
+                    user = await api.get_user(message.from_user.id)
+                return user is not None and user.get('type') in self.role
+            except:
+                return False
@@ -3,5 +3,7 @@ from .creators import creators_router
 from .tasks import user_router
 from .common import common_router
 from .groups import chat_router
+from .search import search_router
 
-routers = [admin_router, chat_router, creators_router, user_router, common_router]
+# search_router - до creators_router: иначе /find постановщика попадет в текст черновика
+routers = [admin_router, search_router, chat_router, creators_router, user_router, common_router]
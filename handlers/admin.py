@@ -9,7 +9,8 @@ from keyboards.admin_kb import get_groups_keyboard, get_groups_chooser_keyboard_
     get_manage_user_keyboard, get_groups_keyboard_by_creator, get_roles_keyboard, get_admin_main_keyboard, \
     get_admin_tasks_keyboard
 from keyboards.task_kb import get_uncompleted_tasks_kb, get_completed_tasks_kb
-from loader import api
+from loader import api, sender, group_directory, replica
+from utils.send_queue import Priority
 
 admin_router = Router(name="admin")
 
@@ -35,7 +36,7 @@ async def show_main_admin_kb(callback_query: CallbackQuery):
 
 @admin_router.message(Command("groups"), RoleFilter("superadmin"))
 async def cmd_group(message: Message):
-    groups = await api.get_all_groups()
+    groups = await group_directory.all_groups()
     kb = get_groups_keyboard(groups)
     await message.answer(
         'Список групп. Нажмите на кнопку для переключения состояния группы (активна\неактивна)\n'
@@ -75,11 +76,15 @@ async def show_completed_tasks(callback_query: CallbackQuery):
     await callback_query.answer()
 
 
-@admin_router.callback_query(F.data.startswith("task_info"), RoleFilter("superadmin"))
-async def show_task_info(callback_query: CallbackQuery):
+# Постановщики открывают карточки своих задач из результатов /find
+@admin_router.callback_query(F.data.startswith("task_info"), RoleFilter(["superadmin", "creator"]))
+async def show_task_info(callback_query: CallbackQuery, user: dict):
     task_id = callback_query.data.split(':')[1]
     kb = callback_query.message.reply_markup
-    task = await api.get_task(task_id)
+    task = await replica.get_task(task_id) if replica is not None and replica.ready else await api.get_task(task_id)
+    if task is None or (user["type"] == "creator" and int(task["created_by"]) != int(user["user_id"])):
+        await callback_query.answer("Задача недоступна")
+        return
     await callback_query.message.edit_text(
             f'<b>ID задачи:</b> {task["task_id"]}\n'
             f'Создана: {task["created_at"]}\n'
@@ -186,7 +191,7 @@ async def edit_role_user(callback_query: CallbackQuery, is_manual=False):
         "admin": 'модератор',
         "creator": 'постановщик задач'
     }
-    await callback_query.message.bot.send_message(chat_id=user_id, text=f'Вам назначена роль "{role_to_name[action]}"')
+    await sender.send_message(chat_id=user_id, text=f'Вам назначена роль "{role_to_name[action]}"', priority=Priority.BULK)
 
 
 @admin_router.callback_query(F.data.startswith("userspagination"), RoleFilter('superadmin'))
@@ -197,6 +202,17 @@ async def users_pagination(callback_query: CallbackQuery):
     await callback_query.answer(f'Страница №{page}')
 
 
+@admin_router.callback_query(F.data.startswith("uncompleted_task:") | F.data.startswith("completed_task:"),
+                             RoleFilter('superadmin'))
+async def tasks_pagination(callback_query: CallbackQuery):
+    kind, action, page = callback_query.data.split(':')
+    page = int(page) + 1 if action == 'next' else int(page) - 1
+    get_tasks_kb = get_uncompleted_tasks_kb if kind == 'uncompleted_task' else get_completed_tasks_kb
+    tasks_kb = await get_tasks_kb(page)
+    await callback_query.message.edit_reply_markup(reply_markup=tasks_kb)
+    await callback_query.answer(f'Страница №{page}')
+
+
 @admin_router.callback_query(F.data.startswith("reg_"))
 async def registration_user(callback_query: CallbackQuery):
     action = (callback_query.data.split('_')[1].split(':')[0])
@@ -208,24 +224,26 @@ async def registration_user(callback_query: CallbackQuery):
     }
     if action == 'decline':
         await api.update_user_type(user_id=int(user_id), new_type=action)
-        await callback_query.bot.send_message(chat_id=int(user_id), text=f'Администратор отклонил вашу регистрацию.')
+        await sender.send_message(chat_id=int(user_id), text=f'Администратор отклонил вашу регистрацию.',
+                                  priority=Priority.BULK)
 
     else:
         await api.update_user_type(user_id=int(user_id), new_type=action)
-        await callback_query.bot.send_message(chat_id=user_id, text=f'Ответ по регистрации!\n'
-                                                                    f'Администратор назначил вам роль '
-                                                                    f'"{type_to_name[action]}".')
+        await sender.send_message(chat_id=user_id, text=f'Ответ по регистрации!\n'
+                                                        f'Администратор назначил вам роль '
+                                                        f'"{type_to_name[action]}".',
+                                  priority=Priority.BULK)
         if action == "creator":
-            await callback_query.bot.send_message(chat_id=user_id, text=f'Дождитесь пока вам назначат группы и что бы '
-                                                                        f'отправить задачу - отправьте мне '
-                                                                        f'сообщение с текстом задачи. Можно '
-                                                                        f'прикрепить к сообщению фото и видео для дополнительного '
-                                                                        f'объяснения задачи. \n'
-                                                                        f'Что бы посмотреть как это'
-                                                                        f' работает отправьте мне, например, слово '
-                                                                        f'"тест"')
-
-            kb = get_groups_keyboard(groups=await api.get_all_groups(), task='creator_groups')
+            await sender.send_message(chat_id=user_id, text=f'Дождитесь пока вам назначат группы и что бы '
+                                                            f'отправить задачу - отправьте мне '
+                                                            f'сообщение с текстом задачи. Можно '
+                                                            f'прикрепить к сообщению фото и видео для дополнительного '
+                                                            f'объяснения задачи. \n'
+                                                            f'Что бы посмотреть как это'
+                                                            f' работает отправьте мне, например, слово '
+                                                            f'"тест"',
+                                      priority=Priority.BULK)
+
             groups_keyboard = await get_groups_chooser_keyboard_by_creator(user_id)
 
             await callback_query.message.edit_text(
@@ -244,20 +262,22 @@ async def registration_user(callback_query: CallbackQuery):
 @admin_router.callback_query(F.data.startswith("remove_group_from_creator"))
 async def remove_group_from_creator(callback_query: CallbackQuery):
     group_id, user_id = callback_query.data.lstrip('remove_group_from_creator:').split(':')
-    await api.remove_group_from_creator(group_id=group_id, user_id=user_id)
+    await group_directory.remove_group_from_creator(group_id=group_id, user_id=user_id)
     kb = await get_groups_keyboard_by_creator(user_id)
     await callback_query.message.edit_reply_markup('Успешно', reply_markup=kb)
     await callback_query.answer()
-    group = await api.get_group(group_id)
-    await callback_query.bot.send_message(chat_id=user_id, text=f'От вас отозвана группа "{group["title"]}"')
+    group = group_directory.get(group_id) or await api.get_group(group_id)
+    await sender.send_message(chat_id=user_id, text=f'От вас отозвана группа "{group["title"]}"',
+                              priority=Priority.BULK)
 
 
 @admin_router.callback_query(F.data.startswith("add_group_to_creator"))
 async def add_group_to_creator(callback_query: CallbackQuery):
     group_id, user_id = callback_query.data.lstrip('add_group_to_creator:').split(':')
-    await api.assign_group_to_creator(group_id=group_id, user_id=user_id)
+    await group_directory.assign_group_to_creator(group_id=group_id, user_id=user_id)
     kb = await get_groups_keyboard_by_creator(user_id)
     await callback_query.message.edit_reply_markup('Успешно', reply_markup=kb)
     await callback_query.answer()
-    group = await api.get_group(group_id)
-    await callback_query.bot.send_message(chat_id=user_id, text=f'Вам добавлена группа "{group["title"]}"')
+    group = group_directory.get(group_id) or await api.get_group(group_id)
+    await sender.send_message(chat_id=user_id, text=f'Вам добавлена группа "{group["title"]}"',
+                              priority=Priority.BULK)
@@ -1,18 +1,28 @@
+import logging
+
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
 
 from keyboards.admin_kb import get_regestration_keyboard
-from loader import api
+from loader import api, sender
+from utils.send_queue import Priority
+
+logger = logging.getLogger(__name__)
 
 common_router = Router(name="common")
 
 
 @common_router.message(Command("start"))
 async def cmd_start(message: Message):
-    users = await api.get_all_users()
-    print(users)
-    if len(users) == 0:
+    # Нужен только первый пользователь (администратор) и факт наличия пользователей
+    try:
+        users, users_count = await api.get_users_page(page=1, page_size=1)
+    except Exception as e:
+        logger.error(f"Ошибка получения пользователей в cmd_start: {e}", exc_info=True)
+        await message.answer(str(e))
+        return
+    if users_count == 0:
         try:
             user = await api.register_user(user_type='superadmin', user_id=message.from_user.id,
                                        username=message.from_user.username,
@@ -38,8 +48,9 @@ async def cmd_start(message: Message):
             if (str(e).find('UNIQUE') == 34):
                 sending = True
         if sending:
-            await message.bot.send_message(users[0]['user_id'],
-                                           f'Запрос на регистрацию от пользователя <a href="tg://user?id={message.from_user.id}">{user_name}</a>',
-                                           reply_markup=get_regestration_keyboard(message.from_user.id),
-                                           parse_mode="HTML")
+            await sender.send_message(users[0]['user_id'],
+                                      f'Запрос на регистрацию от пользователя <a href="tg://user?id={message.from_user.id}">{user_name}</a>',
+                                      priority=Priority.BULK,
+                                      reply_markup=get_regestration_keyboard(message.from_user.id),
+                                      parse_mode="HTML")
             await message.answer('Отправил запрос на регистрацию администратору')
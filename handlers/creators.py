@@ -1,20 +1,38 @@
-from typing import Optional, List
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, List, Tuple, Union
 
-from aiogram import Router, F
+from aiogram import Bot, Router, F
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.utils.media_group import MediaGroupBuilder
 
 from filters.role_filter import RoleFilter
 from keyboards.creators_kb import get_creator_kb, get_groups_kb_for_creator
 from keyboards.task_kb import get_untaked_task_kb, get_taked_task_kb
-from loader import api
+from loader import api, config, group_directory, replica, sender, task_index, tasks_version
 from middlewares.album_middleware import AlbumMiddleware
+from middlewares.metrics_middleware import TimedMiddleware
+from utils.fanout import Delivery, fan_out
+from utils.send_queue import Priority
+from utils.telegram import delete_messages_bulk
 
 creators_router = Router(name="creators")
-creators_router.message.middleware(AlbumMiddleware())
+album_middleware = AlbumMiddleware(
+    quiet_period=config.album_quiet_period,
+    max_wait=config.album_max_wait,
+    max_groups=config.album_max_groups
+)
+creators_router.message.middleware(TimedMiddleware(album_middleware, "album"))
+
+# Заглушка вместо вложений для задач без файлов
+NO_ATTACHMENTS_PHOTO = "AgACAgQAAxkBAAIHOmdhNL1uz0Vfu3yYI0oiRDDZTaKNAALAxjEblPkRU9IewfqeQVTUAQADAgADbQADNgQ"
+# Сколько групп перечислять в отчете о рассылке поименно (об ошибках сообщается всегда)
+FANOUT_REPORT_MAX_GROUPS = 30
 
 class PostStates(StatesGroup):
     waiting_for_media = State()    # Ждем медиафайлы
@@ -48,7 +66,7 @@ async def appendStateMedia(messages: List[Message], state: FSMContext):
     media_old = list(data.get('media', []))
     media_new = media_old+media_input
     unique_media_new = media_new
-    unique_media_new = {media_item["file_id"]: media_item for media_item in media_new}.values()
+    unique_media_new = list({media_item["file_id"]: media_item for media_item in media_new}.values())
     count_dublicates = len(media_new) - len(unique_media_new)
     await state.update_data(media = unique_media_new)
     return unique_media_new, count_dublicates
@@ -69,68 +87,221 @@ def filter_messages_for_media_group(messages):
 
     return media_group
 
-async def update_messages_to_delete(message: Message, state: FSMContext):
+async def update_messages_to_delete(message: Union[Message, List[Message]], state: FSMContext):
+    """Запоминает сообщения черновика для удаления: в FSM хранятся только пары [chat_id, message_id]"""
+    messages = message if isinstance(message, list) else [message]
     data = await state.get_data()
     new_messages_to_delete = data.get("messages_to_delete", [])
-    # print(new_messages_to_delete)
-    new_messages_to_delete.append(message)
+    new_messages_to_delete.extend([one_message.chat.id, one_message.message_id] for one_message in messages)
 
     await state.update_data(messages_to_delete=new_messages_to_delete)
     return True
-async def send_task_to_chat(messageObject: Message, chat_id, state: FSMContext, is_test: bool = False):
-    data = await state.get_data()
-    attachments = data.get("media", [])
-    task_message = "<b>Описание задания:</b> " + data.get("task_message", 'Отсуствует. <b>Добавьте текст задания!</b>')
-    task_number = data.get("task_id", ' ...')
-    task_number_message = await messageObject.bot.send_message(chat_id=chat_id, text=F'Задание №{task_number}')
-    if is_test: await update_messages_to_delete(task_number_message, state)
-
-    if len(attachments):
-        media_group = filter_messages_for_media_group(attachments)
-        photoes = media_group.get("photo", [])
-        videos = media_group.get("video", [])
-        documents = media_group.get("document", [])
-        media = MediaGroupBuilder()
-        if len(photoes):
-            for photo in photoes:
-                media.add_photo(photo["file_id"])
-        if len(videos):
-            for video in videos:
-                media.add_video(video["file_id"])
-        message_videos = await messageObject.bot.send_media_group(chat_id=chat_id, media=media.build(), disable_notification=True)
-        if is_test: await update_messages_to_delete(message_videos, state)
-
-        if len(documents):
-            media = MediaGroupBuilder()
-            for document in documents:
-                media.add_document(document["file_id"])
-            message_docs = await messageObject.bot.send_media_group(chat_id=chat_id, media=media.build(), disable_notification=True)
-            if is_test: await update_messages_to_delete(message_docs, state)
-    else:
-
+def build_task_media(attachments: List[dict]) -> Tuple[list, list]:
+    """
+    Медиагруппы задачи: фото с видео и отдельно документы.
+
+    Содержат только file_id уже загруженных в Telegram файлов, поэтому строятся
+    один раз и переиспользуются при отправке в любое количество чатов.
+    """
+    media_group = filter_messages_for_media_group(attachments)
+    media = MediaGroupBuilder()
+    for photo in media_group["photo"]:
+        media.add_photo(photo["file_id"])
+    for video in media_group["video"]:
+        media.add_video(video["file_id"])
+    documents = MediaGroupBuilder()
+    for document in media_group["document"]:
+        documents.add_document(document["file_id"])
+    return media.build(), documents.build()
+
+def get_task_text(data: dict) -> str:
+    return "<b>Описание задания:</b> " + data.get("task_message", 'Отсуствует. <b>Добавьте текст задания!</b>')
+
+async def send_task_attachments(chat_id, media: list, documents: list, priority: Priority, sent: List[Message]):
+    """Отправка вложений задачи по file_id, без вложений - заглушки. Отправленное дописывается в sent"""
+    if media:
+        sent.extend(await sender.send_media_group(
+            chat_id=chat_id, media=media, priority=priority, disable_notification=True
+        ))
+    if documents:
+        sent.extend(await sender.send_media_group(
+            chat_id=chat_id, media=documents, priority=priority, disable_notification=True
+        ))
+    if not media and not documents:
         try:
-            not_attachments_message = await messageObject.bot.send_photo(
+            sent.append(await sender.send_photo(
                 parse_mode="HTML",
                 chat_id=chat_id,
-                photo="AgACAgQAAxkBAAIHOmdhNL1uz0Vfu3yYI0oiRDDZTaKNAALAxjEblPkRU9IewfqeQVTUAQADAgADbQADNgQ"
-            )
-            if is_test:
-                await update_messages_to_delete(not_attachments_message, state)
+                photo=NO_ATTACHMENTS_PHOTO,
+                priority=priority
+            ))
         except:
             pass
 
-    kb = get_creator_kb() if is_test else get_untaked_task_kb(task_id=task_number)
-    task_message_object = await messageObject.bot.send_message(
+async def copy_preview(chat_id, preview: dict, priority: Priority) -> bool:
+    """Копирование вложений предпросмотра одним copyMessages (группировка альбомов сохраняется)"""
+    try:
+        await sender.copy_messages(
+            chat_id=chat_id,
+            from_chat_id=preview["chat_id"],
+            message_ids=preview["message_ids"],
+            priority=priority,
+            disable_notification=True
+        )
+        return True
+    except TelegramBadRequest as e:
+        # Предпросмотр удален - вложения отправляются заново по file_id
+        logging.warning(f"Не удалось скопировать предпросмотр в {chat_id}: {e}")
+        return False
+
+async def deliver_task(
+        chat_id,
+        task_number,
+        task_message: str,
+        media: list,
+        documents: list,
+        reply_markup,
+        priority: Priority = Priority.INTERACTIVE,
+        sent: Optional[List[Message]] = None,
+        preview: Optional[dict] = None
+) -> List[Message]:
+    """
+    Отправка задачи в чат: номер, вложения (или заглушка), текст с клавиатурой.
+
+    Отправленное дописывается в sent. Если передан preview (см. get_preview), вложения
+    копируются из предпросмотра одним copyMessages и в sent не попадают.
+    """
+    sent = [] if sent is None else sent
+    task_number_message = await sender.send_message(chat_id=chat_id, text=F'Задание №{task_number}', priority=priority)
+    sent.append(task_number_message)
+
+    if preview is None or not await copy_preview(chat_id, preview, priority):
+        await send_task_attachments(chat_id, media, documents, priority, sent)
+
+    sent.append(await sender.send_message(
         chat_id=chat_id,
         text=task_message,
         parse_mode="HTML",
-        reply_markup=kb,
-        reply_to_message_id=task_number_message.message_id
-    )
+        reply_markup=reply_markup,
+        reply_to_message_id=task_number_message.message_id,
+        priority=priority
+    ))
+    return sent
+
+def get_preview(data: dict) -> Optional[dict]:
+    """Вложения предпросмотра, если черновик не менялся после check_task"""
+    preview = data.get("preview")
+    if not preview or not preview["message_ids"]:
+        return None
+    if preview["file_ids"] != [file["file_id"] for file in data.get("media", [])]:
+        return None
+    return preview
+
+async def send_task_to_chat(messageObject: Message, chat_id, state: FSMContext, is_test: bool = False):
+    data = await state.get_data()
+    media, documents = build_task_media(data.get("media", []))
+    task_number = data.get("task_id", ' ...')
+    kb = get_creator_kb() if is_test else get_untaked_task_kb(task_id=task_number)
 
-    if is_test: await update_messages_to_delete(task_message_object, state)
+    sent = []
+    try:
+        await deliver_task(chat_id, task_number, get_task_text(data), media, documents, kb, sent=sent)
+    finally:
+        if is_test: await update_messages_to_delete(sent, state)
+
+    if is_test:
+        # Вложения предпросмотра (между номером и текстом задачи) копируются при отправке в группы
+        await state.update_data(preview={
+            "chat_id": chat_id,
+            "message_ids": [message.message_id for message in sent[1:-1]],
+            "file_ids": [file["file_id"] for file in data.get("media", [])]
+        })
     return task_number
 
+async def send_task_to_groups(query: CallbackQuery, state: FSMContext, group_ids: List[int]):
+    """
+    Рассылка черновика в несколько групп: задачи создаются одним запросом к API,
+    затем доставляются параллельно (не более FANOUT_CONCURRENCY групп одновременно).
+    Вложения сохраняются в задачах отдельно от доставки сообщений, и их ошибки
+    попадают в отчет отдельно.
+    """
+    started = time.perf_counter()
+    data = await state.get_data()
+    media = data.get('media', [])
+    task_message = data.get("task_message", 'странно, но описания нету ... ???')
+    tasks = await api.create_tasks(task_message=task_message, created_by=query.from_user.id, group_ids=group_ids)
+    tasks_version.bump()
+    # Задачи сопоставляются с группами по group_id, а не по порядку ответа
+    task_ids = {}
+    for task in tasks:
+        task_index.add({"task_message": task_message, "created_by": query.from_user.id, **task})
+        task_ids[int(task["group_id"])] = task["task_id"]
+
+    text = get_task_text({**data, "task_message": task_message})
+    album, documents = build_task_media(media)
+    attachments = [{"file_id": file["file_id"], "file_type": file["content_type"]} for file in media]
+    # Массовая рассылка не должна задерживать ответы другим пользователям
+    priority = Priority.BULK if len(group_ids) > 1 else Priority.INTERACTIVE
+
+    preview = get_preview(data)
+
+    def get_task_id(group_id: int) -> int:
+        task_id = task_ids.get(group_id)
+        if task_id is None:
+            raise LookupError(f"API не вернуло задачу для группы {group_id}")
+        return task_id
+
+    async def deliver(group_id: int):
+        task_id = get_task_id(group_id)
+        await deliver_task(
+            group_id, task_id, text, album, documents, get_untaked_task_kb(task_id=task_id), priority,
+            preview=preview
+        )
+
+    async def register_attachments(group_id: int):
+        task_id = get_task_id(group_id)
+        await api.add_attachments(task_id=task_id, items=attachments)
+        if replica is not None:
+            # Карточка, прочитанная до сохранения вложений, была бы без них
+            await replica.forget_card(task_id)
+
+    deliveries, registrations = await asyncio.gather(
+        fan_out(group_ids, deliver, config.fanout_concurrency),
+        fan_out(group_ids if attachments else [], register_attachments, config.fanout_concurrency)
+    )
+    await delete_messages(query.bot, state)
+    report = format_fanout_report(deliveries, task_ids, time.perf_counter() - started, registrations)
+    await query.message.answer(report)
+    await state.clear()
+
+def format_fanout_report(
+        deliveries: List[Delivery],
+        task_ids: Dict[int, int],
+        elapsed: float,
+        registrations: List[Delivery] = ()
+) -> str:
+    """Отчет постановщику: статус и время доставки в каждую группу и ошибки сохранения вложений"""
+    unregistered = {registration.target for registration in registrations if not registration.ok}
+    if len(deliveries) == 1 and deliveries[0].ok and not unregistered:
+        return f"Задание (№{task_ids[deliveries[0].target]}) отправлено. Вы будете уведомлены о его выполнении."
+
+    delivered = sum(delivery.ok for delivery in deliveries)
+    lines = [f"Задание отправлено в {delivered} из {len(deliveries)} групп за {elapsed:.1f} с."]
+    for delivery in deliveries:
+        group = group_directory.get(delivery.target)
+        title = group["title"] if group else str(delivery.target)
+        task_id = task_ids.get(delivery.target)
+        number = f"№{task_id}" if task_id is not None else "задача"
+        if not delivery.ok:
+            lines.append(f"❌ {title}: {number} не доставлено ({type(delivery.error).__name__})")
+        elif delivery.target in unregistered:
+            lines.append(f"⚠️ {title}: {number} доставлено, но вложения не сохранены в задаче")
+        elif len(deliveries) <= FANOUT_REPORT_MAX_GROUPS:
+            lines.append(f"✅ {title}: {number} ({delivery.seconds:.1f} с)")
+    if delivered:
+        lines.append("Вы будете уведомлены о выполнении.")
+    return "\n".join(lines)[:4096]
+
 
 async def answer_send_task_state(message: Message, state: FSMContext, count_dublicates: int ):
     data = await state.get_data()
@@ -170,26 +341,20 @@ async def answer_send_task_state(message: Message, state: FSMContext, count_dubl
         description_message = await message.answer(text=description_of_state, parse_mode="HTML")
         await update_messages_to_delete(description_message, state)
 
-async def delete_messages(state: FSMContext):
+async def delete_messages(bot: Bot, state: FSMContext):
+    """Удаляет сообщения черновика пачками; неудаленные возвращаются списком"""
     data = await state.get_data()
-    instances_to_delete = data.get("messages_to_delete", None)
-    if instances_to_delete:
-        for instance_to_delete in instances_to_delete:
-
-            if isinstance(instance_to_delete, list):
-                for message_to_delete in instance_to_delete:
-                    try:
-                        await message_to_delete.delete()
-                    except:
-                        pass
-            else:
-                try:
-                    await instance_to_delete.delete()
-                except:
-                    pass
+    messages_to_delete = data.get("messages_to_delete", None)
+    if not messages_to_delete:
+        return []
+    failed = await delete_messages_bulk(bot, messages_to_delete)
+    # Предпросмотр удален вместе с остальными сообщениями черновика
+    await state.update_data(messages_to_delete=[], preview=None)
+    return failed
 
 @creators_router.callback_query(F.data == "get_groups_list")
 async def get_groups_list(query: CallbackQuery, state: FSMContext):
+    await state.update_data(selected_groups=[])
     kb = await get_groups_kb_for_creator(query.from_user.id)
     # print(kb)
     await query.message.edit_reply_markup('Выберите чат для отправки', reply_markup=kb)
@@ -227,35 +392,55 @@ async def handle_task_text(message: Message, state: FSMContext):
 
 @creators_router.callback_query(F.data == "check_task")
 async def check_task(query: CallbackQuery, state: FSMContext):
-    await delete_messages(state)
+    await delete_messages(query.bot, state)
     await send_task_to_chat(query.message, query.from_user.id, state, True)
     await query.answer()
 
 @creators_router.callback_query(F.data == "cancel_task")
 async def cancel_task(query: CallbackQuery, state: FSMContext):
-    await delete_messages(state)
+    await delete_messages(query.bot, state)
     await query.answer()
 
 
-@creators_router.callback_query(F.data.startswith('send_task:'))
-async def send_task(query: CallbackQuery, state: FSMContext):
+@creators_router.callback_query(F.data.startswith('toggle_group:'))
+async def toggle_group(query: CallbackQuery, state: FSMContext):
+    group_id = int(query.data.split(":")[1])
     data = await state.get_data()
-    media = data.get('media', [])
-    task_message = data.get("task_message", 'странно, но описания нету ... ???')
-    group_id = query.data.split(":")[1]
-    task_api_response = await api.create_task(task_message=task_message, group_id=group_id, created_by=query.from_user.id)
-    await state.update_data(task_id=task_api_response["task_id"])
-
-    task_number = await send_task_to_chat(query.message, group_id, state, False)
-    for file in media:
-        print(file)
-        await api.add_attachemnt(task_id=task_api_response["task_id"], file_id=file["file_id"], file_type=file['content_type'])
-    await delete_messages(state)
-    await query.message.answer(f"Задание (№{task_number}) отправлено. Вы будете уведомлены о его выполнении.")
-    await state.clear()
+    selected = set(data.get("selected_groups", [])) ^ {group_id}
+    await state.update_data(selected_groups=sorted(selected))
+    kb = await get_groups_kb_for_creator(query.from_user.id, selected)
+    await query.message.edit_reply_markup(reply_markup=kb)
+    await query.answer()
+
+@creators_router.callback_query(F.data == "toggle_all_groups")
+async def toggle_all_groups(query: CallbackQuery, state: FSMContext):
+    group_ids = {int(group["group_id"]) for group in await group_directory.get_creator_groups(query.from_user.id)}
+    data = await state.get_data()
+    selected = set() if group_ids <= set(data.get("selected_groups", [])) else group_ids
+    await state.update_data(selected_groups=sorted(selected))
+    kb = await get_groups_kb_for_creator(query.from_user.id, selected)
+    await query.message.edit_reply_markup(reply_markup=kb)
+    await query.answer()
+
+@creators_router.callback_query(F.data == "send_selected")
+async def send_selected(query: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    # Отправляются только активные группы постановщика, даже если выбор пришел из устаревшей клавиатуры;
+    # группы перечитываются из API - справочник мог не узнать о снятии группы другим процессом
+    allowed = {int(group["group_id"]) for group in await group_directory.refresh_creator_groups(query.from_user.id)}
+    group_ids = [group_id for group_id in data.get("selected_groups", []) if group_id in allowed]
+    if not group_ids:
+        await query.answer("Выберите хотя бы одну группу", show_alert=True)
+        return
+    # Ответ сразу: рассылка во много групп может занять больше времени ожидания кнопки
+    await query.answer(f"Отправляю в {len(group_ids)} групп...")
+    await send_task_to_groups(query, state, group_ids)
 
 
+@creators_router.callback_query(F.data.startswith('send_task:'))
+async def send_task(query: CallbackQuery, state: FSMContext):
     await query.answer()
+    await send_task_to_groups(query, state, [int(query.data.split(":")[1])])
 
 
 @creators_router.callback_query(F.data == "main_creator_kb")
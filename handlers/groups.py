@@ -1,5 +1,5 @@
 from aiogram import Router, F
-from aiogram.types import ChatMemberUpdated
+from aiogram.types import ChatMemberUpdated, Message
 from aiogram.filters.chat_member_updated import (
     ChatMemberUpdatedFilter,
     MEMBER,
@@ -9,7 +9,7 @@ from aiogram.filters.chat_member_updated import (
 )
 import logging
 
-from loader import api
+from loader import group_directory
 
 # Настраиваем логирование
 logging.basicConfig(level=logging.INFO)
@@ -41,7 +41,7 @@ async def bot_chat_member_update(event: ChatMemberUpdated):
             await event.answer(
                 f"Права администратора предоставлены. Готов к работе."
             )
-            await api.create_group(group_id=event.chat.id, title=event.chat.title, is_active=True)
+            await group_directory.create_group(group_id=event.chat.id, title=event.chat.title, is_active=True)
             logger.info(f"Бот назначен админом {chat.title}")
 
         elif new_status in [LEFT, KICKED]:
@@ -82,6 +82,6 @@ async def admin_status_changed(event: ChatMemberUpdated):
     except Exception as e:
         logger.error(f"Ошибка в обработчике admin_status_changed: {e}", exc_info=True)
 
-@chat_router.message(F.chat.type in ["group", "supergroup"])
+@chat_router.message(F.chat.type.in_({"group", "supergroup"}))
 async def is_it_task(message: Message):
     pass
\ No newline at end of file
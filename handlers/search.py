@@ -0,0 +1,55 @@
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery
+
+from filters.role_filter import RoleFilter
+from keyboards.task_kb import get_find_results_kb
+from loader import task_index
+from utils.cache import TTLCache
+
+search_router = Router(name="search")
+
+# Запрос и фильтр по постановщику для каждого сообщения с результатами - для перелистывания
+_queries = TTLCache(maxsize=10000, ttl=24 * 3600)
+
+
+def search_tasks(query: str, user: dict):
+    """Администратор ищет по всем задачам, постановщик - по своим"""
+    created_by = None if user["type"] == "superadmin" else int(user["user_id"])
+    return task_index.search(query, created_by=created_by)
+
+
+@search_router.message(Command("find"), RoleFilter(["superadmin", "creator"]))
+async def cmd_find(message: Message, command: CommandObject, user: dict):
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Укажите слова для поиска, например: /find проверить витрину")
+        return
+    if not task_index.ready:
+        await message.answer("Поиск по задачам еще готовится, повторите через минуту")
+        return
+
+    results = search_tasks(query, user)
+    if not results:
+        await message.answer(f"По запросу «{query}» задач не найдено")
+        return
+    sent = await message.answer(
+        f"Найдено задач: {len(results)}{'+' if len(results) >= task_index.max_results else ''}. "
+        f"Выберите задачу для просмотра:",
+        reply_markup=get_find_results_kb(results)
+    )
+    _queries.set((sent.chat.id, sent.message_id), query)
+
+
+@search_router.callback_query(F.data.startswith("find:"), RoleFilter(["superadmin", "creator"]))
+async def find_pagination(callback_query: CallbackQuery, user: dict):
+    _, action, page = callback_query.data.split(':')
+    page = int(page) + 1 if action == 'next' else int(page) - 1
+    query = _queries.get((callback_query.message.chat.id, callback_query.message.message_id))
+    if query is None:
+        await callback_query.answer("Результаты поиска устарели, повторите /find")
+        return
+    # Индекс мог измениться - результаты пересчитываются
+    kb = get_find_results_kb(search_tasks(query, user), page)
+    await callback_query.message.edit_reply_markup(reply_markup=kb)
+    await callback_query.answer(f'Страница №{page}')
@@ -5,7 +5,8 @@ from aiogram.filters import Command
 
 from filters.role_filter import RoleFilter
 from keyboards.task_kb import get_taked_task_kb, get_untaked_task_kb
-from loader import api
+from loader import api, outbox, task_index, tasks_version
+from utils.api_client import APIError
 user_router = Router(name="user")
 
 
@@ -32,7 +33,16 @@ async def take_task(query: CallbackQuery, state: FSMContext):
 
         )
     task_id = query.data.split(":")[1]
-    task = await api.take_task(task_id=task_id, user_id=query.from_user.id)
+    try:
+        task = await api.take_task(task_id=task_id, user_id=query.from_user.id)
+    except APIError as e:
+        # Задачу успел взять другой исполнитель
+        if e.status_code != 409:
+            raise
+        await query.answer("Задача уже взята в работу")
+        return
+    tasks_version.bump()
+    task_index.add(task)
     kb = await get_taked_task_kb(task_id)
     print(task)
     await query.message.edit_text(
@@ -41,28 +51,29 @@ async def take_task(query: CallbackQuery, state: FSMContext):
         parse_mode='HTML',
         reply_markup=kb
     )
-    await query.bot.send_message(task["created_by"], f'Задача №{task['task_id']} взята в работу исполнителем '
-                                                     f'<a href="tg://user?id={task['taken_by'][0]['user_id']}">'
-                                                     f'{task['taken_by'][0]['name']}</a>',
-                                 parse_mode='HTML')
+    await outbox.enqueue(task["created_by"], f'Задача №{task['task_id']} взята в работу исполнителем '
+                                             f'<a href="tg://user?id={task['taken_by'][0]['user_id']}">'
+                                             f'{task['taken_by'][0]['name']}</a>')
     await query.answer()
 
 @user_router.callback_query(F.data.startswith("cancel_execute:"))
 async def cancel_execute(query: CallbackQuery):
     task_id = query.data.split(":")[1]
     task = await api.cancel_task(task_id=task_id, user_id=query.from_user.id)
+    tasks_version.bump()
+    task_index.add(task)
     print(task)
     kb = get_untaked_task_kb(task_id)
     await query.message.edit_text(text=task['task_message'], reply_markup=kb)
-    await query.bot.send_message(task["created_by"], f'Задача №{task['task_id']} отменена исполнителем.',
-                                 parse_mode='HTML')
+    await outbox.enqueue(task["created_by"], f'Задача №{task['task_id']} отменена исполнителем.')
     await query.answer()
 
 @user_router.callback_query(F.data.startswith("complete_task:"))
 async def complete_task(query: CallbackQuery):
     task_id = query.data.split(":")[1]
     task = await api.complete_task(task_id=task_id, user_id=query.from_user.id)
+    tasks_version.bump()
+    task_index.add(task)
     await query.message.edit_text(text=f'{task['task_message']} \nВыполнено',)
-    await query.bot.send_message(task["created_by"], f'Задача №{task['task_id']} выполнена исполнителем.',
-                                 parse_mode='HTML')
+    await outbox.enqueue(task["created_by"], f'Задача №{task['task_id']} выполнена исполнителем.')
     await query.answer()
\ No newline at end of file
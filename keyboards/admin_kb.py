@@ -5,15 +5,18 @@ from aiogram.types import (
     InlineKeyboardButton
 )
 
-from keyboards.pagination import get_pagination_kb
-from loader import api
+from keyboards.pagination import get_pagination_kb, ITEMS_PER_PAGE
+from loader import api, group_directory, replica
 
 async def get_users_keyboard(page_number = 1):
     kb = []
-    users = await api.get_all_users()
+    if replica is not None and replica.ready:
+        users, total = replica.users_page(page=page_number, page_size=ITEMS_PER_PAGE)
+    else:
+        users, total = await api.get_users_page(page=page_number, page_size=ITEMS_PER_PAGE)
     for user in users:
         kb.append([InlineKeyboardButton(text=f"{user['name']}|{user['type']}", callback_data=f"edit:{user['user_id']}")])
-    kb = get_pagination_kb(items=kb, caption="userspagination", page=page_number)
+    kb = get_pagination_kb(items=kb, caption="userspagination", page=page_number, total=total)
     kb.append([InlineKeyboardButton(text="Назад", callback_data="main_admin_keyboard")])
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
@@ -79,26 +82,15 @@ def get_groups_keyboard(groups: list[dict], task='groups', activeFlag = True, pa
     return get_pagination_kb(items=kb, caption=task, page=page_number)
 
 async def get_groups_keyboard_by_creator(user_id, page=1):
-    creator_groups = await api.get_creator_groups(user_id=user_id)
-    all_groups = await api.get_all_groups()
-
-    creator_group_ids = {group['group_id'] for group in creator_groups}
-    user_groups = [group for group in all_groups if group['group_id'] in creator_group_ids]
-    other_groups = [group for group in all_groups if group['group_id'] not in creator_group_ids]
-
-    combined_groups = user_groups + other_groups
-    print(user_groups)
-    print(other_groups)
-
-    for group in combined_groups:
-        group['is_creator_group'] = group['group_id'] in creator_group_ids
+    creator_group_ids = await group_directory.get_creator_group_ids(user_id)
+    all_groups = await group_directory.all_groups()
 
     kb = []
     for one_group in all_groups:
-        print(one_group)
+        is_creator_group = int(one_group['group_id']) in creator_group_ids
         kb.append([InlineKeyboardButton(
-            text=f"{one_group['title']} " + f"{'✅' if one_group['is_creator_group'] else '❌'}",
-            callback_data=f"{'remove_group_from_creator' if one_group["is_creator_group"] else 'add_group_to_creator'}"
+            text=f"{one_group['title']} " + f"{'✅' if is_creator_group else '❌'}",
+            callback_data=f"{'remove_group_from_creator' if is_creator_group else 'add_group_to_creator'}"
                           f":{one_group['group_id']}:{user_id}")])
 
 
@@ -107,15 +99,14 @@ async def get_groups_keyboard_by_creator(user_id, page=1):
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
 async def get_groups_chooser_keyboard_by_creator(user_id):
-    creator_groups = await api.get_creator_groups(user_id)
-    group_ids = [group["group_id"] for group in creator_groups]
-    all_groups = await api.get_all_groups()
+    group_ids = await group_directory.get_creator_group_ids(user_id)
+    all_groups = await group_directory.all_groups()
     kb = []
     for one_group in all_groups:
-        print(one_group)
+        is_creator_group = int(one_group['group_id']) in group_ids
         kb.append([InlineKeyboardButton(
-            text=f"{one_group['title']} " + f"{'✅' if one_group["group_id"] in group_ids else '❌'}",
-            callback_data=f"{'remove_group_from_creator' if one_group["group_id"] in group_ids else 'add_group_to_creator'}"
+            text=f"{one_group['title']} " + f"{'✅' if is_creator_group else '❌'}",
+            callback_data=f"{'remove_group_from_creator' if is_creator_group else 'add_group_to_creator'}"
                           f":{one_group['group_id']}:{user_id}")])
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
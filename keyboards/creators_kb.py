@@ -5,7 +5,9 @@ from aiogram.types import (
     InlineKeyboardButton
 )
 
-from loader import api
+from typing import Collection
+
+from loader import group_directory
 
 
 def get_creator_kb():
@@ -16,11 +18,17 @@ def get_creator_kb():
     ]
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
-async def get_groups_kb_for_creator(creator_user_id):
-    groups = await api.get_creator_groups(creator_user_id)
+async def get_groups_kb_for_creator(creator_user_id, selected: Collection[int] = ()):
+    """Выбор нескольких групп: нажатие на группу отмечает ее, отправка - во все отмеченные"""
+    groups = await group_directory.get_creator_groups(creator_user_id)
     kb = []
     for group in groups:
-        kb.append([InlineKeyboardButton(text=group["title"], callback_data=f"send_task:{group["group_id"]}")])
+        mark = "✅" if int(group["group_id"]) in selected else "▫️"
+        kb.append([InlineKeyboardButton(text=f"{mark} {group["title"]}", callback_data=f"toggle_group:{group["group_id"]}")])
+    if len(groups) > 1:
+        kb.append([InlineKeyboardButton(text="☑️Выбрать все / снять выбор", callback_data="toggle_all_groups")])
+    if selected:
+        kb.append([InlineKeyboardButton(text=f"📨Отправить в выбранные ({len(selected)})", callback_data="send_selected")])
     kb.append([InlineKeyboardButton(text='Назад в меню', callback_data='main_creator_kb')])
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from aiogram.types import (
     ReplyKeyboardMarkup,
@@ -7,17 +7,32 @@ from aiogram.types import (
     InlineKeyboardButton
 )
 
-
-def get_pagination_kb(items: List, caption = "", page = 1):
-    items_per_page = 7
-    pages_count = len(items) // items_per_page
-    if len(items) % items_per_page != 0:
+ITEMS_PER_PAGE = 7
+
+
+def get_pagination_kb(items: List, caption = "", page = 1, total: Optional[int] = None):
+    """
+    Клавиатура страницы списка с кнопками навигации
+
+    Args:
+        items: Кнопки всего списка, либо только текущей страницы, если передан total
+        caption: Префикс callback_data кнопок навигации
+        page: Номер страницы
+        total: Общее количество элементов (если страница уже выбрана на сервере)
+    """
+    items_per_page = ITEMS_PER_PAGE
+    if total is None:
+        total = len(items)
+        start = (page - 1) * items_per_page
+        end = start + items_per_page
+        items = items[start:end]
+    else:
+        items = list(items[:items_per_page])
+
+    pages_count = total // items_per_page
+    if total % items_per_page != 0:
         pages_count += 1
 
-    start = (page - 1) * items_per_page
-    end = start + items_per_page
-    items = items[start:end]
-
     kb = items if len(items) else [[InlineKeyboardButton(text="Пусто", callback_data="no_callback")]]
     kb.append(
         [
@@ -25,6 +40,10 @@ def get_pagination_kb(items: List, caption = "", page = 1):
                 text=f"⬅️ пред. страница" if page > 1 else "#####",
                 callback_data=f"{caption}:prev:{page}" if page > 1 else "no_callback"
             ),
+            InlineKeyboardButton(
+                text=f"{page}/{pages_count}",
+                callback_data="no_callback"
+            ),
             InlineKeyboardButton(
                 text=f"➡️ след. страница" if page < pages_count else "#####",
                 callback_data=f"{caption}:next:{page}" if page < pages_count else "no_callback"
@@ -37,4 +56,3 @@ def get_pagination_kb(items: List, caption = "", page = 1):
 
 
     return kb
-
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date
 from typing import Optional, List
 
 from aiogram.types import (
@@ -8,8 +8,11 @@ from aiogram.types import (
     InlineKeyboardButton
 )
 
-from keyboards.pagination import get_pagination_kb
-from loader import api
+from keyboards.pagination import get_pagination_kb, ITEMS_PER_PAGE
+from loader import api, replica, tasks_version
+from utils.cache import TTLCache
+from utils.models import Task
+from utils.search import IndexedTask
 import asyncio
 
 def get_untaked_task_kb(task_id):
@@ -25,51 +28,84 @@ async def get_taked_task_kb(task_id):
     ]
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
-async def get_uncompleted_tasks_kb(page=1):
-    tasks = await api.get_incomplete_tasks()
-    kb = []
-    for task in tasks:
-       kb.append([InlineKeyboardButton(text=f"{task['task_message'][:22].ljust(22 if datetime.now().strftime('%Y-%m-%d') in task['created_at'] else 12, "=")}"
-                                            f"{".." if len(task['task_message']) >=22 else ''}"
-                                            f">{task['created_at'].replace(datetime.now().strftime('%Y-%m-%d')+' ', '')}",
-                                       callback_data=f"task_info:{task['task_id']}")])
-
-    kb = get_pagination_kb(items=kb, caption="uncompleted_task", page=page)
-    kb.append([InlineKeyboardButton(text="Назад в меню", callback_data="manage_tasks")])
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+TASK_LABEL_LENGTH = 22
+
+# Кэш отрендеренных страниц списков задач: (вид списка, страница, версия, дата) -> клавиатура.
+# Ограничение по времени нужно для изменений, сделанных в обход хендлеров этого процесса
+_task_pages_cache = TTLCache(maxsize=256, ttl=30)
+
+
+def format_task_label(task: Task, today: date) -> str:
+    """Подпись кнопки задачи: начало текста и время создания (дата - только если не сегодня)"""
+    message = task.task_message or ""
+    if task.created_at is None:
+        return message[:TASK_LABEL_LENGTH] + (".." if len(message) >= TASK_LABEL_LENGTH else "")
+    created_today = task.created_at.date() == today
+    label = message[:TASK_LABEL_LENGTH].ljust(TASK_LABEL_LENGTH if created_today else 12, "=")
+    if len(message) >= TASK_LABEL_LENGTH:
+        label += ".."
+    return f"{label}>{task.created_at.strftime('%H:%M:%S' if created_today else '%Y-%m-%d %H:%M:%S')}"
+
+
+async def render_task_list_kb(kind: str, page: int = 1) -> InlineKeyboardMarkup:
+    """
+    Клавиатура страницы списка задач
+
+    Args:
+        kind: "uncompleted" или "completed"
+        page: Номер страницы
+
+    Returns:
+        InlineKeyboardMarkup: Кнопки задач страницы с навигацией
+    """
+    today = date.today()
+    use_replica = replica is not None and replica.ready
+    key = (kind, page, tasks_version.value, replica.version.value if use_replica else None, today)
+    markup = _task_pages_cache.get(key)
+    if markup is not None:
+        return markup
+
+    if use_replica:
+        tasks, total = replica.tasks_page(kind, page=page, page_size=ITEMS_PER_PAGE)
+    elif kind == "uncompleted":
+        tasks, total = await api.get_incomplete_tasks_page(page=page, page_size=ITEMS_PER_PAGE, typed=True)
+    else:
+        tasks, total = await api.get_completed_tasks_page(page=page, page_size=ITEMS_PER_PAGE, typed=True)
 
-async def get_task_info_kb():
     kb = [
-        [InlineKeyboardButton(text="Выйти в меню", callback_data="manage_tasks:")],
+        [InlineKeyboardButton(text=format_task_label(task, today), callback_data=f"task_info:{task.task_id}")]
+        for task in tasks
     ]
-    return InlineKeyboardMarkup(inline_keyboard=kb)
-
-async def get_completed_tasks_kb(page=1):
-    tasks = await api.get_completed_tasks()
-    kb = []
-    for task in tasks:
-       kb.append([InlineKeyboardButton(text=f"{task['task_message'][:22].ljust(22 if datetime.now().strftime('%Y-%m-%d') in task['created_at'] else 12, "=")}"
-                                            f"{".." if len(task['task_message']) >=22 else ''}"
-                                            f">{task['created_at'].replace(datetime.now().strftime('%Y-%m-%d')+' ', '')}",
-                                       callback_data=f"task_info:{task['task_id']}")])
-
-    kb = get_pagination_kb(items=kb, caption="completed_task", page=page)
+    kb = get_pagination_kb(items=kb, caption=f"{kind}_task", page=page, total=total)
     kb.append([InlineKeyboardButton(text="Назад в меню", callback_data="manage_tasks")])
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+    markup = InlineKeyboardMarkup(inline_keyboard=kb)
+    _task_pages_cache.set(key, markup)
+    return markup
+
+
+def get_find_results_kb(results: List[IndexedTask], page: int = 1) -> InlineKeyboardMarkup:
+    """
+    Клавиатура страницы результатов /find: кнопки открывают карточку задачи (task_info)
+
+    Args:
+        results: Найденные задачи (TaskSearchIndex.search)
+        page: Номер страницы
+    """
+    kb = [
+        [InlineKeyboardButton(
+            text=f"{'✅' if task.status == 'completed' else '▫️'} №{task.task_id} {task.label}",
+            callback_data=f"task_info:{task.task_id}"
+        )]
+        for task in results
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=get_pagination_kb(items=kb, caption="find", page=page))
 
 
 async def get_uncompleted_tasks_kb(page=1):
-    tasks = await api.get_incomplete_tasks()
-    kb = []
-    for task in tasks:
-       kb.append([InlineKeyboardButton(text=f"{task['task_message'][:22].ljust(22 if datetime.now().strftime('%Y-%m-%d') in task['created_at'] else 12, "=")}"
-                                            f"{".." if len(task['task_message']) >=22 else ''}"
-                                            f">{task['created_at'].replace(datetime.now().strftime('%Y-%m-%d')+' ', '')}",
-                                       callback_data=f"task_info:{task['task_id']}")])
-
-    kb = get_pagination_kb(items=kb, caption="completed_task", page=page)
-    kb.append([InlineKeyboardButton(text="Назад в меню", callback_data="manage_tasks")])
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+    return await render_task_list_kb("uncompleted", page)
+
+async def get_completed_tasks_kb(page=1):
+    return await render_task_list_kb("completed", page)
 
 async def get_task_info_kb():
     kb = [
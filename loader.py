@@ -1,12 +1,65 @@
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from utils.api_client import TaskManagementAPI
+from utils.cache import VersionCounter
+from utils.fsm_storage import SQLiteStorage
+from utils.group_directory import GroupDirectory
+from utils.outbox import NotificationOutbox
+from utils.replica import ReadReplica
+from utils.search import TaskSearchIndex
+from utils.send_queue import SendScheduler
+from utils.warmup import Readiness
 from config import load_config
 
 config = load_config()
-storage = MemoryStorage()
+if config.fsm_storage == "sqlite":
+    storage = SQLiteStorage(
+        path=config.fsm_sqlite_path,
+        ttl=config.fsm_ttl or None,
+        flush_interval=config.fsm_flush_interval
+    )
+else:
+    storage = MemoryStorage()
 bot = Bot(token=config.bot_token)
 dp = Dispatcher(storage=storage)
 api = TaskManagementAPI(
-    base_url=f"http://{config.api_host}:{config.api_port}"
-)
\ No newline at end of file
+    base_url=f"http://{config.api_host}:{config.api_port}",
+    user_cache_ttl=config.user_cache_ttl,
+    user_cache_size=config.user_cache_size,
+    single_flight=config.api_single_flight,
+    cache_rules=config.api_cache_rules,
+    cache_max_bytes=config.api_cache_max_bytes
+)
+# Справочник групп: перечитывается раз в GROUP_DIRECTORY_TTL секунд (0 - только по событиям API)
+group_directory = GroupDirectory(api, ttl=config.group_directory_ttl or None)
+sender = SendScheduler(
+    bot,
+    global_rate=config.send_global_rate,
+    group_rate_per_minute=config.send_group_per_minute
+)
+# Уведомления постановщикам о взятии, отмене и выполнении задач
+outbox = NotificationOutbox(
+    sender,
+    path=config.outbox_path,
+    digest_window=config.outbox_digest_window,
+    max_attempts=config.outbox_max_attempts
+)
+# Версия списков задач: увеличивается при создании, взятии, отмене и выполнении задачи
+tasks_version = VersionCounter()
+# Реплика для чтения списков администратора (REPLICA_PATH, по умолчанию выключена), без нее списки читаются из API
+replica = ReadReplica(
+    api,
+    path=config.replica_path,
+    sync_interval=config.replica_sync_interval,
+    full_sync_interval=config.replica_full_sync_interval,
+    users_sync_interval=config.replica_users_sync_interval,
+    tasks_version=tasks_version
+) if config.replica_path else None
+# Поиск по тексту задач (/find)
+task_index = TaskSearchIndex(
+    api,
+    rebuild_interval=config.search_rebuild_interval,
+    max_results=config.search_max_results
+)
+# Готовность к обработке апдейтов: выставляется после прогрева кэшей
+readiness = Readiness()
@@ -1,9 +1,11 @@
 import asyncio
 import logging
-from handlers import routers
-# from middlewares.album_middleware import AlbumMiddleware
-from middlewares.user_middleware import UserMiddleware
-from loader import dp, bot, api
+from app import setup_dispatcher, tracer
+from loader import dp, bot, api, config, readiness
+from utils.metrics import start_metrics_server
+from utils.warmup import health_handler
+from webhook import run_webhook
+from sharding import run_sharded
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,20 +14,34 @@ logging.basicConfig(
 
 async def main():
     logging.info("Starting bot...")
+    setup_dispatcher()
 
-    # Подключаем роутеры
-    for router in routers:
-        dp.include_router(router)
+    # Метрики Prometheus: у рабочих процессов - собственные порты (METRICS_PORT + 1 + номер)
+    metrics_runner = None
+    if config.metrics_enabled:
+        metrics_runner = await start_metrics_server(
+            config.metrics_host, config.metrics_port,
+            # При WORKERS > 1 прогрев выполняют рабочие процессы, их /health - на своих портах
+            health=health_handler(readiness) if config.workers <= 1 else None
+        )
 
-    # Подключаем мидлвари
-    dp.message.middleware(UserMiddleware())
-    # dp.message.middleware(AlbumMiddleware())
-    dp.callback_query.middleware(UserMiddleware())
-
-    # Запуск бота
+    # Запуск бота: вебхук, если задан WEBHOOK_URL, иначе long polling;
+    # при WORKERS > 1 апдейты обрабатываются в отдельных процессах
     try:
-        await dp.start_polling(bot)
+        if config.workers > 1:
+            if config.fsm_storage == "memory":
+                logging.warning("WORKERS > 1 с FSM_STORAGE=memory: состояние FSM не будет общим")
+            await run_sharded(dp, bot, config)
+        elif config.webhook_url:
+            await run_webhook(dp, bot, config, readiness)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        if tracer is not None:
+            tracer.close()
         await dp.storage.close()
         await bot.session.close()
         await api.close()
@@ -1,11 +1,74 @@
 import asyncio
-from typing import Callable, Dict, Any, Awaitable
+import logging
+from typing import Callable, Dict, Any, Awaitable, List, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
+logger = logging.getLogger(__name__)
+
+
+class _AlbumBuffer:
+    """Сообщения одной медиагруппы, ожидающие отправки в хендлер"""
+    __slots__ = ("messages", "started", "timer", "done")
+
+    def __init__(self, message: Message, started: float, done: asyncio.Future):
+        self.messages: List[Message] = [message]
+        self.started = started
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.done = done
+
 
 class AlbumMiddleware(BaseMiddleware):
-    album_data: dict = {}
+    """
+    Собирает сообщения медиагруппы (альбома) и вызывает хендлер один раз
+    со всем альбомом в data["album"].
+
+    На каждую группу заводится один таймер: он перезапускается при каждой новой
+    части альбома и срабатывает, когда части перестают приходить quiet_period
+    секунд, но не позже max_wait секунд от первой части. Альбом из max_group_size
+    частей отправляется сразу.
+    """
+
+    def __init__(
+            self,
+            quiet_period: float = 0.3,
+            max_wait: float = 2.0,
+            max_group_size: int = 10,
+            max_groups: int = 1000
+    ):
+        """
+        Args:
+            quiet_period: Пауза без новых частей, после которой альбом считается собранным
+            max_wait: Максимальное время сборки альбома
+            max_group_size: Количество частей, при котором альбом отправляется сразу
+            max_groups: Максимальное количество одновременно собираемых альбомов
+        """
+        self.quiet_period = quiet_period
+        self.max_wait = max_wait
+        self.max_group_size = max_group_size
+        self.max_groups = max_groups
+        self.album_data: Dict[str, _AlbumBuffer] = {}
+
+        # Задержка сборки альбома: от первой части до вызова хендлера
+        self.albums_total = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def _schedule(self, media_group_id: str, buffer: _AlbumBuffer):
+        loop = asyncio.get_running_loop()
+        if buffer.timer is not None:
+            buffer.timer.cancel()
+        deadline = min(loop.time() + self.quiet_period, buffer.started + self.max_wait)
+        buffer.timer = loop.call_at(deadline, self._fire, media_group_id)
+
+    def _fire(self, media_group_id: str):
+        buffer = self.album_data.pop(media_group_id, None)
+        if buffer is None:
+            return
+        if buffer.timer is not None:
+            buffer.timer.cancel()
+        if not buffer.done.done():
+            buffer.done.set_result(None)
 
     async def __call__(
             self,
@@ -16,24 +79,39 @@ class AlbumMiddleware(BaseMiddleware):
         if not event.media_group_id:
             return await handler(event, data)
 
+        media_group_id = event.media_group_id
+        buffer = self.album_data.get(media_group_id)
+        if buffer is not None:
+            # Часть уже собираемого альбома - хендлер вызовет первая часть
+            buffer.messages.append(event)
+            logger.debug(f"Добавлено в группу {media_group_id}, сейчас файлов: {len(buffer.messages)}")
+            if len(buffer.messages) >= self.max_group_size:
+                self._fire(media_group_id)
+            else:
+                self._schedule(media_group_id, buffer)
+            return None
+
+        if len(self.album_data) >= self.max_groups:
+            # Слишком много незавершенных альбомов - отпускаем самый старый
+            self._fire(next(iter(self.album_data)))
+
+        loop = asyncio.get_running_loop()
+        buffer = _AlbumBuffer(event, loop.time(), loop.create_future())
+        self.album_data[media_group_id] = buffer
+        self._schedule(media_group_id, buffer)
+
         try:
-            self.album_data[event.media_group_id].append(event)
-            print(f"Добавлено в группу, сейчас файлов: {len(self.album_data[event.media_group_id])}")
-        except KeyError:
-            self.album_data[event.media_group_id] = [event]
-            print("Создана новая группа")
-
-        # Ждем немного, чтобы собрать все сообщения
-        await asyncio.sleep(1.2)
-
-        # Добавляем в data и вызываем хендлер только для последнего сообщения
-        data["album"] = self.album_data[event.media_group_id]
-
-        if event.message_id == max(m.message_id for m in self.album_data[event.media_group_id]):
-            print(f"Отправка в хендлер, всего файлов: {len(data['album'])}")
-            try:
-                return await handler(event, data)
-            finally:
-                del self.album_data[event.media_group_id]
-
-        return None
\ No newline at end of file
+            await buffer.done
+        finally:
+            if self.album_data.get(media_group_id) is buffer:
+                self._fire(media_group_id)
+
+        latency = loop.time() - buffer.started
+        self.albums_total += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+        album = sorted(buffer.messages, key=lambda message: message.message_id)
+        data["album"] = album
+        logger.debug(f"Отправка в хендлер, всего файлов: {len(album)}, сборка {latency:.3f} с")
+        return await handler(album[-1], data)
@@ -0,0 +1,62 @@
+from typing import Callable, Dict, Any, Awaitable, Hashable, Set
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from utils.cache import TTLCache
+from utils.metrics import CALLBACK_SUPPRESSED
+
+# Действие callback_data -> ответ на нажатие, которое пришлось на уже обрабатываемую задачу
+TASK_ACTIONS = {
+    "take_task": "Задачу уже берут в работу",
+    "cancel_execute": "Задача уже обрабатывается",
+    "complete_task": "Задача уже обрабатывается",
+}
+
+
+class TaskCallbackGuardMiddleware(BaseMiddleware):
+    """
+    Подавление повторных нажатий на кнопки задач (take_task/cancel_execute/complete_task).
+
+    - Повторно доставленный callback_query с тем же id в течение window секунд
+      отбрасывается без обработки.
+    - Пока нажатие по задаче обрабатывается, остальные нажатия по той же задаче
+      сразу получают answerCallbackQuery и не доходят до API.
+
+    Регистрируется как outer-мидлварь dp.callback_query до UserMiddleware,
+    чтобы отброшенные нажатия не загружали профиль.
+    """
+
+    def __init__(self, window: float = 10.0, max_entries: int = 100000):
+        """
+        Args:
+            window: Окно дедупликации в секундах
+            max_entries: Максимум запоминаемых callback_query_id
+        """
+        self.seen = TTLCache(maxsize=max_entries, ttl=window)
+        self.inflight: Set[Hashable] = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        action, _, task_id = (event.data or "").partition(":")
+        if action not in TASK_ACTIONS or not task_id:
+            return await handler(event, data)
+
+        if event.id in self.seen:
+            CALLBACK_SUPPRESSED.inc(action=action, reason="duplicate_id")
+            return None
+        self.seen.set(event.id, True)
+
+        if task_id in self.inflight:
+            CALLBACK_SUPPRESSED.inc(action=action, reason="inflight")
+            await event.answer(TASK_ACTIONS[action])
+            return None
+
+        self.inflight.add(task_id)
+        try:
+            return await handler(event, data)
+        finally:
+            self.inflight.discard(task_id)
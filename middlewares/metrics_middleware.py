@@ -0,0 +1,95 @@
+import time
+from typing import Callable, Dict, Any, Awaitable, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import HANDLER_SECONDS, MIDDLEWARE_SECONDS, UPDATE_ERRORS, UPDATE_SECONDS
+from utils.tracing import span
+
+# Ключ data с суммарным собственным временем мидлварей, обернутых в TimedMiddleware
+MIDDLEWARE_TIME_KEY = "middleware_seconds"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Полное время обработки апдейта по типу события.
+    Регистрируется как outer-мидлварь dp.update, чтобы учесть все мидлвари и фильтры.
+    """
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        event_type = event.event_type
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            UPDATE_ERRORS.inc(event_type=event_type)
+            raise
+        finally:
+            UPDATE_SECONDS.observe(time.perf_counter() - started, event_type=event_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Время работы хендлера по имени функции.
+    Регистрируется как inner-мидлварь диспетчера (действует и во вложенных роутерах);
+    собственное время вложенных TimedMiddleware (например, сборка альбома) не учитывается.
+    """
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object is not None else "unknown"
+        nested_before = data.get(MIDDLEWARE_TIME_KEY, 0.0)
+        started = time.perf_counter()
+        try:
+            with span(f"handler:{name}"):
+                return await handler(event, data)
+        finally:
+            nested = data.get(MIDDLEWARE_TIME_KEY, 0.0) - nested_before
+            HANDLER_SECONDS.observe(max(0.0, time.perf_counter() - started - nested), handler=name)
+
+
+class TimedMiddleware(BaseMiddleware):
+    """
+    Обертка, измеряющая собственное время мидлвари (без последующих обработчиков)
+    """
+    def __init__(self, middleware: BaseMiddleware, name: Optional[str] = None):
+        """
+        Args:
+            middleware: Измеряемая мидлварь
+            name: Значение метки middleware (по умолчанию - имя класса)
+        """
+        self.middleware = middleware
+        self.name = name or type(middleware).__name__
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        downstream = 0.0
+
+        async def timed_handler(event: TelegramObject, data: Dict[str, Any]) -> Any:
+            nonlocal downstream
+            handler_started = time.perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                downstream += time.perf_counter() - handler_started
+
+        started = time.perf_counter()
+        try:
+            with span(f"middleware:{self.name}"):
+                return await self.middleware(timed_handler, event, data)
+        finally:
+            own = time.perf_counter() - started - downstream
+            MIDDLEWARE_SECONDS.observe(own, middleware=self.name)
+            data[MIDDLEWARE_TIME_KEY] = data.get(MIDDLEWARE_TIME_KEY, 0.0) + own
@@ -0,0 +1,49 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+
+from utils.tracing import Tracer, span
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Открывает трассировку на каждый апдейт.
+    Регистрируется как outer-мидлварь dp.update; дочерние участки добавляют
+    TimedMiddleware, HandlerMetricsMiddleware, RoleFilter, API-клиент и BotTracingMiddleware.
+    """
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        trace = self.tracer.start(
+            f"update:{event.event_type}",
+            update_id=event.update_id,
+            user_id=user.id if user else None
+        )
+        try:
+            result = await handler(event, data)
+        except Exception as e:
+            self.tracer.finish(trace, e)
+            raise
+        self.tracer.finish(trace)
+        return result
+
+
+class BotTracingMiddleware(BaseRequestMiddleware):
+    """Участок трассировки на каждый запрос к Bot API (bot.session.middleware)"""
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod
+    ):
+        with span(f"bot:{method.__api_method__}"):
+            return await make_request(bot, method)
@@ -4,17 +4,21 @@ from aiogram.types import Message
 from loader import api
 
 class UserMiddleware(BaseMiddleware):
+    """
+    Загружает профиль пользователя один раз на апдейт и кладёт его в data['user'].
+    Регистрируется как outer-мидлварь, чтобы профиль был доступен фильтрам (RoleFilter).
+    """
     async def __call__(
         self,
         handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
         event: Message,
         data: Dict[str, Any]
     ) -> Any:
-        # Получаем пользователя из API
+        # Получаем пользователя из API (через кэш профилей)
         try:
             user = await api.get_user(event.from_user.id)
             data['user'] = user
-            if user['is_banned']:
+            if user and user['is_banned']:
                 return
         except:
             data['user'] = None
@@ -0,0 +1,283 @@
+"""
+Многопроцессная обработка апдейтов.
+
+Один процесс приема (long polling или вебхук) получает апдейты в сыром виде,
+определяет ключ разговора (чат, иначе пользователь) и передает апдейт одному
+из N рабочих процессов. Апдейты одного чата всегда попадают в один процесс
+и обрабатываются в нем по порядку. Каждый рабочий процесс создает собственные
+бот, сессию TaskManagementAPI и подключение к FSM-хранилищу (loader.py).
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue as queue_module
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Разделы апдейта, в которых есть чат или пользователь
+_UPDATE_SECTIONS = (
+    "message", "edited_message", "channel_post", "edited_channel_post", "callback_query",
+    "my_chat_member", "chat_member", "chat_join_request", "inline_query", "chosen_inline_result",
+    "pre_checkout_query", "shipping_query", "poll_answer", "message_reaction", "business_message"
+)
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Согласованное хеширование (Jump Consistent Hash, Lamping & Veach)"""
+    key &= 0xFFFFFFFFFFFFFFFF
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def shard_key(update: Dict[str, Any]) -> int:
+    """Ключ разговора: ID чата, иначе ID пользователя, иначе update_id"""
+    for section in _UPDATE_SECTIONS:
+        payload = update.get(section)
+        if not payload:
+            continue
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+    return update.get("update_id", 0)
+
+
+async def process_updates(updates: multiprocessing.Queue, dispatcher: Dispatcher, bot: Bot) -> int:
+    """
+    Обработка апдейтов из очереди в рабочем процессе
+
+    Апдейты разных чатов обрабатываются параллельно, одного чата - по порядку.
+    Завершается при получении None.
+
+    Returns:
+        int: Количество обработанных апдейтов
+    """
+    loop = asyncio.get_running_loop()
+    # key -> [блокировка чата, количество ожидающих апдейтов]
+    chats: Dict[int, list] = {}
+    tasks = set()
+    processed = 0
+
+    async def feed(payload: Dict[str, Any]):
+        nonlocal processed
+        try:
+            update = Update.model_validate(payload, context={"bot": bot})
+            await dispatcher.feed_update(bot, update)
+        except Exception as e:
+            logger.error(f"Ошибка обработки апдейта: {e}", exc_info=True)
+        finally:
+            processed += 1
+
+    async def handle(key: int, raw: str):
+        chat = chats[key]
+        payload = json.loads(raw)
+        if (payload.get("message") or {}).get("media_group_id"):
+            # Часть альбома ждет обработки предыдущих апдейтов чата, но не держит блокировку:
+            # первая часть ждет в AlbumMiddleware остальные, и они должны дойти до нее
+            async with chat[0]:
+                pass
+            await feed(payload)
+        else:
+            async with chat[0]:
+                await feed(payload)
+        chat[1] -= 1
+        if not chat[1]:
+            del chats[key]
+
+    while True:
+        item = await loop.run_in_executor(None, updates.get)
+        if item is None:
+            break
+        key, raw = item
+        chats.setdefault(key, [asyncio.Lock(), 0])[1] += 1
+        task = asyncio.create_task(handle(key, raw))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return processed
+
+
+def worker_main(index: int, workers: int, updates: multiprocessing.Queue):
+    """Точка входа рабочего процесса: полноценный бот без приема апдейтов"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker-{index} - %(levelname)s - %(message)s'
+    )
+
+    async def run():
+        from loader import dp, bot, api, sender, outbox, replica, config, readiness
+        from app import setup_dispatcher, tracer
+        from utils.metrics import start_metrics_server
+        from utils.warmup import health_handler
+
+        # Кэши у процессов разные (свои шарды пользователей) - и снимки тоже
+        if config.cache_snapshot_path:
+            config.cache_snapshot_path = f"{config.cache_snapshot_path}.worker{index}"
+        # Очередь уведомлений тоже своя: уведомления доставляет процесс, который их создал
+        outbox.path = f"{outbox.path}.worker{index}"
+        # Реплика - тоже: SQLite с одним писателем, а списки нужны каждому процессу
+        if replica is not None:
+            replica.path = f"{replica.path}.worker{index}"
+        setup_dispatcher()
+        # Глобальный лимит Telegram делится между процессами
+        sender.global_bucket.rate /= workers
+        sender.global_bucket.capacity /= workers
+        metrics_runner = None
+        if config.metrics_enabled:
+            metrics_runner = await start_metrics_server(
+                config.metrics_host, config.metrics_port + 1 + index, health=health_handler(readiness)
+            )
+        await dp.emit_startup(bot=bot, dispatcher=dp)
+        try:
+            processed = await process_updates(updates, dp, bot)
+            logger.info(f"Worker {index}: обработано апдейтов: {processed}")
+        finally:
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            if tracer is not None:
+                tracer.close()
+            await dp.emit_shutdown(bot=bot, dispatcher=dp)
+            await dp.storage.close()
+            await bot.session.close()
+            await api.close()
+
+    asyncio.run(run())
+
+
+class ShardedIntake:
+    """Распределение апдейтов по рабочим процессам"""
+
+    def __init__(
+            self,
+            workers: int,
+            target: Callable[..., None] = worker_main,
+            queue_size: int = 1000
+    ):
+        """
+        Args:
+            workers: Количество рабочих процессов
+            target: Точка входа рабочего процесса: target(index, workers, queue)
+            queue_size: Размер очереди каждого процесса
+        """
+        context = multiprocessing.get_context("spawn")
+        self.queues: List[multiprocessing.Queue] = [context.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.processes = [
+            context.Process(target=target, args=(index, workers, self.queues[index]), name=f"bot-worker-{index}")
+            for index in range(workers)
+        ]
+        self.dispatched = [0] * workers
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    async def dispatch(self, update: Dict[str, Any], raw: Optional[str] = None):
+        """Передача апдейта процессу, отвечающему за его чат"""
+        key = shard_key(update)
+        index = jump_hash(key, len(self.queues))
+        item: Tuple[int, str] = (key, raw if raw is not None else json.dumps(update))
+        try:
+            self.queues[index].put_nowait(item)
+        except queue_module.Full:
+            # Обратное давление: ждем освобождения очереди, не блокируя цикл событий
+            await asyncio.get_running_loop().run_in_executor(None, self.queues[index].put, item)
+        self.dispatched[index] += 1
+
+    async def stop(self):
+        loop = asyncio.get_running_loop()
+        for updates in self.queues:
+            await loop.run_in_executor(None, updates.put, None)
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join)
+
+
+async def poll_raw_updates(bot: Bot, intake: ShardedIntake, allowed_updates: List[str], timeout: int = 30):
+    """Long polling без разбора апдейтов в моделях aiogram (разбор выполняют рабочие процессы)"""
+    url = bot.session.api.api_url(token=bot.token, method="getUpdates")
+    offset = None
+    async with aiohttp.ClientSession() as session:
+        while True:
+            params = {"timeout": timeout, "allowed_updates": json.dumps(allowed_updates)}
+            if offset is not None:
+                params["offset"] = offset
+            try:
+                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout + 10)) as response:
+                    payload = await response.json(loads=json.loads)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"getUpdates: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if not payload.get("ok"):
+                logger.warning(f"getUpdates: {payload.get('description')}")
+                await asyncio.sleep((payload.get("parameters") or {}).get("retry_after", 1))
+                continue
+
+            for update in payload["result"]:
+                offset = update["update_id"] + 1
+                await intake.dispatch(update)
+
+
+def create_intake_webhook_app(intake: ShardedIntake, config: Config) -> web.Application:
+    """Вебхук процесса приема: проверяет секрет и передает апдейт рабочему процессу"""
+
+    async def handle(request: web.Request) -> web.Response:
+        if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != config.webhook_secret:
+            return web.Response(status=401, text="Unauthorized")
+        raw = await request.text()
+        await intake.dispatch(json.loads(raw), raw)
+        return web.Response()
+
+    async def health(request: web.Request) -> web.Response:
+        alive = sum(process.is_alive() for process in intake.processes)
+        return web.json_response({"status": "ok" if alive == len(intake.processes) else "degraded",
+                                  "workers": alive})
+
+    app = web.Application()
+    app.router.add_post(config.webhook_path, handle)
+    app.router.add_get("/health", health)
+    return app
+
+
+async def run_sharded(dispatcher: Dispatcher, bot: Bot, config: Config):
+    """Запуск процесса приема и config.workers рабочих процессов"""
+    intake = ShardedIntake(workers=config.workers)
+    intake.start()
+    logger.info(f"Started {config.workers} worker processes")
+    allowed_updates = dispatcher.resolve_used_update_types()
+    runner = None
+    try:
+        if config.webhook_url:
+            runner = web.AppRunner(create_intake_webhook_app(intake, config))
+            await runner.setup()
+            await web.TCPSite(runner, host=config.web_host, port=config.web_port).start()
+            await bot.set_webhook(
+                url=config.webhook_url.rstrip('/') + config.webhook_path,
+                secret_token=config.webhook_secret,
+                allowed_updates=allowed_updates
+            )
+            await asyncio.Event().wait()
+        else:
+            await bot.delete_webhook()
+            await poll_raw_updates(bot, intake, allowed_updates)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        await intake.stop()
@@ -1,10 +1,25 @@
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Tuple, Mapping
 from enum import Enum
+import asyncio
+import logging
+import time
 import aiohttp
 from datetime import datetime
 import json
 from dataclasses import dataclass
 
+from utils.cache import TTLCache, MISSING, VersionCounter
+from utils.http_cache import CacheEntry, ResponseCache
+from utils.models import Envelope, ModelDecodeError, Task, User, get_decoder
+from utils.metrics import API_REQUEST_ERRORS, API_REQUEST_SECONDS, API_REQUESTS_IN_FLIGHT, endpoint_template
+from utils.single_flight import SingleFlight
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Поля профиля, которые читают UserMiddleware и RoleFilter
+PROFILE_FIELDS = ("user_id", "type", "is_banned")
+
 
 class APIError(Exception):
     """Базовый класс для ошибок API"""
@@ -29,6 +44,15 @@ class UserType(Enum):
     REG = "regestration"
 
 
+def _freeze(value: Any) -> Any:
+    """Приведение параметров запроса к хешируемому виду"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
 @dataclass
 class APIResponse:
     """Класс для структурированного ответа API"""
@@ -36,22 +60,47 @@ class APIResponse:
     data: Optional[Union[Dict, List]] = None
     message: Optional[str] = None
     error: Optional[str] = None
+    total: Optional[int] = None
 
 
 class TaskManagementAPI:
     """Клиент API для управления задачами"""
 
-    def __init__(self, base_url: str, timeout: int = 30):
+    def __init__(
+            self,
+            base_url: str,
+            timeout: int = 30,
+            user_cache_ttl: float = 60,
+            user_cache_size: int = 10000,
+            single_flight: bool = False,
+            cache_rules: Optional[Dict[str, float]] = None,
+            cache_max_bytes: int = 8 * 1024 * 1024
+    ):
         """
         Инициализация клиента API
 
         Args:
             base_url: Базовый URL API
             timeout: Таймаут запросов в секундах
+            user_cache_ttl: Время жизни профиля пользователя в кэше (секунды)
+            user_cache_size: Максимальное количество профилей в кэше
+            single_flight: Объединять одинаковые одновременные GET-запросы в один
+            cache_rules: Кэшируемые эндпоинты: шаблон пути -> max-age в секундах
+            cache_max_bytes: Максимальный размер кэша ответов в байтах
         """
         self.base_url = base_url.rstrip('/')
         self.session: Optional[aiohttp.ClientSession] = None
         self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.user_cache = TTLCache(maxsize=user_cache_size, ttl=user_cache_ttl)
+        # Версия сбросов профилей и версия последнего сброса каждого профиля (хранится, пока может
+        # выполняться запрос, начатый до сброса): ответ, полученный до сброса, не кэшируется
+        self.users_version = VersionCounter()
+        self._user_invalidated = TTLCache(maxsize=user_cache_size, ttl=timeout)
+        self.single_flight = SingleFlight() if single_flight else None
+        self.response_cache = ResponseCache(cache_rules, cache_max_bytes) if cache_rules else None
+        # None - еще неизвестно, есть ли на сервере пакетные эндпоинты вложений и задач
+        self._bulk_attachments_supported: Optional[bool] = None
+        self._bulk_tasks_supported: Optional[bool] = None
 
     async def __aenter__(self):
         """Поддержка контекстного менеджера"""
@@ -76,10 +125,27 @@ class TaskManagementAPI:
             await self.session.close()
             self.session = None
 
+    def invalidate_user(self, user_id: Union[int, str]):
+        """Удаление профиля пользователя из кэша"""
+        self.user_cache.pop(int(user_id))
+        self._user_invalidated.set(int(user_id), self.users_version.bump())
+
+    @property
+    def single_flight_stats(self) -> Dict[str, int]:
+        """Счетчики объединения запросов: hits - запросы, получившие чужой результат"""
+        if self.single_flight is None:
+            return {"hits": 0, "misses": 0, "inflight": 0}
+        return {
+            "hits": self.single_flight.hits,
+            "misses": self.single_flight.misses,
+            "inflight": self.single_flight.inflight
+        }
+
     async def _request(
             self,
             method: str,
             endpoint: str,
+            model: Any = None,
             **kwargs
     ) -> APIResponse:
         """
@@ -88,6 +154,7 @@ class TaskManagementAPI:
         Args:
             method: HTTP-метод
             endpoint: Эндпоинт API
+            model: Тип поля data для декодирования в модели (utils.models), None - словари
             **kwargs: Дополнительные параметры запроса
 
         Returns:
@@ -96,34 +163,191 @@ class TaskManagementAPI:
         Raises:
             APIError: При ошибке запроса
         """
+        with span("api", method=method, endpoint=endpoint_template(endpoint)):
+            if method != 'GET':
+                response = await self._send(method, endpoint, model, **kwargs)
+                if self.response_cache is not None:
+                    self.response_cache.invalidate(endpoint)
+                return response
+
+            if self.single_flight is not None:
+                key = (method, endpoint, model, _freeze(kwargs))
+                return await self.single_flight.do(key, lambda: self._get(endpoint, model, **kwargs))
+            return await self._get(endpoint, model, **kwargs)
+
+    async def _get(self, endpoint: str, model: Any = None, **kwargs) -> APIResponse:
+        """GET-запрос через кэш ответов (если эндпоинт кэшируется)"""
+        cache = self.response_cache
+        max_age = cache.max_age(endpoint) if cache is not None else None
+        if max_age is None:
+            return await self._send('GET', endpoint, model, **kwargs)
+
+        key = (endpoint, _freeze(kwargs.get('params')), model)
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh(max_age):
+            cache.record_hit(entry)
+            return self._make_response(200, entry.payload)
+
+        if entry is not None:
+            kwargs['headers'] = {**kwargs.get('headers', {}), **entry.conditional_headers()}
+        status, headers, response_data, size = await self._fetch('GET', endpoint, model, **kwargs)
+
+        if status == 304:
+            if entry is not None and cache.get(key) is entry:
+                entry.stored_at = time.monotonic()
+                cache.record_hit(entry, revalidated=True)
+                return self._make_response(200, entry.payload)
+            # Сохраненный ответ вытеснен или сброшен (invalidate), пока шел запрос: это промах,
+            # ответ запрашивается заново без условных заголовков
+            kwargs['headers'] = {
+                name: value for name, value in kwargs.get('headers', {}).items()
+                if name not in ('If-None-Match', 'If-Modified-Since')
+            }
+            status, headers, response_data, size = await self._fetch('GET', endpoint, model, **kwargs)
+            if status == 304:
+                raise APIError(f"Ответ 304 без сохраненного ответа: {endpoint}", status_code=304)
+
+        cache.misses += 1
+        response = self._make_response(status, response_data)
+        if 'no-store' in headers.get('Cache-Control', ''):
+            cache.discard(key)
+        else:
+            cache.store(key, CacheEntry(
+                payload=response_data,
+                size=size,
+                etag=headers.get('ETag'),
+                last_modified=headers.get('Last-Modified')
+            ))
+        return response
+
+    async def _send(
+            self,
+            method: str,
+            endpoint: str,
+            model: Any = None,
+            **kwargs
+    ) -> APIResponse:
+        """Непосредственная отправка HTTP-запроса (см. _request)"""
+        status, _, response_data, _ = await self._fetch(method, endpoint, model, **kwargs)
+        return self._make_response(status, response_data)
+
+    async def _fetch(
+            self,
+            method: str,
+            endpoint: str,
+            model: Any = None,
+            **kwargs
+    ) -> Tuple[int, Mapping[str, str], Any, int]:
+        """
+        Отправка HTTP-запроса и разбор тела ответа
+
+        Успешный ответ при заданном model декодируется в Envelope с моделями,
+        иначе (и для ошибок) - в словарь.
+
+        Returns:
+            Tuple: Статус, заголовки, разобранное тело (None для 304) и размер тела в байтах
+        """
         await self._ensure_session()
+        labels = {"method": method, "endpoint": endpoint_template(endpoint)}
+        API_REQUESTS_IN_FLIGHT.inc(**labels)
+        started = time.perf_counter()
         try:
             async with self.session.request(
                     method,
                     f"{self.base_url}{endpoint}",
                     **kwargs
             ) as response:
-                response_data = await response.json()
-
-                if not response.ok:
-                    raise APIError(
-                        message=response_data.get('detail', 'Unknown error'),
-                        status_code=response.status,
-                        response_data=response_data
-                    )
-
-                return APIResponse(
-                    success=True,
-                    data=response_data.get('data'),
-                    message=response_data.get('message')
-                )
+                if response.status >= 400:
+                    API_REQUEST_ERRORS.inc(status=str(response.status), **labels)
+                if response.status == 304:
+                    return response.status, response.headers.copy(), None, 0
+                body = await response.read()
+                if model is not None and response.status < 400:
+                    response_data = get_decoder(model)(body)
+                else:
+                    response_data = json.loads(body)
+                return response.status, response.headers.copy(), response_data, len(body)
         except aiohttp.ClientError as e:
+            API_REQUEST_ERRORS.inc(status="network", **labels)
             raise APIError(f"Network error: {str(e)}")
-        except json.JSONDecodeError:
+        except asyncio.TimeoutError:
+            API_REQUEST_ERRORS.inc(status="timeout", **labels)
+            raise
+        except (json.JSONDecodeError, *ModelDecodeError):
+            API_REQUEST_ERRORS.inc(status="invalid_json", **labels)
             raise APIError("Invalid JSON response")
+        finally:
+            API_REQUESTS_IN_FLIGHT.dec(**labels)
+            API_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+
+    @staticmethod
+    def _make_response(status: int, response_data: Any) -> APIResponse:
+        """Преобразование разобранного ответа в APIResponse или APIError"""
+        if isinstance(response_data, Envelope):
+            return APIResponse(
+                success=True,
+                data=response_data.data,
+                message=response_data.message,
+                total=response_data.total
+            )
+        if status >= 400:
+            raise APIError(
+                message=response_data.get('detail', 'Unknown error'),
+                status_code=status,
+                response_data=response_data
+            )
+
+        return APIResponse(
+            success=True,
+            data=response_data.get('data'),
+            message=response_data.get('message'),
+            total=response_data.get('total')
+        )
+
+    async def _get_page(
+            self,
+            endpoint: str,
+            page: int,
+            page_size: int,
+            item_model: Any = None
+    ) -> Tuple[List[Any], int]:
+        """
+        Получение одной страницы списка
+
+        Args:
+            endpoint: Эндпоинт списка
+            page: Номер страницы (с 1)
+            page_size: Размер страницы
+            item_model: Модель элемента (utils.models), None - словари
+
+        Returns:
+            Tuple[List, int]: Элементы страницы и общее количество элементов
+        """
+        response = await self._request(
+            'GET',
+            endpoint,
+            List[item_model] if item_model is not None else None,
+            params={'page': str(page), 'page_size': str(page_size)}
+        )
+        items = response.data or []
+        if response.total is not None:
+            return items, response.total
+
+        # Сервер не поддерживает пагинацию и вернул весь список - режем локально
+        start = (page - 1) * page_size
+        return items[start:start + page_size], len(items)
 
     # Users
 
+    async def get_users_page(
+            self,
+            page: int = 1,
+            page_size: int = 50,
+            typed: bool = False
+    ) -> Tuple[Union[List[Dict], List[User]], int]:
+        """Получение страницы списка пользователей и их общего количества (typed - модели User)"""
+        return await self._get_page('/users/all/list', page, page_size, User if typed else None)
+
     async def get_all_users(self) -> List[dict]:
         """Получение списка всех пользователей"""
         try:
@@ -132,13 +356,35 @@ class TaskManagementAPI:
         except Exception as e:
             return str(e)
 
+    async def warm_user_cache(self) -> int:
+        """
+        Загрузка всех профилей в кэш одним запросом (прогрев при старте)
+
+        Кэшируются только строки списка со всеми полями профиля: без is_banned
+        UserMiddleware не отличит забаненного пользователя, такие профили
+        загрузит get_user при первом обращении.
+
+        Returns:
+            int: Количество загруженных профилей
+        """
+        response = await self._request('GET', '/users/all/list')
+        warmed = 0
+        for user in response.data or []:
+            if all(field in user for field in PROFILE_FIELDS):
+                self.user_cache.set(int(user['user_id']), user)
+                warmed += 1
+        return warmed
+
     async def update_user_type(self, user_id: int, new_type: str) -> dict:
         """Изменение типа пользователя"""
-        return await self._request(
-            'PUT',
-            f'/users/{user_id}/type',
-            json={"new_type": new_type}
-        )
+        try:
+            return await self._request(
+                'PUT',
+                f'/users/{user_id}/type',
+                json={"new_type": new_type}
+            )
+        finally:
+            self.invalidate_user(user_id)
 
     async def get_user(self, user_id: int) -> Optional[Dict]:
         """
@@ -150,13 +396,25 @@ class TaskManagementAPI:
         Returns:
             Dict: Информация о пользователе или None если пользователь не найден
         """
+        key = int(user_id)
+        user = self.user_cache.get(key, MISSING)
+        if user is not MISSING:
+            return user
+
+        version = self.users_version.value
         try:
             response = await self._request('GET', f'/users/{user_id}')
-            return response.data
+            user = response.data
         except APIError as e:
-            if e.status_code == 404:
-                return None
-            raise
+            if e.status_code != 404:
+                raise
+            user = None
+
+        # Незарегистрированные пользователи тоже кэшируются: register_user сбрасывает запись.
+        # Если профиль сбросили, пока шел запрос (например, регистрация), ответ мог устареть
+        if self._user_invalidated.get(key, 0) <= version:
+            self.user_cache.set(key, user)
+        return user
 
     async def register_user(
             self,
@@ -186,7 +444,10 @@ class TaskManagementAPI:
             "type": user_type,
             "user_name": username
         }
-        response = await self._request('POST', '/users/', json=data)
+        try:
+            response = await self._request('POST', '/users/', json=data)
+        finally:
+            self.invalidate_user(user_id)
         return response.data
 
     # Tasks
@@ -200,7 +461,10 @@ class TaskManagementAPI:
         Returns:
             Dict: Результат операции
         """
-        response = await self._request('POST', f'/users/{user_id}/ban')
+        try:
+            response = await self._request('POST', f'/users/{user_id}/ban')
+        finally:
+            self.invalidate_user(user_id)
         return response.data
 
     async def unban_user(self, user_id: int) -> Dict:
@@ -213,7 +477,10 @@ class TaskManagementAPI:
         Returns:
             Dict: Результат операции
         """
-        response = await self._request('POST', f'/users/{user_id}/unban')
+        try:
+            response = await self._request('POST', f'/users/{user_id}/unban')
+        finally:
+            self.invalidate_user(user_id)
         return response.data
 
     async def check_ban_status(self, user_id: int) -> Dict:
@@ -351,9 +618,37 @@ class TaskManagementAPI:
         response = await self._request('GET', '/tasks/incomplete')
         return response.data
 
-    async def get_all_tasks(self) -> List[Dict]:
-        """Получение всех задач"""
-        response = await self._request('GET', '/tasks/all')
+    async def get_completed_tasks_page(
+            self,
+            page: int = 1,
+            page_size: int = 50,
+            typed: bool = False
+    ) -> Tuple[Union[List[Dict], List[Task]], int]:
+        """Получение страницы завершенных задач и их общего количества (typed - модели Task)"""
+        return await self._get_page('/tasks/completed', page, page_size, Task if typed else None)
+
+    async def get_incomplete_tasks_page(
+            self,
+            page: int = 1,
+            page_size: int = 50,
+            typed: bool = False
+    ) -> Tuple[Union[List[Dict], List[Task]], int]:
+        """Получение страницы незавершенных задач и их общего количества (typed - модели Task)"""
+        return await self._get_page('/tasks/incomplete', page, page_size, Task if typed else None)
+
+    async def get_all_tasks(self, updated_since: Optional[str] = None) -> List[Dict]:
+        """
+        Получение всех задач
+
+        Args:
+            updated_since: Только задачи с updated_at не раньше указанного (включительно);
+                сервер без поддержки параметра вернет все задачи
+
+        Returns:
+            List[Dict]: Список задач
+        """
+        params = {'updated_since': updated_since} if updated_since is not None else None
+        response = await self._request('GET', '/tasks/all', params=params)
         return response.data
 
     async def get_tasks_by_status(self, status: str) -> List[Dict]:
@@ -409,18 +704,19 @@ class TaskManagementAPI:
         response = await self._request('GET', f'/users/by-type/{user_type}')
         return response.data
 
-    async def get_task(self, task_id: int) -> Optional[Dict]:
+    async def get_task(self, task_id: int, typed: bool = False) -> Optional[Union[Dict, Task]]:
         """
         Получение информации о задаче по ID
 
         Args:
             task_id: ID задачи
+            typed: Вернуть модель Task вместо словаря
 
         Returns:
-            Dict: Информация о задаче или None если задача не найдена
+            Dict | Task: Информация о задаче или None если задача не найдена
         """
         try:
-            response = await self._request('GET', f'/tasks/{task_id}/full')
+            response = await self._request('GET', f'/tasks/{task_id}/full', Task if typed else None)
             return response.data
         except APIError as e:
             if e.status_code == 404:
@@ -530,6 +826,60 @@ class TaskManagementAPI:
         response = await self._request('POST', '/tasks/', json=data)
         return response.data
 
+    async def create_tasks(
+            self,
+            task_message: str,
+            created_by: int,
+            group_ids: List[int],
+            concurrency: int = 5
+    ) -> List[Dict]:
+        """
+        Пакетное создание одной и той же задачи в нескольких группах
+
+        Все задачи создаются одним запросом. Если сервер не поддерживает
+        пакетный эндпоинт, задачи создаются параллельно по одной
+        (не более concurrency запросов одновременно).
+
+        Args:
+            task_message: Текст задачи
+            created_by: ID создателя
+            group_ids: ID групп
+            concurrency: Максимум одновременных запросов в резервном режиме
+
+        Returns:
+            List[Dict]: Созданные задачи в порядке group_ids, у каждой - group_id
+        """
+        if not group_ids:
+            return []
+
+        tasks = [
+            {"task_message": task_message, "created_by": created_by, "group_id": group_id}
+            for group_id in group_ids
+        ]
+        if self._bulk_tasks_supported is not False:
+            try:
+                response = await self._request('POST', '/tasks/bulk', json={"tasks": tasks})
+                self._bulk_tasks_supported = True
+                # Ответ без group_id сопоставляется с группами по порядку
+                return [
+                    task if task.get("group_id") is not None else {**task, "group_id": group_id}
+                    for task, group_id in zip(response.data or [], group_ids)
+                ]
+            except APIError as e:
+                if e.status_code not in (404, 405):
+                    raise
+                logger.info("Пакетное создание задач не поддерживается сервером, используется поштучное")
+                self._bulk_tasks_supported = False
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create_one(task: Dict) -> Dict:
+            async with semaphore:
+                response = await self._request('POST', '/tasks/', json=task)
+                return {**response.data, "group_id": task["group_id"]}
+
+        return list(await asyncio.gather(*(create_one(task) for task in tasks)))
+
     async def get_my_tasks(
             self,
             user_id: int,
@@ -629,6 +979,78 @@ class TaskManagementAPI:
         response = await self._request('POST', '/attachments/', json=data)
         return response.data
 
+    async def add_attachments(
+            self,
+            task_id: int,
+            items: List[Dict],
+            concurrency: int = 5
+    ) -> List[Dict]:
+        """
+        Пакетное добавление вложений задачи
+
+        Все вложения отправляются одним запросом. Если сервер не поддерживает
+        пакетный эндпоинт, вложения добавляются параллельно по одному
+        (не более concurrency запросов одновременно).
+
+        Args:
+            task_id: ID задачи
+            items: Вложения: file_id, file_type и опционально file_name, local_path
+            concurrency: Максимум одновременных запросов в резервном режиме
+
+        Returns:
+            List[Dict]: Информация о созданных вложениях
+        """
+        if not items:
+            return []
+
+        started = time.perf_counter()
+        attachments = [
+            {
+                "task_id": task_id,
+                "file_id": item["file_id"],
+                "file_type": item["file_type"],
+                "file_name": item.get("file_name", ""),
+                "local_path": item.get("local_path", "")
+            }
+            for item in items
+        ]
+
+        mode = "bulk"
+        if self._bulk_attachments_supported is not False:
+            try:
+                response = await self._request(
+                    'POST',
+                    '/attachments/bulk',
+                    json={"task_id": task_id, "attachments": attachments}
+                )
+                self._bulk_attachments_supported = True
+                # Пустой ответ 2xx - вложения уже созданы, повторять их по одному нельзя
+                result = response.data or []
+            except APIError as e:
+                if e.status_code not in (404, 405):
+                    raise
+                logger.info("Пакетная загрузка вложений не поддерживается сервером, используется поштучная")
+                self._bulk_attachments_supported = False
+                mode = "parallel"
+        else:
+            mode = "parallel"
+
+        if mode == "parallel":
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def add_one(attachment: Dict) -> Dict:
+                async with semaphore:
+                    response = await self._request('POST', '/attachments/', json=attachment)
+                    return response.data
+
+            result = list(await asyncio.gather(*(add_one(attachment) for attachment in attachments)))
+
+        logger.info(
+            "Задача %s: %d вложений добавлено за %.3f с (%s)",
+            task_id, len(attachments), time.perf_counter() - started, mode
+        )
+        return result
+
     async def create_group(self, group_id: int, title: str, is_active: bool = True) -> dict:
         """Добавление новой группы"""
         data = {
@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator, Optional, Tuple
+
+# Маркер отсутствия значения (None может быть закэшированным значением)
+MISSING = object()
+
+
+class TTLCache:
+    """LRU-кэш с ограничением времени жизни записей"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        """
+        Инициализация кэша
+
+        Args:
+            maxsize: Максимальное количество записей
+            ttl: Время жизни записи в секундах
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Получение значения, просроченные записи удаляются"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Сохранение значения с вытеснением самых старых записей"""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Удаление записи"""
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        """Очистка кэша"""
+        self._data.clear()
+
+    def clamp(self, ttl: float):
+        """Сокращение оставшегося времени жизни всех записей до ttl секунд"""
+        limit = time.monotonic() + ttl
+        for key, (expires_at, value) in self._data.items():
+            if expires_at > limit:
+                self._data[key] = (limit, value)
+
+    def items(self) -> Iterator[Tuple[Hashable, Any, float]]:
+        """Непросроченные записи: ключ, значение и оставшееся время жизни в секундах"""
+        now = time.monotonic()
+        for key, (expires_at, value) in list(self._data.items()):
+            if expires_at > now:
+                yield key, value, expires_at - now
+
+
+class VersionCounter:
+    """Счетчик версии данных: входит в ключи кэшей, увеличивается при изменении данных"""
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self) -> int:
+        """Отметка об изменении данных"""
+        self.value += 1
+        return self.value
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Iterable, List, Optional
+
+from utils.metrics import FANOUT_DELIVERIES, FANOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Delivery:
+    """Результат доставки одному получателю"""
+    target: Hashable
+    seconds: float
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def fan_out(
+        targets: Iterable[Hashable],
+        deliver: Callable[[Hashable], Awaitable[Any]],
+        concurrency: int = 10
+) -> List[Delivery]:
+    """
+    Параллельная доставка всем получателям
+
+    Одновременно выполняется не более concurrency доставок; ограничения частоты
+    по чатам соблюдает SendScheduler, через который отправляет deliver. Ошибка
+    одного получателя не прерывает доставку остальным.
+
+    Args:
+        targets: Получатели (например, ID групп)
+        deliver: Корутина доставки одному получателю
+        concurrency: Максимум одновременных доставок
+
+    Returns:
+        List[Delivery]: Результаты в порядке targets
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver_one(target: Hashable) -> Delivery:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await deliver(target)
+            except Exception as e:
+                logger.error(f"Рассылка: доставка {target} не удалась: {e}")
+                FANOUT_DELIVERIES.inc(status="error")
+                return Delivery(target, time.perf_counter() - started, error=e)
+            FANOUT_DELIVERIES.inc(status="ok")
+            return Delivery(target, time.perf_counter() - started, result=result)
+
+    started = time.perf_counter()
+    deliveries = list(await asyncio.gather(*(deliver_one(target) for target in targets)))
+    elapsed = time.perf_counter() - started
+    FANOUT_SECONDS.observe(elapsed)
+    logger.info(
+        "Рассылка: %d из %d получателей за %.3f с",
+        sum(delivery.ok for delivery in deliveries), len(deliveries), elapsed
+    )
+    return deliveries
@@ -0,0 +1,196 @@
+import asyncio
+import contextlib
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS fsm_expires_at ON fsm (expires_at);
+"""
+_COLUMNS = ("state", "data")
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище в SQLite (режим WAL).
+
+    Переживает перезапуск бота и может использоваться несколькими процессами
+    с общим файлом базы. Записи копятся в памяти и сбрасываются в базу одной
+    транзакцией раз в flush_interval секунд; до сброса чтения этого процесса
+    видят несохраненные значения. У каждой записи есть срок жизни (ttl),
+    который продлевается при каждом изменении.
+
+    Данные сериализуются в JSON, поэтому в FSM можно хранить только
+    JSON-совместимые значения.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            ttl: Optional[float] = None,
+            flush_interval: float = 0.05,
+            key_builder: Optional[KeyBuilder] = None,
+            json_dumps: Callable[..., str] = json.dumps,
+            json_loads: Callable[..., Any] = json.loads
+    ):
+        """
+        Инициализация хранилища
+
+        Args:
+            path: Путь к файлу базы SQLite
+            ttl: Время жизни записи в секундах (None - бессрочно)
+            flush_interval: Период накопления записей перед сбросом в базу (секунды)
+            key_builder: Построитель ключей (по умолчанию DefaultKeyBuilder с destiny)
+            json_dumps: Функция сериализации данных
+            json_loads: Функция десериализации данных
+        """
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self.json_dumps = json_dumps
+        self.json_loads = json_loads
+
+        # Чтения выполняются в потоке цикла событий, запись - в отдельном потоке
+        self._reader = self._connect()
+        self._reader.executescript(_SCHEMA)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+
+        # key -> {"state": ..., "data": ...} - изменения, еще не записанные в базу
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flushing: Dict[str, Dict[str, Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._last_purge = time.time()
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    # Запись
+
+    def _put(self, key: StorageKey, column: str, value: Any):
+        self._pending.setdefault(self.key_builder.build(key), {})[column] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """Запись накопленных изменений в базу одной транзакцией"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._write_batch, self._flushing
+                )
+                self.flushes += 1
+                self.flushed_rows += len(self._flushing)
+            except Exception as e:
+                logger.error(f"Ошибка записи FSM в SQLite: {e}", exc_info=True)
+                # Возвращаем несохраненные изменения, не затирая более новые
+                for key, columns in self._flushing.items():
+                    self._pending[key] = {**columns, **self._pending.get(key, {})}
+            finally:
+                self._flushing = {}
+
+    def _write_batch(self, batch: Dict[str, Dict[str, Any]]):
+        if self._writer is None:
+            self._writer = self._connect()
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+
+        self._writer.execute("BEGIN")
+        try:
+            for key, columns in batch.items():
+                names = list(columns)
+                # Незаписанный столбец истекшей строки сбрасывается: иначе продление срока его "оживит"
+                kept = [
+                    f"{name} = CASE WHEN fsm.expires_at <= :now THEN NULL ELSE fsm.{name} END"
+                    for name in _COLUMNS if name not in columns
+                ]
+                self._writer.execute(
+                    f"INSERT INTO fsm (key, {', '.join(names)}, expires_at) "
+                    f"VALUES (:key, {', '.join(f':{name}' for name in names)}, :expires_at) "
+                    f"ON CONFLICT(key) DO UPDATE SET "
+                    f"{', '.join([f'{name} = excluded.{name}' for name in names] + kept)}, "
+                    f"expires_at = excluded.expires_at",
+                    {"key": key, **columns, "expires_at": expires_at, "now": now}
+                )
+            if self.ttl and now - self._last_purge > self.ttl / 10:
+                self._writer.execute("DELETE FROM fsm WHERE expires_at <= ?", (now,))
+                self._last_purge = now
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            raise
+
+    # Чтение
+
+    def _read(self, key: StorageKey, column: str) -> Any:
+        built_key = self.key_builder.build(key)
+        for overlay in (self._pending, self._flushing):
+            columns = overlay.get(built_key)
+            if columns is not None and column in columns:
+                return columns[column]
+
+        row = self._reader.execute(
+            f"SELECT {column} FROM fsm WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (built_key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    # BaseStorage
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._put(key, "state", state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._read(key, "state")
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        # Сериализуем сразу, чтобы ошибка возникла в месте вызова, а не при сбросе
+        self._put(key, "data", self.json_dumps(dict(data)))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        raw = self._read(key, "data")
+        return self.json_loads(raw) if raw else {}
+
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_writer)
+        self._executor.shutdown(wait=True)
+        self._reader.close()
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
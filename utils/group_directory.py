@@ -0,0 +1,144 @@
+import logging
+import time
+from typing import Dict, List, Optional, Set, Union
+
+from utils.api_client import TaskManagementAPI
+
+logger = logging.getLogger(__name__)
+
+
+class GroupDirectory:
+    """
+    Справочник групп в памяти процесса.
+
+    Хранит группы по ID и множества ID групп каждого постановщика задач.
+    Все группы загружаются при старте, группы постановщика - при первом
+    обращении. Изменения выполняются через методы справочника: запрос к API
+    и сразу же обновление справочника (write-through).
+
+    Изменения, сделанные в обход процесса (другим рабочим процессом или
+    напрямую в API), приходят из потока событий (utils.invalidation), а без
+    него - при перечитывании: все группы и группы постановщика живут в
+    справочнике не дольше ttl секунд.
+    """
+
+    def __init__(self, api: TaskManagementAPI, ttl: Optional[float] = 300):
+        """
+        Args:
+            api: Клиент API задач
+            ttl: Срок жизни загруженных групп в секундах (None - без перечитывания)
+        """
+        self.api = api
+        self.ttl = ttl
+        self.groups: Dict[int, dict] = {}
+        self.creator_groups: Dict[int, Set[int]] = {}
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._creator_loaded_at: Dict[int, float] = {}
+
+    def _expired(self, loaded_at: float) -> bool:
+        return self.ttl is not None and time.monotonic() - loaded_at > self.ttl
+
+    async def load(self):
+        """Загрузка всех групп; группы постановщиков будут перечитаны при обращении"""
+        groups = await self.api.get_all_groups()
+        self.groups = {int(group['group_id']): group for group in groups}
+        self.creator_groups.clear()
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+        logger.info(f"Справочник групп загружен: {len(self.groups)} групп")
+
+    async def all_groups(self) -> List[dict]:
+        """Список всех групп"""
+        if not self.loaded or self._expired(self.loaded_at):
+            await self.load()
+        return list(self.groups.values())
+
+    def get(self, group_id: Union[int, str]) -> Optional[dict]:
+        """Группа по ID"""
+        return self.groups.get(int(group_id))
+
+    async def get_creator_group_ids(self, user_id: Union[int, str]) -> Set[int]:
+        """ID групп постановщика задач"""
+        user_id = int(user_id)
+        group_ids = self.creator_groups.get(user_id)
+        if group_ids is None or self._expired(self._creator_loaded_at.get(user_id, 0.0)):
+            group_ids = await self._load_creator_groups(user_id)
+        return group_ids
+
+    async def _load_creator_groups(self, user_id: int) -> Set[int]:
+        groups = await self.api.get_creator_groups(user_id)
+        for group in groups:
+            self.groups[int(group['group_id'])] = {**self.groups.get(int(group['group_id']), {}), **group}
+        self._creator_loaded_at[user_id] = time.monotonic()
+        group_ids = self.creator_groups[user_id] = {int(group['group_id']) for group in groups}
+        return group_ids
+
+    async def get_creator_groups(self, user_id: Union[int, str]) -> List[dict]:
+        """Активные группы постановщика задач"""
+        group_ids = await self.get_creator_group_ids(user_id)
+        return [
+            group for group_id, group in self.groups.items()
+            if group_id in group_ids and group.get('is_active', True)
+        ]
+
+    async def refresh_creator_groups(self, user_id: Union[int, str]) -> List[dict]:
+        """Активные группы постановщика задач, перечитанные из API (перед рассылкой)"""
+        group_ids = await self._load_creator_groups(int(user_id))
+        return [
+            group for group_id, group in self.groups.items()
+            if group_id in group_ids and group.get('is_active', True)
+        ]
+
+    # Изменения, пришедшие из потока событий API (utils.invalidation)
+
+    def apply_group(self, group: dict):
+        """Добавление или обновление группы"""
+        self.groups[int(group['group_id'])] = group
+
+    def apply_assignment(self, user_id: Union[int, str], group_id: Union[int, str], assigned: bool):
+        """Назначение или снятие группы постановщика (если его группы уже загружены)"""
+        group_ids = self.creator_groups.get(int(user_id))
+        if group_ids is None:
+            return
+        if assigned and int(group_id) in self.groups:
+            group_ids.add(int(group_id))
+        elif assigned:
+            # Группа неизвестна справочнику - группы постановщика будут перечитаны
+            del self.creator_groups[int(user_id)]
+        else:
+            group_ids.discard(int(group_id))
+
+    def reset(self):
+        """Сброс: все группы будут перечитаны при следующем обращении"""
+        self.loaded = False
+        self.creator_groups.clear()
+        self._creator_loaded_at.clear()
+
+    # Изменения (write-through)
+
+    async def create_group(self, group_id: int, title: str, is_active: bool = True):
+        result = await self.api.create_group(group_id=group_id, title=title, is_active=is_active)
+        self.groups[int(group_id)] = {"group_id": int(group_id), "title": title, "is_active": is_active}
+        return result
+
+    async def update_group_status(self, group_id: Union[int, str], is_active: bool):
+        result = await self.api.update_group_status(group_id=group_id, is_active=is_active)
+        group = self.groups.get(int(group_id))
+        if group is not None:
+            self.groups[int(group_id)] = {**group, "is_active": is_active}
+        return result
+
+    async def assign_group_to_creator(self, user_id: Union[int, str], group_id: Union[int, str]):
+        result = await self.api.assign_group_to_creator(user_id=user_id, group_id=group_id)
+        group_ids = self.creator_groups.get(int(user_id))
+        if group_ids is not None:
+            group_ids.add(int(group_id))
+        return result
+
+    async def remove_group_from_creator(self, user_id: Union[int, str], group_id: Union[int, str]):
+        result = await self.api.remove_group_from_creator(user_id=user_id, group_id=group_id)
+        group_ids = self.creator_groups.get(int(user_id))
+        if group_ids is not None:
+            group_ids.discard(int(group_id))
+        return result
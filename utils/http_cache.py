@@ -0,0 +1,133 @@
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Pattern, Tuple
+
+
+def compile_endpoint_template(template: str) -> Pattern:
+    """Шаблон вида '/users/by-type/{type}' -> регулярное выражение для пути"""
+    parts = re.split(r"(\{[^/{}]+\})", template)
+    return re.compile("".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts) + "$")
+
+
+@dataclass
+class CacheEntry:
+    """Закэшированный ответ API"""
+    payload: Any
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.monotonic)
+
+    def is_fresh(self, max_age: float) -> bool:
+        return time.monotonic() - self.stored_at < max_age
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Заголовки условного запроса для проверки актуальности"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Кэш ответов GET-запросов по правилам HTTP.
+
+    Для эндпоинтов из rules ответ хранится max_age секунд и отдается без
+    запроса к серверу. После этого ответ проверяется условным запросом
+    (If-None-Match / If-Modified-Since): на 304 отдается сохраненный
+    разобранный ответ. Общий размер ограничен max_bytes, при превышении
+    вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, rules: Dict[str, float], max_bytes: int = 8 * 1024 * 1024):
+        """
+        Args:
+            rules: Шаблон эндпоинта -> max-age в секундах, например {'/users/by-type/{type}': 30}
+            max_bytes: Максимальный суммарный размер тел ответов
+        """
+        self.rules = [(compile_endpoint_template(template), max_age) for template, max_age in rules.items()]
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict = OrderedDict()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def max_age(self, endpoint: str) -> Optional[float]:
+        """max-age эндпоинта или None, если эндпоинт не кэшируется"""
+        for pattern, max_age in self.rules:
+            if pattern.match(endpoint):
+                return max_age
+        return None
+
+    def get(self, key: Tuple[str, Hashable]) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key: Tuple[str, Hashable], entry: CacheEntry):
+        """Сохранение ответа с вытеснением старых записей по размеру"""
+        self.discard(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def items(self) -> List[Tuple[Tuple[str, Hashable], CacheEntry]]:
+        """Записи кэша от давно не использованных к недавним"""
+        return list(self._entries.items())
+
+    def discard(self, key: Tuple[str, Hashable]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self):
+        """Удаление всех ответов"""
+        self._entries.clear()
+        self.size = 0
+
+    def invalidate(self, endpoint: str):
+        """Удаление ответов того же ресурса, что и endpoint (по первому сегменту пути)"""
+        prefix = "/" + endpoint.strip("/").split("/")[0]
+        for key in [key for key in self._entries if key[0] == prefix or key[0].startswith(prefix + "/")]:
+            self.discard(key)
+
+    def record_hit(self, entry: CacheEntry, revalidated: bool = False):
+        if revalidated:
+            self.revalidated += 1
+        else:
+            self.hits += 1
+        self.bytes_saved += entry.size
+
+    @property
+    def hit_ratio(self) -> float:
+        """Доля запросов, обслуженных из кэша (включая ответы 304)"""
+        served = self.hits + self.revalidated
+        total = served + self.misses
+        return served / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+            "bytes_saved": self.bytes_saved,
+            "entries": len(self._entries),
+            "bytes": self.size
+        }
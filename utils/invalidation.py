@@ -0,0 +1,196 @@
+"""
+Инвалидация кэшей по потоку событий API задач (Server-Sent Events).
+
+Сервер отдает на INVALIDATION_URL поток text/event-stream:
+
+    id: 42
+    event: user.updated
+    data: {"user": {"user_id": 1, ...}}
+
+События:
+  user.updated / user.created   {"user": {...}}            - профиль заменяется в кэше
+  user.deleted                  {"user_id": 1}             - профиль удаляется из кэша
+  group.updated / group.created {"group": {...}}           - группа заменяется в справочнике
+  group.assigned / unassigned   {"user_id": 1, "group_id": -100}
+  task.*                        {"task": {...}} или {"task_id": 1}
+  reset                         {}                         - пропущенные события не восстановить,
+                                                             кэши сбрасываются целиком
+
+Вместе с изменением сбрасываются закэшированные ответы того же ресурса
+(ResponseCache.invalidate). При обрыве соединение восстанавливается с
+растущей паузой и заголовком Last-Event-ID. Пока поток подключен, профили
+живут в кэше connected_ttl секунд (справочник групп - не меньше); при обрыве
+срок жизни возвращается к обычному (USER_CACHE_TTL, GROUP_DIRECTORY_TTL) и уже
+сохраненные профили его не превышают.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+
+from utils.api_client import TaskManagementAPI
+from utils.group_directory import GroupDirectory
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationListener:
+    """Подписка на поток событий API и применение их к кэшам процесса"""
+
+    def __init__(
+            self,
+            api: TaskManagementAPI,
+            directory: GroupDirectory,
+            url: str,
+            on_tasks_changed: Optional[Callable[[], Any]] = None,
+            connected_ttl: Optional[float] = None,
+            read_timeout: float = 60,
+            max_backoff: float = 30
+    ):
+        """
+        Args:
+            api: Клиент API задач (кэш профилей и кэш ответов)
+            directory: Справочник групп
+            url: Адрес потока; путь ('/events') дополняется адресом API
+            on_tasks_changed: Вызывается при изменении задач (например, tasks_version.bump)
+            connected_ttl: Срок жизни профилей и справочника групп, пока поток подключен (None - не менять)
+            read_timeout: Сколько ждать данных (в том числе пингов) до переподключения, с
+            max_backoff: Максимальная пауза между попытками подключения, с
+        """
+        self.api = api
+        self.directory = directory
+        self.url = api.base_url + url if url.startswith("/") else url
+        self.on_tasks_changed = on_tasks_changed
+        self.connected_ttl = connected_ttl
+        self.base_ttl = api.user_cache.ttl
+        self.base_directory_ttl = directory.ttl
+        self.read_timeout = read_timeout
+        self.max_backoff = max_backoff
+
+        self.last_event_id: Optional[str] = None
+        self.connected = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.events = 0
+        self.reconnects = 0
+        self.resets = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._listen_forever())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    # Подключение
+
+    async def _listen_forever(self):
+        backoff = 1.0
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.read_timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while True:
+                try:
+                    await self._listen(session)
+                    backoff = 1.0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Поток событий API недоступен: {e}")
+                finally:
+                    self._set_connected(False)
+                self.reconnects += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def _listen(self, session: aiohttp.ClientSession):
+        headers = {"Accept": "text/event-stream"}
+        if self.last_event_id is not None:
+            headers["Last-Event-ID"] = self.last_event_id
+        async with session.get(self.url, headers=headers) as response:
+            response.raise_for_status()
+            self._set_connected(True)
+            logger.info(f"Подключен поток событий API (Last-Event-ID: {self.last_event_id})")
+
+            event, data = "message", []
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").rstrip("\r\n")
+                if not line:
+                    # Пустая строка завершает событие
+                    if data:
+                        self._apply(event, "\n".join(data))
+                    event, data = "message", []
+                    continue
+                if line.startswith(":"):
+                    continue
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "event":
+                    event = value
+                elif field == "data":
+                    data.append(value)
+                elif field == "id":
+                    self.last_event_id = value
+
+    def _set_connected(self, connected: bool):
+        if connected == self.connected:
+            return
+        self.connected = connected
+        if self.connected_ttl is None:
+            return
+        if connected:
+            self.api.user_cache.ttl = self.connected_ttl
+            if self.base_directory_ttl is not None:
+                self.directory.ttl = max(self.base_directory_ttl, self.connected_ttl)
+        else:
+            # Без потока изменения не приходят - действует обычное истечение по TTL
+            self.api.user_cache.ttl = self.base_ttl
+            self.api.user_cache.clamp(self.base_ttl)
+            self.directory.ttl = self.base_directory_ttl
+
+    # События
+
+    def _apply(self, event: str, raw: str):
+        try:
+            payload: Dict[str, Any] = json.loads(raw) if raw else {}
+        except ValueError:
+            logger.warning(f"Некорректное событие API {event}: {raw[:200]}")
+            return
+        self.events += 1
+        resource = event.split(".")[0]
+        cache = self.api.response_cache
+
+        if event == "reset":
+            self.resets += 1
+            self.api.user_cache.clear()
+            if cache is not None:
+                cache.clear()
+            self.directory.reset()
+            self._tasks_changed()
+        elif event in ("user.updated", "user.created") and payload.get("user"):
+            user = payload["user"]
+            # Сброс перед записью: ответ get_user, запрошенный до события, не затрет свежий профиль
+            self.api.invalidate_user(user["user_id"])
+            self.api.user_cache.set(int(user["user_id"]), user)
+        elif resource == "user" and payload.get("user_id") is not None:
+            self.api.invalidate_user(payload["user_id"])
+        elif event in ("group.assigned", "group.unassigned"):
+            self.directory.apply_assignment(payload["user_id"], payload["group_id"], event == "group.assigned")
+            # Группы постановщика в кэше ответов лежат под /users/{id}/groups
+            resource = "user"
+        elif resource == "group" and payload.get("group"):
+            self.directory.apply_group(payload["group"])
+        elif resource == "task":
+            self._tasks_changed()
+
+        if cache is not None and resource in ("user", "group", "task"):
+            cache.invalidate(f"/{resource}s")
+
+    def _tasks_changed(self):
+        if self.on_tasks_changed is not None:
+            self.on_tasks_changed()
@@ -0,0 +1,206 @@
+import logging
+import re
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+# Сэмпл сборщика: (имя, тип, описание, [(метки, значение)])
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_SEGMENT = re.compile(r"^-?\d+$")
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Шаблон эндпоинта для меток: '/tasks/15/take' -> '/tasks/{id}/take'"""
+    return "/".join("{id}" if _ID_SEGMENT.match(part) else part for part in endpoint.split("/"))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, value: float = 1, **labels: str):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+                for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и уменьшаться"""
+    type = "gauge"
+
+    def dec(self, value: float = 1, **labels: str):
+        self.inc(-value, **labels)
+
+    def set(self, value: float, **labels: str):
+        self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (обычно длительности в секундах)"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [счетчики по корзинам (+Inf последняя), сумма, количество]
+        self.values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self.values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик процесса в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Сборщик значений, которые считаются в других объектах (кэши, очереди)"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.error(f"Ошибка сборщика метрик: {e}", exc_info=True)
+                continue
+            for name, metric_type, documentation, values in samples:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+API_REQUEST_SECONDS = registry.histogram(
+    "task_api_request_duration_seconds", "Длительность запросов к API задач", ("method", "endpoint"))
+API_REQUEST_ERRORS = registry.counter(
+    "task_api_request_errors_total", "Ошибки запросов к API задач", ("method", "endpoint", "status"))
+API_REQUESTS_IN_FLIGHT = registry.gauge(
+    "task_api_requests_in_flight", "Выполняющиеся запросы к API задач", ("method", "endpoint"))
+UPDATE_SECONDS = registry.histogram(
+    "bot_update_duration_seconds", "Полное время обработки апдейта", ("event_type",))
+UPDATE_ERRORS = registry.counter(
+    "bot_update_errors_total", "Апдейты, завершившиеся исключением", ("event_type",))
+HANDLER_SECONDS = registry.histogram(
+    "bot_handler_duration_seconds", "Время работы хендлера", ("handler",))
+MIDDLEWARE_SECONDS = registry.histogram(
+    "bot_middleware_duration_seconds", "Собственное время мидлвари (без последующих обработчиков)", ("middleware",))
+CALLBACK_SUPPRESSED = registry.counter(
+    "bot_callback_suppressed_total", "Подавленные повторные нажатия кнопок задач", ("action", "reason"))
+FANOUT_SECONDS = registry.histogram(
+    "task_fanout_duration_seconds", "Время рассылки задачи во все выбранные группы")
+FANOUT_DELIVERIES = registry.counter(
+    "task_fanout_deliveries_total", "Доставки задачи в группы при рассылке", ("status",))
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start_metrics_server(host: str, port: int, health: Optional[Callable] = None) -> web.AppRunner:
+    """Запуск HTTP-сервера с эндпоинтом /metrics (и /health, если передан обработчик)"""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    if health is not None:
+        app.router.add_get("/health", health)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
+
+
+def attach_metrics_route(app: web.Application):
+    """Добавление /metrics в уже существующее aiohttp-приложение"""
+    app.router.add_get("/metrics", metrics_handler)
@@ -0,0 +1,184 @@
+"""
+Типизированные модели ответов API задач.
+
+Если установлен msgspec, модели - msgspec.Struct и декодируются прямо из байтов
+ответа одним проходом (с проверкой типов и разбором дат). Без msgspec модели -
+dataclass со __slots__, а ответ разбирается json.loads и затем преобразуется.
+В обоих случаях даты разбираются один раз при декодировании.
+"""
+import dataclasses
+import json
+import typing
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - msgspec необязателен
+    msgspec = None
+
+T = TypeVar("T")
+
+if msgspec is not None:
+    class Model(msgspec.Struct, kw_only=True):
+        """Базовая модель (msgspec.Struct)"""
+
+    def model(cls):
+        return cls
+
+    def list_field():
+        return msgspec.field(default_factory=list)
+
+    class Envelope(msgspec.Struct, Generic[T]):
+        """Конверт ответа API: {"data", "message", "total"}"""
+        data: Optional[T] = None
+        message: Optional[str] = None
+        total: Optional[int] = None
+
+    # Ошибки декодирования ответа (некорректный JSON или несовпадение типов)
+    ModelDecodeError: Tuple[Type[Exception], ...] = (msgspec.DecodeError,)
+else:
+    class Model:
+        """Базовая модель (dataclass со __slots__)"""
+        __slots__ = ()
+
+    model = dataclasses.dataclass(slots=True, kw_only=True)
+
+    def list_field():
+        return dataclasses.field(default_factory=list)
+
+    @dataclasses.dataclass(slots=True)
+    class Envelope(Generic[T]):
+        """Конверт ответа API: {"data", "message", "total"}"""
+        data: Optional[T] = None
+        message: Optional[str] = None
+        total: Optional[int] = None
+
+    ModelDecodeError = (ValueError, TypeError, KeyError)
+
+
+# Кроме ID все поля могут прийти из API как null: строгий декодер msgspec отверг бы
+# из-за одного null весь ответ, поэтому они Optional (значение по умолчанию - для
+# отсутствующего поля, null декодируется в None)
+
+
+@model
+class User(Model):
+    user_id: int
+    name: Optional[str] = None
+    user_name: Optional[str] = None
+    type: Optional[str] = ""
+    is_banned: Optional[bool] = False
+    created_at: Optional[datetime] = None
+
+
+@model
+class Group(Model):
+    group_id: int
+    title: Optional[str] = ""
+    is_active: Optional[bool] = True
+
+
+@model
+class Attachment(Model):
+    file_id: Optional[str] = None
+    file_type: Optional[str] = None
+    attachment_id: Optional[int] = None
+    task_id: Optional[int] = None
+    file_name: Optional[str] = ""
+    local_path: Optional[str] = ""
+
+
+@model
+class HistoryEntry(Model):
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    user_id: Optional[int] = None
+    user_name: Optional[str] = None
+    comment: Optional[str] = None
+
+
+@model
+class Task(Model):
+    task_id: int
+    task_message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    created_by: Optional[int] = None
+    group_id: Optional[int] = None
+    status: Optional[str] = ""
+    priority: Optional[int] = None
+    due_date: Optional[datetime] = None
+    completion_note: Optional[str] = None
+    creator_name: Optional[str] = None
+    group_title: Optional[str] = None
+    taken_by: Optional[List[User]] = list_field()
+    attachments: Optional[List[Attachment]] = list_field()
+    history: Optional[List[HistoryEntry]] = list_field()
+
+
+_converters: Dict[Any, Callable[[Any], Any]] = {}
+
+
+def _converter(annotation: Any) -> Callable[[Any], Any]:
+    """
+    Функция преобразования результата json.loads в тип annotation (без msgspec).
+    Строится один раз на тип, чтобы не разбирать аннотации на каждом значении.
+    """
+    converter = _converters.get(annotation)
+    if converter is not None:
+        return converter
+
+    origin = typing.get_origin(annotation)
+    if origin is Union:
+        options = [option for option in typing.get_args(annotation) if option is not type(None)]
+        inner = _converter(options[0]) if len(options) == 1 else (lambda value: value)
+        converter = lambda value: None if value is None else inner(value)
+    elif origin in (list, List):
+        item, = typing.get_args(annotation)
+        item_converter = _converter(item)
+        converter = lambda value: [item_converter(one) for one in value]
+    elif isinstance(annotation, type) and issubclass(annotation, Model):
+        fields = [(name, _converter(hint)) for name, hint in typing.get_type_hints(annotation).items()]
+
+        def converter(value: Dict[str, Any], cls=annotation, fields=fields):
+            return cls(**{name: convert(value[name]) for name, convert in fields if name in value})
+    elif annotation is datetime:
+        converter = lambda value: value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    elif annotation in (int, float, str):
+        converter = lambda value: value if type(value) is annotation else annotation(value)
+    else:
+        converter = lambda value: value
+    _converters[annotation] = converter
+    return converter
+
+
+_decoders: Dict[Any, Callable[[bytes], Envelope]] = {}
+
+
+def get_decoder(data_type: Any) -> Callable[[bytes], Envelope]:
+    """
+    Декодер тела ответа в Envelope с data типа data_type
+
+    Args:
+        data_type: Тип поля data, например Task или List[Task]
+
+    Returns:
+        Callable[[bytes], Envelope]: Функция декодирования (создается один раз на тип)
+    """
+    decoder = _decoders.get(data_type)
+    if decoder is None:
+        if msgspec is not None:
+            # strict=False: ID, пришедшие строками, приводятся к int
+            decoder = msgspec.json.Decoder(Envelope[data_type], strict=False).decode
+        else:
+            convert = _converter(Optional[data_type])
+
+            def decoder(body: bytes) -> Envelope:
+                payload = json.loads(body)
+                return Envelope(
+                    data=convert(payload.get("data")),
+                    message=payload.get("message"),
+                    total=payload.get("total")
+                )
+        _decoders[data_type] = decoder
+    return decoder
@@ -0,0 +1,258 @@
+import asyncio
+import contextlib
+import logging
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramForbiddenError
+
+from utils.send_queue import Priority, SendScheduler
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    deliver_after REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_deliver_after ON outbox (deliver_after);
+CREATE INDEX IF NOT EXISTS outbox_chat_id ON outbox (chat_id);
+"""
+
+# Ограничение Telegram на длину текста сообщения
+MESSAGE_LIMIT = 4096
+
+
+class NotificationOutbox:
+    """
+    Очередь уведомлений в SQLite с фоновой доставкой.
+
+    Хендлер только записывает уведомление в базу и сразу продолжает работу,
+    отправляет фоновый обработчик через SendScheduler с приоритетом BULK.
+    Неотправленные уведомления переживают перезапуск. При ошибке отправка
+    повторяется с растущей паузой, после max_attempts попыток уведомление
+    удаляется; чаты, заблокировавшие бота, не повторяются.
+
+    При digest_window > 0 уведомления одному получателю копятся digest_window
+    секунд с первого из них и отправляются одним сообщением-сводкой (длинная
+    сводка - несколькими сообщениями; уже отправленные части не повторяются).
+
+    Получатели обслуживаются независимо: медленный или повторяемый чат не
+    задерживает доставку остальным.
+    """
+
+    def __init__(
+            self,
+            sender: SendScheduler,
+            path: str,
+            digest_window: float = 0,
+            max_attempts: int = 5,
+            batch_size: int = 100
+    ):
+        """
+        Args:
+            sender: Очередь исходящих запросов к Bot API
+            path: Путь к файлу базы SQLite
+            digest_window: Окно сводки в секундах (0 - каждое уведомление отдельно)
+            max_attempts: Сколько раз пытаться отправить уведомление
+            batch_size: Сколько получателей обслуживать одновременно
+        """
+        self.sender = sender
+        self.path = path
+        self.digest_window = digest_window
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+
+        # Все обращения к базе - в одном потоке, база открывается в start()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox-sqlite")
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        # Получатели, доставка которым уже идет
+        self._chats: Dict[int, asyncio.Task] = {}
+
+        self.pending = 0
+        self.enqueued = 0
+        self.delivered = 0
+        self.digests = 0
+        self.retried = 0
+        self.dropped = 0
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    # База (выполняется в потоке executor)
+
+    def _open(self) -> int:
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        return self._connection.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _insert(self, chat_id: int, text: str, now: float, deliver_after: float):
+        self._connection.execute(
+            "INSERT INTO outbox (chat_id, text, created_at, deliver_after) VALUES (?, ?, ?, ?)",
+            (chat_id, text, now, deliver_after)
+        )
+
+    def _due(
+            self, now: float, busy: List[int], limit: int
+    ) -> Tuple[Dict[int, List[Tuple[int, str, int]]], Optional[float]]:
+        """Уведомления получателей (кроме busy), у которых есть готовое к отправке, и время следующего"""
+        chat_ids = [row[0] for row in self._connection.execute(
+            f"SELECT DISTINCT chat_id FROM outbox WHERE deliver_after <= ? "
+            f"AND chat_id NOT IN ({', '.join('?' for _ in busy)}) LIMIT ?",
+            (now, *busy, limit)
+        )] if limit > 0 else []
+        due: Dict[int, List[Tuple[int, str, int]]] = defaultdict(list)
+        if chat_ids:
+            # В режиме сводки вместе с готовым уходит все накопленное для получателя
+            rows = self._connection.execute(
+                f"SELECT chat_id, id, text, attempts FROM outbox "
+                f"WHERE chat_id IN ({', '.join('?' for _ in chat_ids)}) AND (deliver_after <= ? OR ?) ORDER BY id",
+                (*chat_ids, now, self.digest_window > 0)
+            )
+            for chat_id, row_id, text, attempts in rows:
+                due[chat_id].append((row_id, text, attempts))
+        next_at = self._connection.execute(
+            "SELECT MIN(deliver_after) FROM outbox WHERE deliver_after > ?", (now,)
+        ).fetchone()[0]
+        return due, next_at
+
+    def _delete(self, row_ids: List[int]):
+        self._connection.execute(
+            f"DELETE FROM outbox WHERE id IN ({', '.join('?' for _ in row_ids)})", row_ids
+        )
+
+    def _postpone(self, row_ids: List[int], deliver_after: float):
+        self._connection.execute(
+            f"UPDATE outbox SET attempts = attempts + 1, deliver_after = ? "
+            f"WHERE id IN ({', '.join('?' for _ in row_ids)})",
+            (deliver_after, *row_ids)
+        )
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # Публичный интерфейс
+
+    async def start(self):
+        """Открытие базы и запуск фоновой доставки (в том числе оставшегося с прошлого запуска)"""
+        self.pending = await self._run(self._open)
+        if self.pending:
+            logger.info(f"Очередь уведомлений: {self.pending} неотправленных с прошлого запуска")
+        self._worker = asyncio.create_task(self._deliver_forever())
+
+    async def enqueue(self, chat_id: int, text: str):
+        """
+        Постановка уведомления в очередь
+
+        Возвращается после записи в базу, не дожидаясь отправки.
+
+        Args:
+            chat_id: ID получателя
+            text: Текст уведомления (HTML)
+        """
+        now = time.time()
+        await self._run(self._insert, int(chat_id), text, now, now + self.digest_window)
+        self.pending += 1
+        self.enqueued += 1
+        self._wakeup.set()
+
+    async def close(self):
+        """Остановка доставки; неотправленные уведомления остаются в базе"""
+        for task in [self._worker, *self._chats.values()]:
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._worker = None
+        self._chats.clear()
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    # Доставка
+
+    async def _deliver_forever(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                due, next_at = await self._run(
+                    self._due, time.time(), list(self._chats), self.batch_size - len(self._chats)
+                )
+                for chat_id, rows in due.items():
+                    task = self._chats[chat_id] = asyncio.create_task(self._deliver(chat_id, rows))
+                    task.add_done_callback(lambda task, chat_id=chat_id: self._chat_done(chat_id, task))
+            except Exception as e:
+                logger.error(f"Ошибка очереди уведомлений: {e}", exc_info=True)
+                next_at = time.time() + 1
+
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+
+    def _chat_done(self, chat_id: int, task: asyncio.Task):
+        self._chats.pop(chat_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка очереди уведомлений для {chat_id}: {task.exception()}", exc_info=task.exception())
+        # Освободилось место, а у получателя могли появиться новые уведомления
+        self._wakeup.set()
+
+    async def _deliver(self, chat_id: int, rows: List[Tuple[int, str, int]]):
+        """Отправка накопленных уведомлений получателя: в режиме сводки - одним сообщением"""
+        if self.digest_window > 0 and len(rows) > 1:
+            batches = self._compose([(row_id, text) for row_id, text, _ in rows])
+        else:
+            batches = [([row_id], text) for row_id, text, _ in rows]
+
+        for index, (row_ids, message) in enumerate(batches):
+            try:
+                await self.sender.send_message(chat_id, message, priority=Priority.BULK, parse_mode='HTML')
+            except Exception as e:
+                await self._failed(chat_id, rows, [row_id for ids, _ in batches[index:] for row_id in ids], e)
+                return
+            # Отправленная часть удаляется сразу: при ошибке на следующей она не повторится
+            await self._run(self._delete, row_ids)
+            self.pending -= len(row_ids)
+            self.delivered += len(row_ids)
+            if len(row_ids) > 1:
+                self.digests += 1
+
+    async def _failed(self, chat_id: int, rows: List[Tuple[int, str, int]], row_ids: List[int], error: Exception):
+        """Повтор с растущей паузой или удаление неотправленных уведомлений"""
+        attempts = max(attempts for row_id, _, attempts in rows if row_id in row_ids) + 1
+        if isinstance(error, TelegramForbiddenError) or attempts >= self.max_attempts:
+            logger.warning(f"Уведомления для {chat_id} удалены после {attempts} попыток: {error}")
+            await self._run(self._delete, row_ids)
+            self.pending -= len(row_ids)
+            self.dropped += len(row_ids)
+            return
+        logger.warning(f"Уведомления для {chat_id} не отправлены, попытка {attempts}: {error}")
+        await self._run(self._postpone, row_ids, time.time() + min(2 ** attempts, 300))
+        self.retried += 1
+
+    @staticmethod
+    def _compose(rows: List[Tuple[int, str]]) -> List[Tuple[List[int], str]]:
+        """Сводка уведомлений, разбитая по лимиту длины сообщения: ID вошедших уведомлений и текст"""
+        messages = []
+        row_ids, current = [], f"Обновления по задачам ({len(rows)}):"
+        for row_id, text in rows:
+            line = f"• {text}"
+            if row_ids and len(current) + 1 + len(line) > MESSAGE_LIMIT:
+                messages.append((row_ids, current))
+                row_ids, current = [], line
+            else:
+                current += "\n" + line
+            row_ids.append(row_id)
+        messages.append((row_ids, current))
+        return messages
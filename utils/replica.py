@@ -0,0 +1,388 @@
+"""
+Локальная реплика задач, пользователей и групп в SQLite для чтения.
+
+Списки администратора (manage_tasks, manage_users) и карточка задачи
+(task_info) читаются из реплики, а не из API, и не конкурируют с запросами
+исполнителей. Реплику заполняет фоновая синхронизация:
+
+- задачи - инкрементально: /tasks/all?updated_since=<наибольший updated_at
+  из уже полученных>. Если сервер не отдает updated_at или игнорирует
+  updated_since (вернул задачи старше курсора), задачи перечитываются только
+  полностью раз в full_sync_interval секунд, без проходов по tasks_version;
+- пользователи и группы - полными списками (они небольшие и кэшируются по ETag)
+  раз в users_sync_interval секунд, независимо от изменений задач;
+- раз в full_sync_interval секунд задачи перечитываются целиком, чтобы убрать
+  удаленные в API.
+
+Проход запускается раз в sync_interval секунд и сразу (не чаще раза в секунду)
+после изменения tasks_version - взятия, выполнения задачи или события API.
+Карточка задачи сохраняется при первом чтении и сбрасывается при изменении
+задачи и при добавлении вложений (forget_card).
+Записью занимается отдельный поток, чтение идет вторым соединением прямо в
+цикле событий: в режиме WAL читатели не ждут записи, а запрос по индексу
+занимает микросекунды - дешевле, чем переход в поток. Пока первая синхронизация
+не завершилась, ready = False и клавиатуры читают API напрямую.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.api_client import APIError, TaskManagementAPI
+from utils.cache import VersionCounter
+from utils.models import Task, get_decoder
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY,
+    status TEXT,
+    group_id INTEGER,
+    created_by INTEGER,
+    created_at TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL,
+    full TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS tasks_group_id ON tasks (group_id);
+CREATE INDEX IF NOT EXISTS tasks_created_by ON tasks (created_by);
+CREATE INDEX IF NOT EXISTS tasks_created_at ON tasks (created_at);
+-- Страницы списков выполненных и невыполненных задач: без сортировки и без обхода чужого статуса
+CREATE INDEX IF NOT EXISTS tasks_completed_created_at ON tasks (status = 'completed', created_at, task_id);
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    type TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    group_id INTEGER PRIMARY KEY,
+    is_active INTEGER,
+    data TEXT NOT NULL
+);
+"""
+
+# Таблица -> ключ и столбцы, которые дублируются из JSON для индексов и фильтров
+_TABLES = {
+    "tasks": ("task_id", ("status", "group_id", "created_by", "created_at", "updated_at")),
+    "users": ("user_id", ("type",)),
+    "groups": ("group_id", ("is_active",)),
+}
+
+class ReadReplica:
+    """Реплика для чтения с фоновой синхронизацией из API"""
+
+    def __init__(
+            self,
+            api: TaskManagementAPI,
+            path: str,
+            sync_interval: float = 10,
+            full_sync_interval: float = 600,
+            users_sync_interval: float = 60,
+            tasks_version: Optional[VersionCounter] = None
+    ):
+        """
+        Args:
+            api: Клиент API задач
+            path: Путь к файлу базы SQLite
+            sync_interval: Период синхронизации в секундах
+            full_sync_interval: Период полного перечитывания задач в секундах
+            users_sync_interval: Период перечитывания пользователей и групп в секундах
+            tasks_version: Версия списков задач: ее изменение запускает синхронизацию
+        """
+        self.api = api
+        self.path = path
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.users_sync_interval = users_sync_interval
+        self.tasks_version = tasks_version
+
+        # Запись - в потоке executor, чтение - соединением _reader в цикле событий
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replica-sqlite")
+        self._worker: Optional[asyncio.Task] = None
+        self._tasks_decoder = get_decoder(List[Task])
+        self._totals: Dict[str, int] = {}
+
+        # Наибольший updated_at полученных задач (None - следующий проход полный)
+        self.cursor: Optional[str] = None
+        # Поддерживает ли сервер updated_since (None - еще неизвестно)
+        self.incremental: Optional[bool] = None
+        # Время (time.time()) начала последней успешной синхронизации: данные не старше его
+        self.synced_at: Optional[float] = None
+        # Увеличивается, когда синхронизация изменила данные (входит в ключи кэшей клавиатур)
+        self.version = VersionCounter()
+
+        self.syncs = 0
+        self.full_syncs = 0
+        self.sync_errors = 0
+        self.rows_changed = 0
+        self.last_sync_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.synced_at is not None
+
+    @property
+    def lag(self) -> Optional[float]:
+        """Отставание реплики от API в секундах (None до первой синхронизации)"""
+        return None if self.synced_at is None else time.time() - self.synced_at
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    # База (запись - в потоке executor)
+
+    def _open(self):
+        self._writer = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=OFF")
+        self._writer.executescript(_SCHEMA)
+
+    def _apply(self, table: str, items: List[Dict[str, Any]], complete: bool) -> int:
+        """
+        Запись полученных строк: меняются только строки с другим содержимым
+
+        Args:
+            table: Таблица
+            items: Строки из API
+            complete: items - полный список, остальные строки таблицы удаляются
+
+        Returns:
+            int: Количество добавленных, измененных и удаленных строк
+        """
+        key, columns = _TABLES[table]
+        names = (key, *columns, "data")
+        updates = ", ".join(f"{name} = excluded.{name}" for name in (*columns, "data"))
+        if table == "tasks":
+            # Карточка задачи перечитывается после любого изменения задачи
+            updates += ", full = NULL"
+        statement = (
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates} WHERE {table}.data != excluded.data"
+        )
+        rows = [
+            (int(item[key]), *(item.get(column) for column in columns),
+             json.dumps(item, ensure_ascii=False, sort_keys=True, default=str))
+            for item in items
+        ]
+
+        changes = self._writer.total_changes
+        self._writer.execute("BEGIN")
+        try:
+            self._writer.executemany(statement, rows)
+            if complete:
+                present = {row[0] for row in rows}
+                stale = [(row_id,) for row_id, in self._writer.execute(f"SELECT {key} FROM {table}")
+                         if row_id not in present]
+                self._writer.executemany(f"DELETE FROM {table} WHERE {key} = ?", stale)
+            self._writer.execute("COMMIT")
+        except BaseException:
+            self._writer.execute("ROLLBACK")
+            raise
+        return self._writer.total_changes - changes
+
+    def _store_full(self, task_id: int, full: str, data: str):
+        # Если задача успела измениться, пока карточка читалась из API, карточка не сохраняется
+        self._writer.execute("UPDATE tasks SET full = ? WHERE task_id = ? AND data = ?", (full, task_id, data))
+
+    def _forget_full(self, task_id: int):
+        self._writer.execute("UPDATE tasks SET full = NULL WHERE task_id = ?", (task_id,))
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    # Синхронизация
+
+    async def start(self):
+        """Открытие базы и запуск фоновой синхронизации (первый проход - полный)"""
+        await self._run(self._open)
+        self._reader = sqlite3.connect(self.path, isolation_level=None)
+        self._reader.execute("PRAGMA query_only=ON")
+        self._worker = asyncio.create_task(self._sync_forever())
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    async def sync(self, full: bool = False, users: bool = False, tasks: bool = True) -> int:
+        """
+        Один проход синхронизации
+
+        Args:
+            full: Перечитать все задачи и удалить отсутствующие в API
+            users: Перечитать пользователей и группы (при полном проходе - всегда)
+            tasks: Читать задачи (False - только пользователи и группы)
+
+        Returns:
+            int: Количество измененных строк
+        """
+        full = tasks and (full or self.cursor is None)
+        users = users or full
+        started_at = time.time()
+        started = time.perf_counter()
+
+        requests = []
+        if tasks:
+            requests.append(self.api.get_all_tasks(updated_since=None if full else self.cursor))
+        if users:
+            requests += [self.api.get_all_users(), self.api.get_all_groups()]
+        results = await asyncio.gather(*requests)
+        task_list = (results.pop(0) or []) if tasks else []
+
+        if tasks and not full and any(
+                not task.get("updated_at") or task["updated_at"] < self.cursor for task in task_list
+        ):
+            # Сервер не поддерживает updated_since и вернул все задачи - это полный список
+            self._disable_incremental()
+            full = True
+        elif full and task_list and not all(task.get("updated_at") for task in task_list):
+            # Сервер не отдает updated_at - инкрементальная синхронизация невозможна
+            self._disable_incremental()
+
+        updates = [("tasks", task_list, full)] if tasks else []
+        if users:
+            user_list, groups = results
+            if not isinstance(user_list, list):
+                # get_all_users возвращает текст ошибки вместо исключения
+                raise APIError(f"Не удалось получить пользователей: {user_list}")
+            updates += [("users", user_list, True), ("groups", groups or [], True)]
+
+        changed = 0
+        for table, items, complete in updates:
+            changed += await self._run(self._apply, table, items, complete)
+
+        if tasks and self.incremental is not False:
+            cursor = max((task["updated_at"] for task in task_list), default=None)
+            if cursor is not None and (self.cursor is None or cursor > self.cursor):
+                self.cursor = cursor
+            if full and self.cursor is not None:
+                self.incremental = True
+
+        if tasks:
+            self.synced_at = started_at
+            self.full_syncs += full
+        self.last_sync_seconds = time.perf_counter() - started
+        self.syncs += 1
+        self.rows_changed += changed
+        if changed:
+            self._totals.clear()
+            self.version.bump()
+        return changed
+
+    def _disable_incremental(self):
+        if self.incremental is not False:
+            logger.warning(
+                f"Реплика: сервер не поддерживает updated_since, задачи перечитываются "
+                f"только полностью раз в {self.full_sync_interval:.0f} с"
+            )
+        self.incremental = False
+        self.cursor = None
+
+    async def _sync_forever(self):
+        last_full = None
+        last_users = None
+        last_attempt = None
+        seen_version = None
+        while True:
+            now = time.monotonic()
+            version = self.tasks_version.value if self.tasks_version is not None else None
+            due = last_attempt is None or now - last_attempt >= self.sync_interval
+            full = last_full is None or now - last_full >= self.full_sync_interval
+            users_due = full or now - last_users >= self.users_sync_interval
+            if self.incremental is False:
+                # Без инкрементальной синхронизации каждый проход скачивает все задачи:
+                # изменения tasks_version не ждем, задачи перечитываются раз в full_sync_interval
+                tasks, users = due and full, due and users_due
+            else:
+                tasks = due or version != seen_version
+                users = tasks and users_due
+            if tasks or users:
+                last_attempt, seen_version = now, version
+                try:
+                    changed = await self.sync(full=full, users=users, tasks=tasks)
+                    if users:
+                        last_users = now
+                    if tasks and full:
+                        last_full = now
+                        logger.info(
+                            f"Реплика: полная синхронизация за {self.last_sync_seconds:.3f} с, изменено строк: {changed}"
+                        )
+                except Exception as e:
+                    self.sync_errors += 1
+                    logger.warning(f"Реплика: ошибка синхронизации: {e}")
+            await asyncio.sleep(1)
+
+    # Чтение (в цикле событий)
+
+    def tasks_page(self, kind: str, page: int, page_size: int) -> Tuple[List[Task], int]:
+        """
+        Страница задач для списков администратора
+
+        Args:
+            kind: "uncompleted" или "completed"
+            page: Номер страницы (с 1)
+            page_size: Размер страницы
+
+        Returns:
+            Tuple[List[Task], int]: Задачи страницы и общее количество задач
+        """
+        completed = int(kind == "completed")
+        rows = self._reader.execute(
+            "SELECT data FROM tasks WHERE (status = 'completed') = ? ORDER BY created_at, task_id LIMIT ? OFFSET ?",
+            (completed, page_size, (page - 1) * page_size)
+        ).fetchall()
+        # COUNT обходит весь диапазон индекса - считается один раз на версию данных
+        total = self._totals.get(kind)
+        if total is None:
+            total = self._totals[kind] = self._reader.execute(
+                "SELECT COUNT(*) FROM tasks WHERE (status = 'completed') = ?", (completed,)
+            ).fetchone()[0]
+        body = '{"data": [' + ", ".join(data for data, in rows) + ']}'
+        return self._tasks_decoder(body.encode()).data or [], total
+
+    def users_page(self, page: int, page_size: int) -> Tuple[List[Dict], int]:
+        """Страница пользователей и их общее количество"""
+        rows = self._reader.execute(
+            "SELECT data FROM users ORDER BY user_id LIMIT ? OFFSET ?", (page_size, (page - 1) * page_size)
+        ).fetchall()
+        total = self._reader.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        return [json.loads(data) for data, in rows], total
+
+    def counts(self) -> Dict[str, int]:
+        """Количество строк по таблицам"""
+        return {table: self._reader.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in _TABLES}
+
+    async def get_task(self, task_id: int) -> Optional[Dict]:
+        """
+        Карточка задачи (/tasks/{id}/full): из реплики, если задача не менялась
+        с прошлого чтения, иначе из API с сохранением в реплику
+        """
+        row = self._reader.execute("SELECT full, data FROM tasks WHERE task_id = ?", (int(task_id),)).fetchone()
+        if row is not None and row[0] is not None:
+            return json.loads(row[0])
+        task = await self.api.get_task(task_id)
+        if task is not None and row is not None:
+            full = json.dumps(task, ensure_ascii=False, default=str)
+            await self._run(self._store_full, int(task_id), full, row[1])
+        return task
+
+    async def forget_card(self, task_id: int):
+        """Сброс сохраненной карточки задачи (например, после добавления вложений)"""
+        await self._run(self._forget_full, int(task_id))
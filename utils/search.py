@@ -0,0 +1,251 @@
+"""
+Полнотекстовый поиск по задачам (/find) на инвертированном индексе в памяти.
+
+Текст задачи разбивается на слова, слова приводятся к нижнему регистру
+(casefold, в том числе кириллица) и ё заменяется на е. Индекс хранит для
+каждого слова множество задач, а отсортированный словарь позволяет искать
+по началу слова: "провер" находит "проверить" и "проверка".
+
+Задача подходит, если в ней есть все слова запроса (каждое - целиком или как
+начало слова). Релевантность - сумма IDF совпавших слов (редкие слова весят
+больше), совпадение по началу слова весит меньше полного; при равенстве выше
+более новые задачи.
+
+Индекс строится при старте одним запросом /tasks/all, дополняется хендлерами
+при создании, взятии, отмене и выполнении задачи и раз в rebuild_interval
+секунд перестраивается целиком - чтобы учесть изменения, сделанные в обход
+этого процесса.
+"""
+import asyncio
+import bisect
+import contextlib
+import heapq
+import logging
+import math
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.api_client import TaskManagementAPI
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+# Совпадение по началу слова весит меньше полного
+PREFIX_WEIGHT = 0.7
+# Более короткое начало слова совпадает со слишком многими словами - только точное совпадение
+MIN_PREFIX_LENGTH = 2
+# Длина текста задачи, которая хранится для подписи кнопки
+LABEL_LENGTH = 40
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова текста в нижнем регистре, ё -> е"""
+    return _WORD.findall(text.casefold().replace("ё", "е"))
+
+
+@dataclass(slots=True)
+class IndexedTask:
+    """Задача в индексе: поля для фильтрации и подписи кнопки"""
+    task_id: int
+    created_by: Optional[int]
+    status: str
+    label: str
+    terms: Tuple[str, ...]
+
+
+class TaskSearchIndex:
+    """Инвертированный индекс по тексту задач"""
+
+    def __init__(self, api: TaskManagementAPI, rebuild_interval: float = 600, max_results: int = 200):
+        """
+        Args:
+            api: Клиент API задач (источник задач для построения индекса)
+            rebuild_interval: Период полной перестройки в секундах
+            max_results: Максимум задач в результатах поиска
+        """
+        self.api = api
+        self.rebuild_interval = rebuild_interval
+        self.max_results = max_results
+
+        # Слово -> ID задач; отсортированный список слов - для поиска по началу слова
+        self.postings: Dict[str, Set[int]] = {}
+        self.terms: List[str] = []
+        self.tasks: Dict[int, IndexedTask] = {}
+        self.ready = False
+        # Задачи, добавленные во время загрузки списка при перестройке (применяются после нее)
+        self._added_during_rebuild: Optional[Dict[int, dict]] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.build_seconds = 0.0
+        self.memory_bytes = 0
+        self.searches = 0
+
+    # Построение и изменения
+
+    def _index(self, task: dict):
+        task_id = int(task["task_id"])
+        self._remove(task_id)
+        message = task.get("task_message") or ""
+        terms = tuple(dict.fromkeys(tokenize(message)))
+        self.tasks[task_id] = IndexedTask(
+            task_id=task_id,
+            created_by=int(task["created_by"]) if task.get("created_by") is not None else None,
+            status=task.get("status") or "",
+            label=message[:LABEL_LENGTH],
+            terms=terms
+        )
+        for term in terms:
+            task_ids = self.postings.get(term)
+            if task_ids is None:
+                task_ids = self.postings[term] = set()
+                if self.ready:
+                    bisect.insort(self.terms, term)
+            task_ids.add(task_id)
+
+    def _remove(self, task_id: int):
+        indexed = self.tasks.pop(task_id, None)
+        if indexed is None:
+            return
+        for term in indexed.terms:
+            task_ids = self.postings[term]
+            task_ids.discard(task_id)
+            if not task_ids:
+                del self.postings[term]
+                index = bisect.bisect_left(self.terms, term)
+                if index < len(self.terms) and self.terms[index] == term:
+                    del self.terms[index]
+
+    def add(self, task: dict):
+        """Добавление или обновление задачи (после создания, взятия, отмены или выполнения)"""
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild[int(task["task_id"])] = task
+        if self.ready:
+            self._index(task)
+
+    def build(self, tasks: Iterable[dict]):
+        """Построение индекса заново по полному списку задач"""
+        started = time.perf_counter()
+        self.postings, self.terms, self.tasks = {}, [], {}
+        self.ready = False
+        for task in tasks:
+            self._index(task)
+        self.terms = sorted(self.postings)
+        self.ready = True
+        self.build_seconds = time.perf_counter() - started
+        self.memory_bytes = self.estimate_memory()
+
+    async def rebuild(self, chunk: int = 1000):
+        """
+        Загрузка всех задач из API и построение индекса
+
+        Новый индекс строится рядом со старым частями по chunk задач с передачей
+        управления циклу событий между ними; до замены поиск идет по старому.
+        """
+        self._added_during_rebuild = {}
+        try:
+            tasks = await self.api.get_all_tasks() or []
+            started = time.perf_counter()
+            fresh = TaskSearchIndex(self.api)
+            for offset in range(0, len(tasks), chunk):
+                for task in tasks[offset:offset + chunk]:
+                    fresh._index(task)
+                await asyncio.sleep(0)
+            added = self._added_during_rebuild
+        finally:
+            self._added_during_rebuild = None
+
+        self.postings, self.tasks = fresh.postings, fresh.tasks
+        self.terms = sorted(self.postings)
+        self.ready = True
+        for task in added.values():
+            self._index(task)
+        self.build_seconds = time.perf_counter() - started
+        self.memory_bytes = self.estimate_memory()
+        logger.info(
+            f"Поисковый индекс: {len(self.tasks)} задач, {len(self.terms)} слов, "
+            f"построен за {self.build_seconds:.3f} с, ~{self.memory_bytes / 1024 / 1024:.1f} МБ"
+        )
+
+    def estimate_memory(self) -> int:
+        """Приблизительный размер индекса в байтах (контейнеры, строки и записи задач)"""
+        size = sys.getsizeof(self.postings) + sys.getsizeof(self.terms) + sys.getsizeof(self.tasks)
+        for term, task_ids in self.postings.items():
+            size += sys.getsizeof(term) + sys.getsizeof(task_ids)
+        for indexed in self.tasks.values():
+            size += sys.getsizeof(indexed) + sys.getsizeof(indexed.label) + sys.getsizeof(indexed.terms)
+        return size
+
+    async def start(self):
+        """Запуск фонового построения и периодической перестройки индекса"""
+        self._worker = asyncio.create_task(self._rebuild_forever())
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+
+    async def _rebuild_forever(self):
+        while True:
+            try:
+                await self.rebuild()
+                delay = self.rebuild_interval
+            except Exception as e:
+                logger.warning(f"Поисковый индекс не построен: {e}")
+                # Пока индекса нет, повторяем чаще
+                delay = self.rebuild_interval if self.ready else min(self.rebuild_interval, 30)
+            await asyncio.sleep(delay)
+
+    # Поиск
+
+    def _matches(self, word: str) -> Dict[int, float]:
+        """Задачи со словом word (целиком или началом слова) и вес совпадения"""
+        total = len(self.tasks)
+        scores: Dict[int, float] = {}
+        if len(word) < MIN_PREFIX_LENGTH:
+            candidates = [word] if word in self.postings else []
+        else:
+            start = bisect.bisect_left(self.terms, word)
+            end = bisect.bisect_left(self.terms, word + "\U0010ffff", start)
+            candidates = self.terms[start:end]
+        for term in candidates:
+            task_ids = self.postings[term]
+            weight = math.log(1 + total / len(task_ids)) * (1.0 if term == word else PREFIX_WEIGHT)
+            for task_id in task_ids:
+                if weight > scores.get(task_id, 0.0):
+                    scores[task_id] = weight
+        return scores
+
+    def search(self, query: str, created_by: Optional[int] = None) -> List[IndexedTask]:
+        """
+        Поиск задач по словам запроса
+
+        Args:
+            query: Слова запроса (каждое - целиком или начало слова)
+            created_by: Только задачи этого постановщика (None - все задачи)
+
+        Returns:
+            List[IndexedTask]: До max_results задач, от более релевантных к менее
+        """
+        self.searches += 1
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+
+        # Сначала самое редкое слово - меньше всего кандидатов для пересечения
+        matches = sorted((self._matches(word) for word in words), key=len)
+        scores = matches[0]
+        for other in matches[1:]:
+            scores = {task_id: score + other[task_id] for task_id, score in scores.items() if task_id in other}
+            if not scores:
+                return []
+
+        if created_by is not None:
+            scores = {task_id: score for task_id, score in scores.items() if self.tasks[task_id].created_by == created_by}
+        ranked = heapq.nlargest(self.max_results, scores.items(), key=lambda item: (item[1], item[0]))
+        return [self.tasks[task_id] for task_id, _ in ranked]
@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Приоритет исходящего сообщения: меньше - раньше"""
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, не больше capacity в запасе"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float = 1) -> float:
+        """Сколько секунд ждать, пока станет доступно cost токенов"""
+        now = time.monotonic()
+        self._refill(now)
+        cost = min(cost, self.capacity)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < cost:
+            wait = max(wait, (cost - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, cost: float = 1):
+        self.tokens -= min(cost, self.capacity)
+
+    async def acquire(self, cost: float = 1):
+        """Ожидание и списание cost токенов"""
+        while True:
+            wait = self.delay(cost)
+            if wait <= 0:
+                self.consume(cost)
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Запрет отправки на seconds секунд (ответ 429 с retry_after)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity and self.blocked_until <= self.updated
+
+
+class _Chat:
+    __slots__ = ("bucket", "lock")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+
+
+class SendScheduler:
+    """
+    Центральная очередь исходящих запросов к Bot API.
+
+    Ограничивает частоту отправки глобально (~30 сообщений/с) и в каждой группе
+    (~20 сообщений/мин), сохраняет порядок сообщений внутри чата,
+    при ответе 429 ждет retry_after и повторяет запрос. Интерактивные ответы
+    получают глобальные токены раньше массовых уведомлений.
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            global_rate: float = 30,
+            group_rate_per_minute: float = 20,
+            max_retries: int = 3,
+            max_idle_chats: int = 10000
+    ):
+        """
+        Args:
+            bot: Экземпляр бота
+            global_rate: Сообщений в секунду на всех чатах
+            group_rate_per_minute: Сообщений в минуту в одну группу
+            max_retries: Сколько раз повторять запрос после 429
+            max_idle_chats: Сколько неактивных чатов хранить до очистки
+        """
+        self.bot = bot
+        self.group_rate_per_minute = group_rate_per_minute
+        self.max_retries = max_retries
+        self.max_idle_chats = max_idle_chats
+
+        self.global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self._chats: Dict[int, _Chat] = {}
+        self._waiters: List[Tuple[int, int, asyncio.Future, float]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.sent = 0
+        self.retried = 0
+        self.queued = 0
+
+    def _chat(self, chat_id: int) -> _Chat:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            if len(self._chats) >= self.max_idle_chats:
+                self._chats = {key: value for key, value in self._chats.items()
+                               if value.lock.locked() or not value.bucket.idle}
+            if chat_id < 0:
+                bucket = TokenBucket(rate=self.group_rate_per_minute / 60, capacity=self.group_rate_per_minute)
+            else:
+                # Личные чаты отдельно не ограничиваются (хватает глобального лимита),
+                # корзина нужна только для паузы после 429
+                bucket = TokenBucket(rate=self.global_bucket.rate, capacity=self.global_bucket.capacity)
+            chat = self._chats[chat_id] = _Chat(bucket)
+        return chat
+
+    async def _acquire_global(self, priority: Priority, cost: float):
+        if not self._waiters and self.global_bucket.delay(cost) <= 0:
+            self.global_bucket.consume(cost)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future, cost))
+        self.queued += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        """Выдача глобальных токенов ожидающим в порядке приоритета"""
+        while self._waiters:
+            _, _, future, cost = self._waiters[0]
+            wait = self.global_bucket.delay(cost)
+            if wait > 0:
+                # За время ожидания может прийти запрос с более высоким приоритетом
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.global_bucket.consume(cost)
+            future.set_result(None)
+
+    async def send(
+            self,
+            chat_id: int,
+            call: Callable[[], Awaitable[T]],
+            priority: Priority = Priority.INTERACTIVE,
+            cost: float = 1
+    ) -> T:
+        """
+        Выполнение запроса к Bot API с учетом ограничений
+
+        Args:
+            chat_id: ID чата-получателя
+            call: Фабрика корутины запроса (вызывается заново при повторе)
+            priority: Приоритет запроса
+            cost: Количество сообщений в запросе (для медиагрупп - число элементов)
+
+        Returns:
+            Результат запроса
+        """
+        chat = self._chat(int(chat_id))
+        # Время участка сверх вложенного запроса к Bot API - ожидание лимитов
+        with span("send", chat_id=chat_id, priority=priority.name):
+            async with chat.lock:
+                for attempt in range(self.max_retries + 1):
+                    await chat.bucket.acquire(cost)
+                    await self._acquire_global(priority, cost)
+                    try:
+                        result = await call()
+                        self.sent += 1
+                        return result
+                    except TelegramRetryAfter as e:
+                        if attempt >= self.max_retries:
+                            raise
+                        self.retried += 1
+                        logger.warning(f"Flood control в чате {chat_id}: повтор через {e.retry_after} с")
+                        chat.bucket.pause(e.retry_after)
+
+    async def send_message(self, chat_id: int, text: str, priority: Priority = Priority.INTERACTIVE, **kwargs: Any):
+        """Отправка текстового сообщения через очередь"""
+        return await self.send(
+            chat_id,
+            lambda: self.bot.send_message(chat_id=chat_id, text=text, **kwargs),
+            priority
+        )
+
+    async def send_photo(self, chat_id: int, photo: Any, priority: Priority = Priority.INTERACTIVE, **kwargs: Any):
+        """Отправка фото через очередь"""
+        return await self.send(
+            chat_id,
+            lambda: self.bot.send_photo(chat_id=chat_id, photo=photo, **kwargs),
+            priority
+        )
+
+    async def send_media_group(self, chat_id: int, media: list, priority: Priority = Priority.INTERACTIVE,
+                               **kwargs: Any):
+        """Отправка медиагруппы через очередь (каждый элемент считается отдельным сообщением)"""
+        return await self.send(
+            chat_id,
+            lambda: self.bot.send_media_group(chat_id=chat_id, media=media, **kwargs),
+            priority,
+            cost=len(media)
+        )
+
+    async def copy_messages(self, chat_id: int, from_chat_id: int, message_ids: List[int],
+                            priority: Priority = Priority.INTERACTIVE, **kwargs: Any):
+        """Копирование сообщений одним запросом через очередь (каждое сообщение считается отдельно)"""
+        return await self.send(
+            chat_id,
+            lambda: self.bot.copy_messages(
+                chat_id=chat_id, from_chat_id=from_chat_id, message_ids=message_ids, **kwargs
+            ),
+            priority,
+            cost=len(message_ids)
+        )
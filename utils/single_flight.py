@@ -0,0 +1,52 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вызовов в один.
+
+    Пока вызов с ключом выполняется, повторные вызовы с тем же ключом
+    не запускают новую операцию, а ждут результат уже запущенной.
+    Исключение получают все ожидающие.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def inflight(self) -> int:
+        """Количество выполняющихся сейчас операций"""
+        return len(self._inflight)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Помечаем исключение как полученное, даже если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполнение операции с объединением одинаковых вызовов
+
+        Args:
+            key: Ключ операции
+            func: Фабрика корутины, вызывается только для первого вызова
+
+        Returns:
+            Any: Результат операции
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.hits += 1
+
+        # shield: отмена одного ожидающего не должна отменять запрос остальным
+        return await asyncio.shield(task)
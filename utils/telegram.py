@@ -0,0 +1,52 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+# Ограничение Bot API на количество сообщений в одном вызове deleteMessages
+DELETE_MESSAGES_LIMIT = 100
+
+
+async def delete_messages_bulk(bot: Bot, messages: Iterable[Sequence[int]]) -> List[Tuple[int, int]]:
+    """
+    Удаление сообщений пачками через deleteMessages
+
+    Сообщения группируются по чатам и удаляются по 100 штук за вызов.
+    Если пачка не удалилась целиком, ее сообщения удаляются по одному,
+    чтобы найти конкретные неудаленные.
+
+    Args:
+        bot: Экземпляр бота
+        messages: Пары (chat_id, message_id)
+
+    Returns:
+        List[Tuple[int, int]]: Пары (chat_id, message_id), которые удалить не удалось
+    """
+    by_chat: Dict[int, List[int]] = defaultdict(list)
+    for chat_id, message_id in messages:
+        by_chat[chat_id].append(message_id)
+
+    failed = []
+    for chat_id, message_ids in by_chat.items():
+        message_ids = list(dict.fromkeys(message_ids))
+        for start in range(0, len(message_ids), DELETE_MESSAGES_LIMIT):
+            chunk = message_ids[start:start + DELETE_MESSAGES_LIMIT]
+            try:
+                await bot.delete_messages(chat_id=chat_id, message_ids=chunk)
+                continue
+            except TelegramAPIError as e:
+                logger.info(f"deleteMessages в чате {chat_id} не выполнен ({e}), удаляю по одному")
+
+            for message_id in chunk:
+                try:
+                    await bot.delete_message(chat_id=chat_id, message_id=message_id)
+                except TelegramAPIError:
+                    failed.append((chat_id, message_id))
+
+    if failed:
+        logger.warning(f"Не удалось удалить сообщения: {failed}")
+    return failed
@@ -0,0 +1,165 @@
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """Участок обработки апдейта: имя, время начала и окончания, атрибуты и вложенные участки"""
+    __slots__ = ("name", "attrs", "started", "finished", "children", "error")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.finished if self.finished is not None else time.perf_counter()) - self.started
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class span:
+    """
+    Контекстный менеджер дочернего участка текущей трассировки.
+    Вне трассировки (апдейт не трассируется) ничего не делает.
+
+    Пример:
+        with span("api", method="GET", endpoint="/tasks/{id}") as current:
+            ...
+            if current is not None:
+                current.attrs["status"] = 200
+    """
+    __slots__ = ("name", "attrs", "span", "token")
+
+    def __init__(self, name: str, **attrs: Any):
+        self.name = name
+        self.attrs = attrs
+        self.span: Optional[Span] = None
+        self.token = None
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        self.span = Span(self.name, self.attrs)
+        parent.children.append(self.span)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return
+        self.span.finished = time.perf_counter()
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+        _current_span.reset(self.token)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class Tracer:
+    """
+    Трассировка апдейтов: медленные апдейты записываются в файл строками JSON.
+
+    Каждая строка содержит корневой участок (апдейт), плоский список участков
+    со ссылкой на родителя и собственное время по видам участков (breakdown_ms):
+    мидлвари, фильтры, запросы к API, запросы к Bot API, хендлеры; dispatch -
+    время диспетчера вне участков.
+    """
+
+    def __init__(self, path: str, slow_threshold: float = 0.5, sample_rate: float = 1.0):
+        """
+        Args:
+            path: Файл журнала медленных апдейтов (JSON lines)
+            slow_threshold: Апдейты дольше этого времени (секунды) попадают в журнал
+            sample_rate: Доля медленных апдейтов, которые записываются (0..1)
+        """
+        self.path = path
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        self._file = None
+
+        self.traced = 0
+        self.written = 0
+
+    def start(self, name: str, **attrs: Any):
+        """Начало трассировки апдейта; возвращает токен для finish"""
+        root = Span(name, attrs)
+        return root, _current_span.set(root)
+
+    def finish(self, trace, error: Optional[BaseException] = None):
+        root, token = trace
+        root.finished = time.perf_counter()
+        if error is not None:
+            root.error = type(error).__name__
+        _current_span.reset(token)
+        self.traced += 1
+        if root.duration < self.slow_threshold:
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._write(self.to_record(root))
+        except Exception as e:
+            logger.error(f"Ошибка записи трассировки: {e}")
+
+    @staticmethod
+    def to_record(root: Span) -> Dict[str, Any]:
+        """Трассировка в виде словаря для JSON"""
+        spans = []
+        breakdown: Dict[str, float] = {}
+
+        def visit(current: Span, parent: Optional[int]):
+            index = len(spans)
+            duration = current.duration
+            spans.append({
+                "id": index,
+                "parent": parent,
+                "name": current.name,
+                "start_ms": round((current.started - root.started) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+                **({"error": current.error} if current.error else {}),
+                **current.attrs
+            })
+            # Собственное время участка (без вложенных) - чтобы суммы по видам не пересекались
+            own = max(0.0, duration - sum(child.duration for child in current.children))
+            kind = current.name.split(":", 1)[0] if parent is not None else "dispatch"
+            breakdown[kind] = breakdown.get(kind, 0.0) + own * 1000
+            for child in current.children:
+                visit(child, index)
+
+        visit(root, None)
+        return {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "name": root.name,
+            "duration_ms": round(root.duration * 1000, 3),
+            **({"error": root.error} if root.error else {}),
+            **root.attrs,
+            "breakdown_ms": {kind: round(value, 3) for kind, value in breakdown.items()},
+            "spans": spans
+        }
+
+    def _write(self, record: Dict[str, Any]):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        self.written += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,194 @@
+"""
+Прогрев кэшей при старте и снимок кэшей между перезапусками.
+
+При остановке профили пользователей (TTLCache), ответы API из кэша ответов
+(с ETag/Last-Modified) и справочник групп сохраняются в JSON-файл. При старте
+снимок восстанавливается, а затем прогрев параллельно перечитывает
+пользователей, группы и активные группы: восстановленные ответы помечаются
+устаревшими, поэтому проверяются условными запросами (304 - без передачи тела).
+Пока прогрев не завершен, проверка здоровья отвечает 503.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+from utils.api_client import TaskManagementAPI
+from utils.group_directory import GroupDirectory
+from utils.http_cache import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+# 2: профили в снимке - только полные (в версии 1 могли быть строки /users/all/list без is_banned)
+SNAPSHOT_VERSION = 2
+
+
+class Readiness:
+    """Готовность процесса к обработке апдейтов (для проверки здоровья и метрик)"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready_at: Optional[float] = None
+        self.details: Dict[str, Any] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    @property
+    def time_to_ready(self) -> Optional[float]:
+        """Секунды от запуска процесса до готовности"""
+        return None if self.ready_at is None else self.ready_at - self.started_at
+
+    def set_ready(self, **details: Any):
+        self.ready_at = time.monotonic()
+        self.details = details
+
+    def status(self) -> Dict[str, Any]:
+        if not self.ready:
+            return {"status": "starting", "uptime": round(time.monotonic() - self.started_at, 3)}
+        return {"status": "ok", "time_to_ready": round(self.time_to_ready, 3), **self.details}
+
+
+def health_handler(readiness: Readiness):
+    """Обработчик /health: 200 после прогрева, 503 до него"""
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response(readiness.status(), status=200 if readiness.ready else 503)
+
+    return health
+
+
+async def warm_up(api: TaskManagementAPI, directory: GroupDirectory, timeout: float) -> Dict[str, Any]:
+    """
+    Параллельная загрузка пользователей, групп и активных групп
+
+    Ошибки отдельных запросов не прерывают прогрев: кэши дозаполнятся при обращении.
+
+    Args:
+        api: Клиент API задач
+        directory: Справочник групп
+        timeout: Максимальное время прогрева в секундах
+
+    Returns:
+        Dict: Количество загруженных записей и число ошибок
+    """
+    async def active_groups() -> int:
+        return len(await api.get_active_groups() or [])
+
+    async def groups() -> int:
+        await directory.load()
+        return len(directory.groups)
+
+    parts = {"users": api.warm_user_cache(), "groups": groups(), "active_groups": active_groups()}
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*parts.values(), return_exceptions=True),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"Прогрев кэшей не уложился в {timeout} с")
+        return {"warm_up_errors": len(parts)}
+
+    summary = {"warm_up_errors": 0}
+    for name, result in zip(parts, results):
+        if isinstance(result, Exception):
+            logger.error(f"Прогрев: не удалось загрузить {name}: {result}")
+            summary["warm_up_errors"] += 1
+        else:
+            summary[name] = result
+    return summary
+
+
+def save_snapshot(path: str, api: TaskManagementAPI, directory: GroupDirectory) -> int:
+    """
+    Сохранение кэшей в файл (через временный файл, чтобы не оставить его недописанным)
+
+    Сохраняются только ответы без моделей: модели (utils.models) не сериализуются в JSON.
+
+    Returns:
+        int: Количество сохраненных записей
+    """
+    users = [[key, value, ttl] for key, value, ttl in api.user_cache.items()]
+    responses = []
+    if api.response_cache is not None:
+        for (endpoint, params, model), entry in api.response_cache.items():
+            if model is not None:
+                continue
+            responses.append({
+                "endpoint": endpoint,
+                "params": params,
+                "payload": entry.payload,
+                "size": entry.size,
+                "etag": entry.etag,
+                "last_modified": entry.last_modified
+            })
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "users": users,
+        "responses": responses,
+        "groups": list(directory.groups.values()) if directory.loaded else None
+    }
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return len(users) + len(responses)
+
+
+def restore_snapshot(path: str, api: TaskManagementAPI, directory: GroupDirectory, max_age: float) -> int:
+    """
+    Восстановление кэшей из файла
+
+    Профили получают оставшееся на момент сохранения время жизни за вычетом
+    времени простоя. Ответы API считаются устаревшими и при первом обращении
+    проверяются условным запросом.
+
+    Args:
+        max_age: Снимок старше max_age секунд игнорируется
+
+    Returns:
+        int: Количество восстановленных записей
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать снимок кэшей {path}: {e}")
+        return 0
+
+    downtime = time.time() - snapshot.get("saved_at", 0)
+    if snapshot.get("version") != SNAPSHOT_VERSION or downtime > max_age:
+        return 0
+
+    restored = 0
+    for user_id, user, ttl in snapshot["users"]:
+        if ttl > downtime:
+            api.user_cache.set(int(user_id), user, ttl=ttl - downtime)
+            restored += 1
+
+    if api.response_cache is not None:
+        for item in snapshot["responses"]:
+            params = tuple(tuple(pair) for pair in item["params"]) if item["params"] is not None else None
+            api.response_cache.store((item["endpoint"], params, None), CacheEntry(
+                payload=item["payload"],
+                size=item["size"],
+                etag=item["etag"],
+                last_modified=item["last_modified"],
+                stored_at=float("-inf")
+            ))
+            restored += 1
+
+    # Группы тоже считаются устаревшими: справочник перечитает их при первом обращении
+    if snapshot["groups"] is not None and not directory.loaded:
+        directory.groups = {int(group['group_id']): group for group in snapshot["groups"]}
+        directory.loaded = True
+    return restored
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+from typing import Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config import Config
+from utils.warmup import Readiness, health_handler
+
+
+async def health(request: web.Request) -> web.Response:
+    """Проверка живости для балансировщика"""
+    return web.json_response({"status": "ok"})
+
+
+def create_webhook_app(
+        dispatcher: Dispatcher,
+        bot: Bot,
+        config: Config,
+        readiness: Optional[Readiness] = None
+) -> web.Application:
+    """
+    Создание aiohttp-приложения для приема апдейтов через вебхук
+
+    Апдейт передается диспетчеру в фоне, ответ Telegram отдается сразу.
+    Запросы без верного X-Telegram-Bot-Api-Secret-Token отклоняются.
+    С readiness /health отвечает 503, пока не завершен прогрев кэшей.
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=config.webhook_secret
+    ).register(app, path=config.webhook_path)
+    app.router.add_get("/health", health if readiness is None else health_handler(readiness))
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot, config: Config, readiness: Optional[Readiness] = None):
+    """Регистрация вебхука в Telegram и запуск HTTP-сервера"""
+    app = create_webhook_app(dispatcher, bot, config, readiness)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=config.web_host, port=config.web_port)
+    await site.start()
+    logging.info(f"Webhook server listening on {config.web_host}:{config.web_port}{config.webhook_path}")
+
+    # Повторная установка того же URL безопасна - ее может выполнять каждая реплика
+    await bot.set_webhook(
+        url=config.webhook_url.rstrip('/') + config.webhook_path,
+        secret_token=config.webhook_secret,
+        allowed_updates=dispatcher.resolve_used_update_types()
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()